@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from .sqlite_store import Transaction, connect_wal
+
+QUEUE_DB_NAME = "queue.sqlite3"
+LEGACY_QUEUE_NAME = "queue.json"
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_CONSUMER = "executor"
+# Deliveries after which an action that keeps failing (or crashing its consumer) is dead-lettered.
+DEFAULT_MAX_ATTEMPTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    body TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    consumer TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS actions_lease ON actions (lease_until, seq);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    seq INTEGER PRIMARY KEY,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumer_offsets (
+    consumer TEXT PRIMARY KEY,
+    acked_seq INTEGER NOT NULL DEFAULT 0,
+    acked_total INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class QueuedAction:
+    seq: int
+    action: dict[str, Any]
+    attempts: int
+
+
+def queue_dir(root: Path, bot_name: str) -> Path:
+    return root / "qa" / "actions" / bot_name
+
+
+class ActionQueue:
+    """Durable per-bot action queue backed by a SQLite WAL table.
+
+    ``enqueue`` is a single insert. ``claim`` atomically leases the oldest
+    ready actions to a consumer; actions whose lease expires without an
+    ``ack`` (for example after a crash) are redelivered. Each consumer's
+    highest acked sequence number is kept in ``consumer_offsets``. Actions
+    that keep failing are moved to ``dead_letters`` by ``dead_letter``.
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._conn = connect_wal(path, _SCHEMA)
+
+    @classmethod
+    def for_bot(cls, root: Path, bot_name: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> "ActionQueue":
+        directory = queue_dir(root, bot_name)
+        queue = cls(directory / QUEUE_DB_NAME, lease_seconds=lease_seconds)
+        queue.import_legacy(directory / LEGACY_QUEUE_NAME)
+        return queue
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def import_legacy(self, legacy_path: Path) -> int:
+        if not legacy_path.exists():
+            return 0
+        # Rename first so a concurrent importer cannot enqueue the same file twice.
+        claimed = legacy_path.with_name(f"{legacy_path.name}.{os.getpid()}.importing")
+        try:
+            os.replace(legacy_path, claimed)
+        except FileNotFoundError:
+            return 0
+        try:
+            actions = json.loads(claimed.read_text(encoding="utf-8") or "[]")
+        except ValueError:
+            claimed.replace(legacy_path.with_name(f"{legacy_path.name}.corrupt"))
+            return 0
+        if isinstance(actions, list):
+            self.enqueue_many(a for a in actions if isinstance(a, dict))
+        claimed.unlink()
+        return len(actions) if isinstance(actions, list) else 0
+
+    def enqueue(self, action: dict[str, Any]) -> int:
+        cur = self._conn.execute("INSERT INTO actions (body, enqueued_at) VALUES (?, ?)", (json.dumps(action), time.time()))
+        return int(cur.lastrowid)
+
+    def enqueue_many(self, actions: Iterable[dict[str, Any]]) -> int:
+        now = time.time()
+        rows = [(json.dumps(action), now) for action in actions]
+        if not rows:
+            return 0
+        with self._transaction():
+            self._conn.executemany("INSERT INTO actions (body, enqueued_at) VALUES (?, ?)", rows)
+        return len(rows)
+
+    def claim(self, consumer: str = DEFAULT_CONSUMER, limit: int = 100) -> list[QueuedAction]:
+        now = time.time()
+        with self._transaction():
+            rows = self._conn.execute(
+                "SELECT seq, body, attempts FROM actions WHERE lease_until IS NULL OR lease_until <= ? ORDER BY seq LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE actions SET consumer = ?, lease_until = ?, attempts = attempts + 1 WHERE seq = ?",
+                    [(consumer, now + self.lease_seconds, seq) for seq, _, _ in rows],
+                )
+        return [QueuedAction(seq=seq, action=json.loads(body), attempts=attempts + 1) for seq, body, attempts in rows]
+
+    def ack(self, seqs: Iterable[int], consumer: str = DEFAULT_CONSUMER) -> int:
+        seq_list = list(seqs)
+        if not seq_list:
+            return 0
+        with self._transaction():
+            acked = 0
+            for seq in seq_list:
+                acked += self._conn.execute("DELETE FROM actions WHERE seq = ? AND consumer = ?", (seq, consumer)).rowcount
+            self._conn.execute(
+                "INSERT INTO consumer_offsets (consumer, acked_seq, acked_total, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(consumer) DO UPDATE SET acked_seq = MAX(acked_seq, excluded.acked_seq), "
+                "acked_total = acked_total + excluded.acked_total, updated_at = excluded.updated_at",
+                (consumer, max(seq_list), acked, time.time()),
+            )
+        return acked
+
+    def dead_letter(self, seq: int, error: str | None = None, consumer: str = DEFAULT_CONSUMER) -> bool:
+        """Move a claimed action to ``dead_letters`` and count it as acked, so it is never redelivered."""
+        with self._transaction():
+            row = self._conn.execute("SELECT body, attempts FROM actions WHERE seq = ? AND consumer = ?", (seq, consumer)).fetchone()
+            if row is None:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dead_letters (seq, body, attempts, error, failed_at) VALUES (?, ?, ?, ?, ?)",
+                (seq, row[0], row[1], error, time.time()),
+            )
+            self._conn.execute("DELETE FROM actions WHERE seq = ?", (seq,))
+            self._conn.execute(
+                "INSERT INTO consumer_offsets (consumer, acked_seq, acked_total, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(consumer) DO UPDATE SET acked_seq = MAX(acked_seq, excluded.acked_seq), "
+                "acked_total = acked_total + 1, updated_at = excluded.updated_at",
+                (consumer, seq, time.time()),
+            )
+        return True
+
+    def dead_letters(self, limit: int = 100) -> list[dict[str, Any]]:
+        rows = self._conn.execute("SELECT seq, body, attempts, error, failed_at FROM dead_letters ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+        return [{"seq": seq, "action": json.loads(body), "attempts": attempts, "error": error, "failed_at": failed_at} for seq, body, attempts, error, failed_at in rows]
+
+    def extend(self, seqs: Iterable[int], consumer: str = DEFAULT_CONSUMER) -> int:
+        """Renew the lease on actions ``consumer`` still holds; acked or re-claimed ones are skipped."""
+        until = time.time() + self.lease_seconds
+        with self._transaction():
+            return sum(
+                self._conn.execute("UPDATE actions SET lease_until = ? WHERE seq = ? AND consumer = ?", (until, seq, consumer)).rowcount
+                for seq in seqs
+            )
+
+    def release(self, seqs: Iterable[int], consumer: str = DEFAULT_CONSUMER) -> None:
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE actions SET consumer = NULL, lease_until = NULL WHERE seq = ? AND consumer = ?",
+                [(seq, consumer) for seq in seqs],
+            )
+
+    def offset(self, consumer: str = DEFAULT_CONSUMER) -> int:
+        row = self._conn.execute("SELECT acked_seq FROM consumer_offsets WHERE consumer = ?", (consumer,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def depth(self) -> int:
+        return int(self._conn.execute("SELECT COUNT(*) FROM actions").fetchone()[0])
+
+    def _transaction(self) -> Transaction:
+        return Transaction(self._conn)
@@ -0,0 +1,567 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .action_queue import ActionQueue
+from .capture import MessageCapture
+from .config import QAConfig
+from .debug_metadata import DebugMetadataParser
+from .digest import build_digest, dedupe_messages, estimate_tokens
+from .fake_client import FakeClient, echo_responder
+from .provider_fallback import ProviderFallbackManager
+from .providers import DEFAULT_MODELS, resolve_provider
+from .test_engine import MessageEvaluator, evaluate_message
+from .source_scanner import BUTTON_PATTERNS, COMMAND_PATTERNS, MAX_FILE_SIZE_BYTES, SKIP_DIRS, SOURCE_SUFFIXES, merge_symbols, scan_repository
+
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 1) if seconds > 0 else float("inf")
+
+
+def _legacy_json_enqueue(path: Path, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        queued = json.loads(path.read_text(encoding="utf-8")) if path.exists() else []
+        queued.append({"type": "send_command", "payload": {"text": f"/start {i}"}})
+        path.write_text(json.dumps(queued, indent=2), encoding="utf-8")
+    return time.perf_counter() - started
+
+
+def bench_queue(producers: int = 4, actions_per_producer: int = 2000, legacy_actions: int = 500) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "queue.sqlite3"
+        ActionQueue(db_path).close()
+        barrier = threading.Barrier(producers + 1)
+
+        def produce(worker: int) -> None:
+            queue = ActionQueue(db_path)
+            try:
+                barrier.wait()
+                for i in range(actions_per_producer):
+                    queue.enqueue({"type": "send_command", "payload": {"text": f"/start {worker}-{i}"}})
+            finally:
+                queue.close()
+
+        threads = [threading.Thread(target=produce, args=(w,)) for w in range(producers)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        enqueue_seconds = time.perf_counter() - started
+
+        queue = ActionQueue(db_path)
+        total = producers * actions_per_producer
+        started = time.perf_counter()
+        drained = 0
+        while True:
+            claimed = queue.claim(limit=100)
+            if not claimed:
+                break
+            queue.ack(item.seq for item in claimed)
+            drained += len(claimed)
+        drain_seconds = time.perf_counter() - started
+        queue.close()
+
+        legacy_seconds = _legacy_json_enqueue(Path(tmp) / "queue.json", legacy_actions)
+
+    return {
+        "producers": producers,
+        "enqueued": total,
+        "enqueue_seconds": round(enqueue_seconds, 4),
+        "enqueue_per_second": _rate(total, enqueue_seconds),
+        "drained": drained,
+        "claim_ack_per_second": _rate(drained, drain_seconds),
+        "legacy_json_enqueued": legacy_actions,
+        "legacy_json_enqueue_per_second": _rate(legacy_actions, legacy_seconds),
+    }
+
+
+def _latency_summary(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"mean_ms": 0.0, "max_ms": 0.0}
+    return {"mean_ms": round(statistics.fmean(samples) * 1000, 2), "max_ms": round(max(samples) * 1000, 2)}
+
+
+async def _capture_events(commands: int, burst: int, reply_delay: float, send_interval: float) -> dict[str, Any]:
+    chat = "RunewagerBot"
+    client = FakeClient(responder=echo_responder(delay=reply_delay, replies=burst))
+    capture = MessageCapture(chat)
+    latencies: list[float] = []
+    seen: set[int] = set()
+    duplicates = 0
+    stop = asyncio.Event()
+
+    async def consume() -> None:
+        nonlocal duplicates
+        while not (stop.is_set() and capture.queue.empty()):
+            for item in await capture.wait(0.05):
+                if item.message.outgoing:
+                    continue
+                if item.message.id in seen:
+                    duplicates += 1
+                    continue
+                seen.add(item.message.id)
+                latencies.append((datetime.now(timezone.utc) - item.message.date).total_seconds())
+
+    async with client:
+        capture.attach(client)
+        consumer = asyncio.ensure_future(consume())
+        for i in range(commands):
+            await client.send_message(chat, f"/start {i}")
+            await asyncio.sleep(send_interval)
+        await client.drain()
+        stop.set()
+        await consumer
+        capture.detach(client)
+    return {"captured": len(seen), "duplicates_logged": duplicates, **_latency_summary(latencies)}
+
+
+async def _capture_poll(commands: int, burst: int, reply_delay: float, send_interval: float, poll_interval: float) -> dict[str, Any]:
+    chat = "RunewagerBot"
+    client = FakeClient(responder=echo_responder(delay=reply_delay, replies=burst))
+    latencies: list[float] = []
+    seen: set[int] = set()
+    duplicates = 0
+    stop = asyncio.Event()
+
+    async def poll() -> None:
+        nonlocal duplicates
+        while True:
+            now = datetime.now(timezone.utc)
+            async for msg in client.get_chat_history(chat, limit=5):
+                if msg.outgoing:
+                    continue
+                if msg.id in seen:
+                    duplicates += 1
+                    continue
+                seen.add(msg.id)
+                latencies.append((now - msg.date).total_seconds())
+            if stop.is_set():
+                return
+            await asyncio.sleep(poll_interval)
+
+    async with client:
+        poller = asyncio.ensure_future(poll())
+        for i in range(commands):
+            await client.send_message(chat, f"/start {i}")
+            await asyncio.sleep(send_interval)
+        await client.drain()
+        stop.set()
+        await poller
+    return {"captured": len(seen), "duplicates_logged": duplicates, **_latency_summary(latencies)}
+
+
+def bench_capture(commands: int = 20, burst: int = 8, reply_delay: float = 0.005, send_interval: float = 0.05, poll_interval: float = 0.2) -> dict[str, Any]:
+    expected = commands * burst
+    events = asyncio.run(_capture_events(commands, burst, reply_delay, send_interval))
+    poll = asyncio.run(_capture_poll(commands, burst, reply_delay, send_interval, poll_interval))
+    for result in (events, poll):
+        result["dropped"] = expected - result["captured"]
+    return {"bot_replies": expected, "poll_interval": poll_interval, "events": events, "poll": poll}
+
+
+def _legacy_iter_source_files(repo_root: Path):
+    for path in sorted(repo_root.rglob("*")):
+        if any(part in SKIP_DIRS for part in path.parts):
+            continue
+        if not path.is_file() or path.suffix.lower() not in SOURCE_SUFFIXES:
+            continue
+        try:
+            if path.stat().st_size > MAX_FILE_SIZE_BYTES:
+                continue
+        except OSError:
+            continue
+        yield path
+
+
+def _legacy_discover(repo_root: Path) -> tuple[list[str], list[str]]:
+    # The pre-scanner discovery: two full rglob walks, every file read once per walk.
+    commands: set[str] = set()
+    for file in _legacy_iter_source_files(repo_root):
+        text = file.read_text(encoding="utf-8", errors="ignore")
+        for pattern in COMMAND_PATTERNS:
+            for match in pattern.findall(text):
+                cmd = match.strip()
+                if cmd:
+                    commands.add(cmd if cmd.startswith("/") else f"/{cmd}")
+    buttons: set[str] = set()
+    for file in _legacy_iter_source_files(repo_root):
+        text = file.read_text(encoding="utf-8", errors="ignore")
+        for pattern in BUTTON_PATTERNS:
+            for match in pattern.findall(text):
+                value = match.strip()
+                if value:
+                    buttons.add(value)
+    return sorted(commands or {"/start", "/help", "/qa_on", "/qa_off", "/qa_mode"}), sorted(buttons or {"profile", "admin_menu", "next_page", "confirm", "cancel"})
+
+
+def _synthetic_repo(root: Path, source_files: int, vendored_files: int) -> None:
+    body = (
+        '@bot.on_message(filters.command("start{i}"))\n'
+        "async def handler_{i}(client, message):\n"
+        '    await message.reply("Use /help or /profile_{i}", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(text="Open {i}", callback_data="open_{i}")]]))\n'
+        '    slash = "stats_{i}"\n'
+    ) * 20
+    for i in range(source_files):
+        path = root / "src" / f"pkg{i % 16}" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body.format(i=i), encoding="utf-8")
+    for i in range(vendored_files):
+        path = root / "node_modules" / f"dep{i % 64}" / "lib" / f"index_{i}.js"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("module.exports = function () { return '/not_a_command'; };\n", encoding="utf-8")
+
+
+def _timed(fn: Any) -> tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def bench_scan(repo_root: Path | None = None, source_files: int = 400, vendored_files: int = 4000, workers: int | None = None) -> dict[str, Any]:
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        root = repo_root or Path(tmp)
+        if repo_root is None:
+            _synthetic_repo(root, source_files, vendored_files)
+        legacy, legacy_seconds = _timed(lambda: _legacy_discover(root))
+        serial, serial_seconds = _timed(lambda: scan_repository(root))
+        pooled, pooled_seconds = _timed(lambda: scan_repository(root, workers=workers))
+        merged = merge_symbols(serial.values())
+        return {
+            "repo_root": str(repo_root) if repo_root else "synthetic",
+            "files_scanned": len(serial),
+            "commands": len(merged[0]),
+            "buttons": len(merged[1]),
+            "same_results": merged == legacy == merge_symbols(pooled.values()),
+            "legacy_s": round(legacy_seconds, 4),
+            "single_pass_s": round(serial_seconds, 4),
+            "single_pass_pool_s": round(pooled_seconds, 4),
+            "workers": workers,
+            "speedup_single_pass": round(legacy_seconds / serial_seconds, 2) if serial_seconds else None,
+            "speedup_pool": round(legacy_seconds / pooled_seconds, 2) if pooled_seconds else None,
+        }
+
+
+def _git_commit(root: Path, message: str) -> None:
+    git = ["git", "-C", str(root), "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run([*git, "add", "-A"], check=True, capture_output=True)
+    subprocess.run([*git, "commit", "-q", "--allow-empty", "-m", message], check=True, capture_output=True)
+
+
+def bench_impact(commands: int = 40, strength: int = 2) -> dict[str, Any]:
+    """``--impact`` full vs ``--reduce``d over a one-file change whose slice leaves out a ``must_include`` command."""
+    from .main import run_impact
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        subprocess.run(["git", "init", "-q", str(root)], check=True, capture_output=True)
+        names = [f"/cmd{i}" for i in range(commands)]
+        (root / "bot.py").write_text("".join(f'HELP_{i} = "{name}"\n' for i, name in enumerate(names)), encoding="utf-8")
+        capabilities = {
+            "commands": {"user": ["/start", *names], "admin": []},
+            "contexts": ["telegram_dm", "telegram_group", "telegram_channel"],
+            "must_include": [{"command": "/start", "context": "telegram_group", "role": "new_user"}, {"command": names[-1], "role": "admin"}],
+        }
+        (root / "bot_capabilities.json").write_text(json.dumps(capabilities), encoding="utf-8")
+        _git_commit(root, "base")
+        (root / "help.py").write_text(f'REPLY = "{names[0]} {names[-1]}"\n', encoding="utf-8")
+        _git_commit(root, "touch two commands")
+
+        config = QAConfig.from_args(repo_root=str(root), output_dir=str(root / "out"), dry_run=True)
+        kwargs = {"capabilities_path": root / "bot_capabilities.json", "use_cache": False}
+        full, full_seconds = _timed(lambda: run_impact(config, "HEAD~1..HEAD", **kwargs))
+        reduced, reduced_seconds = _timed(lambda: run_impact(config, "HEAD~1..HEAD", reduce_strength=strength, **kwargs))
+        scenarios = json.loads((root / "out" / "impacted_scenarios.json").read_text(encoding="utf-8"))["scenarios"]
+        impacted = {names[0], names[-1]}
+        return {
+            "impacted_commands": full["impacted_commands"],
+            "full_scenarios": full["impacted_scenarios"],
+            "reduced_scenarios": reduced["impacted_scenarios"],
+            "reduced_commands_impacted_only": all(set(s["commands"]) <= impacted for s in scenarios),
+            "pinned_row_kept": any(s["commands"] == [names[-1]] and s["role"] == "admin" for s in scenarios),
+            "scenario_reduction": reduced.get("scenario_reduction"),
+            "full_s": round(full_seconds, 4),
+            "reduced_s": round(reduced_seconds, 4),
+        }
+
+
+def _legacy_evaluate(text: str, capabilities: dict[str, Any]) -> dict[str, Any]:
+    # evaluate_message before the compiled evaluator: sets rebuilt and substring-scanned per message.
+    expected_success = set(capabilities.get("expected_success_messages", []))
+    expected_failure = set(capabilities.get("expected_failure_messages", []))
+    known_errors = set(capabilities.get("error_messages", []))
+    bugs: list[str] = []
+    missing_behavior: list[str] = []
+    unexpected_errors: list[str] = []
+    if expected_success and all(msg not in text for msg in expected_success):
+        missing_behavior.append("missing_expected_success_message")
+    if expected_failure and "error" in text.lower() and all(msg not in text for msg in expected_failure):
+        missing_behavior.append("missing_expected_failure_message")
+    if "error" in text.lower() and known_errors and all(err not in text for err in known_errors):
+        unexpected_errors.append("undocumented_error")
+    if "pending_action" in text and "error" in text.lower():
+        bugs.append("pending_action_state_error")
+    return {"bugs": bugs, "missing_behavior": missing_behavior, "unexpected_errors": unexpected_errors}
+
+
+def bench_evaluate(messages: int = 5000, patterns: int = 300) -> dict[str, Any]:
+    per_group = max(patterns // 3, 1)
+    capabilities = {
+        "expected_success_messages": [f"Success: step {i} completed" for i in range(per_group)],
+        "expected_failure_messages": [f"Error: step {i} failed, try again" for i in range(per_group)],
+        "error_messages": [f"ERR_CODE_{i:04d}" for i in range(per_group)],
+    }
+    texts = []
+    for i in range(messages):
+        if i % 3 == 0:
+            texts.append(f"Welcome back! Success: step {i % (per_group * 2)} completed. menu_id=main pending_action=none " * 2)
+        elif i % 3 == 1:
+            texts.append(f"Error: step {i % per_group} failed, try again later. error_code=ERR_CODE_{i % (per_group * 2):04d}")
+        else:
+            texts.append("Here is your profile overview with balance, level and recent activity. " * 3)
+    legacy, legacy_seconds = _timed(lambda: [_legacy_evaluate(t, capabilities) for t in texts])
+    compiled, compiled_seconds = _timed(lambda: [evaluate_message(t, capabilities) for t in texts])
+    evaluator = MessageEvaluator.from_capabilities(capabilities)
+    batch, batch_seconds = _timed(lambda: evaluator.evaluate_batch(texts))
+    return {
+        "messages": messages,
+        "patterns": per_group * 3,
+        "same_results": legacy == compiled,
+        "legacy_msgs_per_s": _rate(messages, legacy_seconds),
+        "compiled_msgs_per_s": _rate(messages, compiled_seconds),
+        "batch_msgs_per_s": _rate(messages, batch_seconds),
+        "speedup_batch": round(legacy_seconds / batch_seconds, 2) if batch_seconds else None,
+        "batch_totals": batch["totals"],
+    }
+
+
+def _legacy_debug_metadata(text: str, keys: tuple[str, ...]) -> dict[str, Any]:
+    # QAExecutor._extract_debug_metadata before the compiled parser, generalised to the declared keys.
+    metadata: dict[str, Any] = dict.fromkeys(keys)
+    for key in metadata:
+        marker = f"{key}:"
+        if marker in text:
+            metadata[key] = text.split(marker, 1)[1].split("\n", 1)[0].strip()
+    return metadata
+
+
+def bench_debug_metadata(messages: int = 20000, keys: int = 12) -> dict[str, Any]:
+    declared = tuple(["menu_id", "callback_id", "pending_action", "error_code"] + [f"trace_field_{i}" for i in range(max(keys - 4, 0))])[:keys]
+    corpus = []
+    for i in range(messages):
+        lines = [f"Reply {i}: here is the balance overview for your account.", "Use the buttons below to continue."]
+        for j, key in enumerate(declared):
+            if (i + j) % 3 == 0:
+                lines.append(f"{key}: value_{i}_{j}")
+        corpus.append("\n".join(lines))
+    parser = DebugMetadataParser(declared)
+    legacy, legacy_seconds = _timed(lambda: [_legacy_debug_metadata(text, declared) for text in corpus])
+    compiled, compiled_seconds = _timed(lambda: [parser.parse(text) for text in corpus])
+    structured = [f"Done\n{declared[0]}=main {declared[1]}=\"open {i}\"\n{json.dumps({declared[3]: f'E{i}'})}" for i in range(messages)]
+    _, structured_seconds = _timed(lambda: [parser.parse(text) for text in structured])
+    return {
+        "messages": messages,
+        "keys": len(declared),
+        "same_results": legacy == compiled,
+        "legacy_msgs_per_s": _rate(messages, legacy_seconds),
+        "compiled_msgs_per_s": _rate(messages, compiled_seconds),
+        "speedup": round(legacy_seconds / compiled_seconds, 2) if compiled_seconds else None,
+        "structured_msgs_per_s": _rate(messages, structured_seconds),
+    }
+
+
+def _synthetic_logs(messages: int, errors: int, actions: int) -> tuple[dict[str, list[Any]], dict[str, Any]]:
+    capabilities = {
+        "expected_success_messages": ["Bet placed", "Balance updated", "Welcome back"],
+        "expected_failure_messages": ["Error: insufficient balance", "Error: try again later"],
+        "error_messages": ["ERR_BALANCE", "ERR_TIMEOUT", "ERR_PERMISSION"],
+    }
+    replies = [
+        "Bet placed: {i} RW on coinflip\nmenu_id: bets",
+        "Balance updated, you now hold {i} RW\nmenu_id: wallet",
+        "Welcome back! Pick a game below.\nmenu_id: main_menu",
+        "Error: insufficient balance for bet #{i}\nerror_code: ERR_BALANCE",
+        "Error: pending_action confirm_{i} expired\nerror_code: ERR_STALE_ACTION",
+        "Leaderboard page {i}: top players this week",
+    ]
+    stamp = "2026-01-01T00:00:{:02d}.{:06d}+00:00"
+    message_log = [
+        {
+            "timestamp": stamp.format(i % 60, i),
+            "message_id": 1000 + i,
+            "text": replies[i % len(replies)].format(i=i),
+            "buttons": ["Play", "Wallet", "Help"],
+            "callbacks": ["play", "wallet", "help"],
+            "mode": "user",
+            "bot": "runewager",
+            "debug_metadata": {"menu_id": "main_menu", "callback_id": None, "pending_action": None, "error_code": None},
+            "expected_success_messages": capabilities["expected_success_messages"],
+            "expected_failure_messages": capabilities["expected_failure_messages"],
+            "source": "event",
+            "edited": i % 7 == 0,
+            "edit_date": None,
+        }
+        for i in range(messages)
+    ]
+    # Errors arrive in bursts, as they do when one bad callback is retried.
+    error_log = [{"timestamp": stamp.format(i % 60, i), "error": "callback_failed", "callback_data": "wallet", "detail": f"TimeoutError: no answer for message {2000 + i // 25}"} for i in range(errors)]
+    action_log = [{"timestamp": stamp.format(i % 60, i), "action": "send_command", "text": ["/start", "/balance", "/bet 10"][i % 3], "message_id": 5000 + i, "mode": "user", "queued_ms": 3.1, "attempts": 1, "flood_wait_s": 0} for i in range(actions)]
+    return {"action_log": action_log, "message_log": message_log, "error_log": error_log}, capabilities
+
+
+def bench_digest(messages: int = 2000, errors: int = 300, actions: int = 500) -> dict[str, Any]:
+    logs, capabilities = _synthetic_logs(messages, errors, actions)
+    raw = json.dumps(logs, indent=2)
+    providers: dict[str, Any] = {}
+    for provider in DEFAULT_MODELS:
+        budget = resolve_provider(provider).digest_token_budget
+        digest, seconds = _timed(lambda: build_digest(logs, capabilities, budget))
+        encoded = json.dumps(digest, separators=(",", ":"))
+        providers[provider] = {
+            "budget_tokens": budget,
+            "digest_tokens": estimate_tokens(digest),
+            "digest_bytes": len(encoded.encode("utf-8")),
+            "within_budget": estimate_tokens(digest) <= budget,
+            "build_ms": round(seconds * 1000, 2),
+            "omitted": digest["omitted"],
+        }
+    return {
+        "messages": messages,
+        "errors": errors,
+        "actions": actions,
+        "raw_tokens": estimate_tokens(logs),
+        "raw_bytes": len(raw.encode("utf-8")),
+        "distinct_messages": len(dedupe_messages(logs["message_log"])),
+        "providers": providers,
+    }
+
+
+def _legacy_provider_update(path: Path, provider: str) -> None:
+    # ProviderFallbackManager before the lock: unlocked read, then an in-place rewrite.
+    raw = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {"provider_order": ["deepseek", "gemini", "chatgpt"], "cooldown_until": {}}
+    raw["cooldown_until"][provider] = datetime.now(timezone.utc).isoformat()
+    raw["last_failure_provider"] = provider
+    path.write_text(json.dumps(raw, indent=2), encoding="utf-8")
+
+
+def _provider_worker(mode: str, path: str, worker: int, updates: int, start: Any, results: Any) -> None:
+    status_path = Path(path)
+    manager = None if mode == "legacy" else ProviderFallbackManager(status_path, in_memory=mode == "in_memory")
+    errors = 0
+    start.wait()
+    started = time.perf_counter()
+    for i in range(updates):
+        try:
+            if manager is None:
+                _legacy_provider_update(status_path, f"w{worker}_{i}")
+            else:
+                manager.pick_provider()
+                manager.mark_failure(f"w{worker}_{i}")
+        except ValueError:
+            # A reader caught a half-written file.
+            errors += 1
+    if manager is not None:
+        manager.close()
+    results.put((time.perf_counter() - started, errors, manager.counters["writes"] if manager else updates))
+
+
+def bench_provider_state(processes: int = 4, updates: int = 200) -> dict[str, Any]:
+    context = multiprocessing.get_context("fork")
+    result: dict[str, Any] = {"processes": processes, "updates_per_process": updates}
+    for mode in ("legacy", "locked", "in_memory"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "provider_status.json"
+            start, results = context.Event(), context.Queue()
+            workers = [context.Process(target=_provider_worker, args=(mode, str(path), w, updates, start, results)) for w in range(processes)]
+            for worker in workers:
+                worker.start()
+            start.set()
+            outcomes = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            final = json.loads(path.read_text(encoding="utf-8"))
+            recorded = sum(1 for name in final["cooldown_until"] if name.startswith("w"))
+        seconds = max(outcome[0] for outcome in outcomes)
+        total = processes * updates
+        result[mode] = {
+            "updates_per_second": _rate(total, seconds),
+            "lost_updates": total - recorded,
+            "read_errors": sum(outcome[1] for outcome in outcomes),
+            "file_writes": sum(outcome[2] for outcome in outcomes),
+        }
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the QA executor subsystems")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    queue = sub.add_parser("queue", help="Action queue throughput with concurrent producers")
+    queue.add_argument("--producers", type=int, default=4)
+    queue.add_argument("--actions", type=int, default=2000, help="Actions per producer")
+    queue.add_argument("--legacy-actions", type=int, default=500, help="Actions for the queue.json rewrite baseline")
+    capture = sub.add_parser("capture", help="Reply latency, duplicates and drops: update handlers vs history polling")
+    capture.add_argument("--commands", type=int, default=20)
+    capture.add_argument("--burst", type=int, default=8, help="Bot replies per command")
+    capture.add_argument("--poll-interval", type=float, default=0.2)
+    evaluate = sub.add_parser("evaluate", help="Message grading: per-message substring scans vs compiled automaton")
+    evaluate.add_argument("--messages", type=int, default=5000)
+    evaluate.add_argument("--patterns", type=int, default=300, help="Expected/known-error strings across the three groups")
+    debug = sub.add_parser("debug-metadata", help="Debug metadata extraction: per-key split vs compiled single pass")
+    debug.add_argument("--messages", type=int, default=20000)
+    debug.add_argument("--keys", type=int, default=12, help="Declared debug_metadata keys")
+    digest = sub.add_parser("digest", help="Brain export size: raw logs vs token-budgeted digest per provider")
+    digest.add_argument("--messages", type=int, default=2000)
+    digest.add_argument("--errors", type=int, default=300)
+    digest.add_argument("--actions", type=int, default=500)
+    providers = sub.add_parser("provider-state", help="Provider status contention: unlocked rewrite vs flock vs in-memory write-behind")
+    providers.add_argument("--processes", type=int, default=4)
+    providers.add_argument("--updates", type=int, default=200, help="pick_provider + mark_failure rounds per process")
+    impact = sub.add_parser("impact", help="--impact scenarios: full list vs --reduce covering set on a one-file change")
+    impact.add_argument("--commands", type=int, default=40, help="Commands defined in the generated repo")
+    impact.add_argument("--strength", type=int, default=2)
+    scan = sub.add_parser("scan", help="Source discovery: legacy double rglob vs single-pass pruned scanner")
+    scan.add_argument("--repo-root", default=None, help="Scan this tree instead of a generated one")
+    scan.add_argument("--source-files", type=int, default=400)
+    scan.add_argument("--vendored-files", type=int, default=4000, help="Files generated under node_modules")
+    scan.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.bench == "queue":
+        result = bench_queue(args.producers, args.actions, args.legacy_actions)
+    elif args.bench == "capture":
+        result = bench_capture(args.commands, args.burst, poll_interval=args.poll_interval)
+    elif args.bench == "evaluate":
+        result = bench_evaluate(args.messages, args.patterns)
+    elif args.bench == "debug-metadata":
+        result = bench_debug_metadata(args.messages, args.keys)
+    elif args.bench == "digest":
+        result = bench_digest(args.messages, args.errors, args.actions)
+    elif args.bench == "provider-state":
+        result = bench_provider_state(args.processes, args.updates)
+    elif args.bench == "impact":
+        result = bench_impact(args.commands, args.strength)
+    elif args.bench == "scan":
+        result = bench_scan(Path(args.repo_root) if args.repo_root else None, args.source_files, args.vendored_files, args.workers)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Any
 
 from .config import DEFAULT_BOT_NAME
+from .config_cache import CONFIG_CACHE
 
 
 @dataclass(frozen=True)
@@ -25,9 +26,11 @@ class BotRegistry:
         self.selection_path = root / "qa" / "state" / "selected_bot.json"
 
     def _read_json(self, path: Path, default: Any) -> Any:
-        if not path.exists():
-            return default
-        return json.loads(path.read_text(encoding="utf-8"))
+        return CONFIG_CACHE.load(path, default)
+
+    def _write_json(self, path: Path, data: Any) -> None:
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        CONFIG_CACHE.invalidate(path)
 
     def list_bots(self) -> dict[str, dict[str, Any]]:
         return self._read_json(self.registry_path, {})
@@ -36,30 +39,27 @@ class BotRegistry:
         self.registry_path.parent.mkdir(parents=True, exist_ok=True)
         self.selection_path.parent.mkdir(parents=True, exist_ok=True)
         if not self.registry_path.exists():
-            self.registry_path.write_text(
-                json.dumps(
-                    {
-                        DEFAULT_BOT_NAME: {
-                            "bot_username": "RunewagerBot",
-                            "repo_path": str(self.root),
-                            "capabilities_path": str(self.root / "qa" / "context" / "bot_capabilities.json"),
-                            "md_path": str(self.root / "RUNEWAGER_FUNCTIONALITY_MAP.md"),
-                            "repo_info_path": str(self.root / "qa" / "context" / "repo_info.json"),
-                        }
-                    },
-                    indent=2,
-                ),
-                encoding="utf-8",
+            self._write_json(
+                self.registry_path,
+                {
+                    DEFAULT_BOT_NAME: {
+                        "bot_username": "RunewagerBot",
+                        "repo_path": str(self.root),
+                        "capabilities_path": str(self.root / "qa" / "context" / "bot_capabilities.json"),
+                        "md_path": str(self.root / "RUNEWAGER_FUNCTIONALITY_MAP.md"),
+                        "repo_info_path": str(self.root / "qa" / "context" / "repo_info.json"),
+                    }
+                },
             )
         if not self.selection_path.exists():
-            self.selection_path.write_text(json.dumps({"selected_bot": DEFAULT_BOT_NAME}, indent=2), encoding="utf-8")
+            self._write_json(self.selection_path, {"selected_bot": DEFAULT_BOT_NAME})
 
     def select_bot(self, bot_name: str) -> None:
         bots = self.list_bots()
         if bot_name not in bots:
             raise ValueError(f"Unknown bot: {bot_name}")
         self.selection_path.parent.mkdir(parents=True, exist_ok=True)
-        self.selection_path.write_text(json.dumps({"selected_bot": bot_name}, indent=2), encoding="utf-8")
+        self._write_json(self.selection_path, {"selected_bot": bot_name})
 
     def selected_bot(self) -> str:
         data = self._read_json(self.selection_path, {"selected_bot": DEFAULT_BOT_NAME})
@@ -67,7 +67,11 @@ class BotRegistry:
 
     def load_bot(self, bot_name: str | None = None) -> BotConfig:
         name = bot_name or self.selected_bot()
-        bots = self.list_bots()
+        # Built once per registry version; the executor resolves its bot on every loop turn.
+        return CONFIG_CACHE.snapshot(self.registry_path, {}).derive(f"bot:{name}", lambda bots: self._bot_config(bots, name))
+
+    @staticmethod
+    def _bot_config(bots: dict[str, dict[str, Any]], name: str) -> BotConfig:
         if name not in bots:
             raise ValueError(f"Bot not registered: {name}")
         cfg = bots[name]
@@ -5,9 +5,16 @@ import json
 import time
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Callable
 
+from .action_queue import ActionQueue
 from .bot_registry import BotRegistry
+from .capabilities import load_capabilities
+from .digest import build_digest
+from .export_cursor import COMPRESSIONS, ConsumerCursor, Cursor, collect_delta, compression_for, encode_bundle
 from .provider_fallback import ProviderFallbackManager
+from .providers import resolve_provider
+from .response_cache import ResponseCache
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,36 +22,78 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--root", default="/var/www/html/Runewager", help="Project root")
     parser.add_argument("--bot", default=None, help="Bot name override")
     parser.add_argument("--export", default=None, help="Write export bundle JSON to this path")
+    parser.add_argument("--consumer", default=None, help="Export only entries this consumer has not acked yet (delta export)")
+    parser.add_argument("--since", default=None, help="Delta export from this cursor instead of the consumer's acked one")
+    parser.add_argument("--ack", default=None, help="Acknowledge a delta export's cursor.next for --consumer")
+    parser.add_argument("--auto-ack", action="store_true", help="Ack the delta export as soon as it is written")
+    parser.add_argument("--compress", choices=[*COMPRESSIONS, "none"], default=None, help="Bundle framing (default: from the --export suffix, .gz or .zst)")
+    parser.add_argument("--digest-for", default=None, help="Replace raw logs with a digest fitted to this AI provider's token budget")
+    parser.add_argument("--digest-model", default=None, help="Model override for --digest-for")
+    parser.add_argument("--cache-lookup", default=None, metavar="PROVIDER", help="Print the cached response to --payload for this provider (exit 1 on a miss)")
+    parser.add_argument("--cache-store", default=None, metavar="PROVIDER", help="Cache --response as this provider's answer to --payload")
+    parser.add_argument("--model", default="", help="Model for --cache-lookup/--cache-store")
+    parser.add_argument("--payload", default=None, help="Prompt or export bundle sent to the provider")
+    parser.add_argument("--response", default=None, help="Provider response JSON file for --cache-store")
+    parser.add_argument("--cache-stats", action="store_true", help="Print response cache hit/miss metrics")
     parser.add_argument("--queue", default=None, help="Queue action JSON file produced by AI brain")
     parser.add_argument("--provider-result", default=None, help="Mark provider result: deepseek:success|gemini:failure|chatgpt:failure")
     parser.add_argument("--pick-provider", action="store_true", help="Pick next provider by fallback policy")
     return parser.parse_args()
 
 
-def _latest_log_dir(root: Path, bot_name: str) -> Path | None:
-    base = root / "qa" / "logs" / bot_name
-    if not base.exists():
-        return None
-    folders = sorted([p for p in base.iterdir() if p.is_dir()])
-    return folders[-1] if folders else None
-
-
 def _read_json(path: Path, default: object) -> object:
     if not path.exists():
         return default
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def export_bundle(root: Path, bot_name: str, output: Path) -> None:
-    log_dir = _latest_log_dir(root, bot_name)
+def export_bundle(
+    root: Path,
+    bot_name: str,
+    output: Path,
+    consumer: str | None = None,
+    since: str | None = None,
+    auto_ack: bool = False,
+    compress: str | None = None,
+    digest_for: str | None = None,
+    digest_model: str | None = None,
+) -> dict[str, object]:
+    """Write the brain export bundle and return its ``cursor`` block.
+
+    Without ``consumer`` the bundle holds the newest day's logs in full. With
+    one, it holds only entries after the consumer's acked cursor (or
+    ``since``), spanning into newer days, and ``cursor.next`` must be passed to
+    ``ack_export`` once the brain has the bundle; until then the next export
+    repeats the same entries.
+
+    ``digest_for`` replaces the raw logs with ``qa_system.digest.build_digest``
+    output sized to that provider's ``digest_token_budget``.
+    """
+    cursors = ConsumerCursor(root, bot_name, consumer) if consumer else None
+    start = Cursor.decode(since) if since else cursors.acked if cursors else Cursor(bot_name)
+    if start.bot != bot_name:
+        raise ValueError(f"cursor belongs to bot {start.bot!r}, not {bot_name!r}")
+    logs, log_dirs, position = collect_delta(root, bot_name, start)
+    cursor = {
+        "consumer": consumer,
+        "from": start.encode() if start.day else None,
+        "next": position.encode() if position.day else None,
+        "entries": {name: len(entries) for name, entries in logs.items()},
+    }
+    if digest_for:
+        provider = resolve_provider(digest_for, digest_model)
+        capabilities = load_capabilities(BotRegistry(root).load_bot(bot_name).capabilities_path)
+        content: dict[str, object] = {"digest": {"provider": provider.provider, "model": provider.model, **build_digest(logs, capabilities, provider.digest_token_budget)}}
+    else:
+        content = dict(logs)
     payload = {
         "exported_at": datetime.now(timezone.utc).isoformat(),
         "root": str(root),
         "bot": bot_name,
-        "log_dir": str(log_dir) if log_dir else None,
-        "action_log": _read_json((log_dir / "action_log.json") if log_dir else root / "missing", []),
-        "message_log": _read_json((log_dir / "message_log.json") if log_dir else root / "missing", []),
-        "error_log": _read_json((log_dir / "error_log.json") if log_dir else root / "missing", []),
+        "log_dir": str(log_dirs[-1]) if log_dirs else None,
+        "log_dirs": [str(path) for path in log_dirs],
+        **content,
+        "cursor": cursor,
         "state": _read_json(root / "qa" / "state" / "executor_state.json", {"qa_enabled": False, "mode": "user", "telegram_default": True}),
         "provider_status": _read_json(root / "qa" / "state" / "provider_status.json", {}),
         "protocol": {
@@ -53,19 +102,33 @@ def export_bundle(root: Path, bot_name: str, output: Path) -> None:
         },
     }
     output.parent.mkdir(parents=True, exist_ok=True)
-    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.write_bytes(encode_bundle(payload, compression_for(output, compress)))
+    tmp.replace(output)
+    if cursors is not None and position.day:
+        if auto_ack:
+            cursors.ack(position.encode())
+        else:
+            cursors.exported(position)
+    return cursor
+
+
+def ack_export(root: Path, bot_name: str, consumer: str, token: str) -> dict[str, object]:
+    cursors = ConsumerCursor(root, bot_name, consumer)
+    cursors.ack(token)
+    return cursors.as_dict()
 
 
 def queue_actions(root: Path, bot_name: str, action_file: Path) -> None:
-    queue_path = root / "qa" / "actions" / bot_name / "queue.json"
     actions = json.loads(action_file.read_text(encoding="utf-8"))
-    queue_path.parent.mkdir(parents=True, exist_ok=True)
-    current = _read_json(queue_path, [])
     for action in actions:
         if "bot_name" not in action:
             action["bot_name"] = bot_name
-        current.append(action)
-    queue_path.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    queue = ActionQueue.for_bot(root, bot_name)
+    try:
+        queue.enqueue_many(actions)
+    finally:
+        queue.close()
 
 
 def apply_provider_result(root: Path, result: str) -> None:
@@ -77,6 +140,57 @@ def apply_provider_result(root: Path, result: str) -> None:
         manager.mark_failure(provider, rate_limited=True)
 
 
+def ask_brain(
+    root: Path,
+    payload: Any,
+    call: Callable[[str, Any], Any],
+    model: str = "",
+    cache: ResponseCache | None = None,
+) -> tuple[str, Any, bool]:
+    """Answer ``payload`` from the response cache or ``call(provider, payload)``, following the fallback order.
+
+    Each provider picked by ``ProviderFallbackManager`` is looked up in the
+    cache before it is called, so retries and reruns of an identical payload
+    cost nothing. A failed call puts the provider on cooldown and the next
+    one is tried. Returns ``(provider, response, cache_hit)``.
+    """
+    # Status updates from this walk are coalesced and written behind, at the latest on close.
+    manager = ProviderFallbackManager(root / "qa" / "state" / "provider_status.json", in_memory=True)
+    owned = cache is None
+    cache = cache or ResponseCache.for_root(root)
+    try:
+        tried: set[str] = set()
+        while True:
+            provider = manager.pick_provider()
+            if provider is None or provider in tried:
+                raise RuntimeError(f"no AI provider available (tried {', '.join(sorted(tried)) or 'none'})")
+            tried.add(provider)
+            hit = cache.get(provider, model, payload)
+            if hit is not None:
+                return provider, hit.response, True
+            try:
+                response = call(provider, payload)
+            except Exception:
+                manager.mark_failure(provider, rate_limited=True)
+                continue
+            manager.mark_success(provider)
+            cache.put(provider, model, payload, response)
+            return provider, response, False
+    finally:
+        manager.close()
+        if owned:
+            cache.close()
+
+
+def _load_payload(path: Path) -> Any:
+    text = path.read_text(encoding="utf-8")
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Plain-text prompts are cached as text.
+        return text
+
+
 def pick_provider(root: Path) -> str:
     manager = ProviderFallbackManager(root / "qa" / "state" / "provider_status.json")
     provider = manager.pick_provider()
@@ -94,8 +208,34 @@ def main() -> None:
     registry.ensure_defaults()
     bot_name = args.bot or registry.selected_bot()
 
+    if (args.ack or args.auto_ack) and not args.consumer:
+        raise SystemExit("--ack and --auto-ack need --consumer")
     if args.export:
-        export_bundle(root, bot_name, Path(args.export))
+        cursor = export_bundle(root, bot_name, Path(args.export), args.consumer, args.since, args.auto_ack, args.compress, args.digest_for, args.digest_model)
+        if args.consumer:
+            print(json.dumps(cursor, indent=2))
+    if args.ack:
+        print(json.dumps(ack_export(root, bot_name, args.consumer, args.ack), indent=2))
+    if args.cache_lookup or args.cache_store or args.cache_stats:
+        cache = ResponseCache.for_root(root)
+        try:
+            if args.cache_lookup or args.cache_store:
+                if not args.payload:
+                    raise SystemExit("--cache-lookup and --cache-store need --payload")
+                payload = _load_payload(Path(args.payload))
+            if args.cache_store:
+                if not args.response:
+                    raise SystemExit("--cache-store needs --response")
+                cache.put(args.cache_store, args.model, payload, _load_payload(Path(args.response)))
+            if args.cache_lookup:
+                hit = cache.get(args.cache_lookup, args.model, payload)
+                if hit is None:
+                    raise SystemExit(1)
+                print(json.dumps(hit.response, indent=2))
+            if args.cache_stats:
+                print(json.dumps(cache.stats(), indent=2))
+        finally:
+            cache.close()
     if args.queue:
         queue_actions(root, bot_name, Path(args.queue))
     if args.provider_result:
@@ -1,18 +1,19 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any
 
+from .config_cache import CONFIG_CACHE, Snapshot
+
 
 def load_json(path: Path, default: Any) -> Any:
-    if not path.exists():
-        return default
-    return json.loads(path.read_text(encoding="utf-8"))
+    """Parsed JSON at ``path`` (read-only, re-read only when the file changes), or ``default``."""
+    return CONFIG_CACHE.load(path, default)
 
 
-def load_capabilities(path: Path) -> dict[str, Any]:
-    return load_json(
+def capabilities_snapshot(path: Path) -> Snapshot:
+    """Versioned capabilities snapshot; compile helpers with ``snapshot.derive``."""
+    return CONFIG_CACHE.snapshot(
         path,
         {
             "commands": {"user": ["/start"], "admin": ["/admin"]},
@@ -31,5 +32,9 @@ def load_capabilities(path: Path) -> dict[str, Any]:
     )
 
 
+def load_capabilities(path: Path) -> dict[str, Any]:
+    return capabilities_snapshot(path).data
+
+
 def load_repo_info(path: Path) -> dict[str, Any]:
     return load_json(path, {"name": "unknown", "version": "unknown", "default_branch": "main"})
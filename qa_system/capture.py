@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+DEFAULT_INITIAL_FETCH = 5
+DEFAULT_MAX_DELTA_FETCH = 500
+
+
+@dataclass(frozen=True)
+class CapturedMessage:
+    key: str
+    message: Any
+    edited: bool
+    source: str
+    received_at: float
+
+
+def _pyrogram_handler(kind: str, callback: Callable[..., Any], chat: str | int | None = None) -> Any:
+    try:
+        from pyrogram import filters
+        from pyrogram.handlers import EditedMessageHandler, MessageHandler
+    except Exception as exc:  # pragma: no cover
+        raise RuntimeError("pyrogram is required for event-driven capture") from exc
+    handler_cls = EditedMessageHandler if kind == "edited_message" else MessageHandler
+    return handler_cls(callback, filters.chat(chat) if chat is not None else None)
+
+
+class MessageCapture:
+    """Collects a bot chat's new and edited messages through client handlers.
+
+    Updates are pushed into an asyncio queue as they arrive. ``delta_fetch``
+    backfills anything the handlers missed (startup, reconnects) by walking
+    chat history down to the last seen ``message_id``.
+    """
+
+    def __init__(self, chat: str | int, maxsize: int = 0, key: str | None = None, queue: asyncio.Queue | None = None) -> None:
+        self.chat = chat
+        self.key = key or str(chat)
+        # Captures for several sessions of the same bot may share one queue.
+        self.queue: asyncio.Queue[CapturedMessage] = queue if queue is not None else asyncio.Queue(maxsize=maxsize)
+        self.last_seen_id = 0
+        self.last_event_at = time.monotonic()
+        # When delta_fetch last ran; a quiet chat is re-checked once per fallback interval, not every loop.
+        self.last_fetch_at = self.last_event_at
+        self._handlers: list[Any] = []
+
+    def attach(self, app: Any, group: int = 0) -> None:
+        factory = getattr(app, "make_handler", _pyrogram_handler)
+        for kind, callback in (("message", self._on_message), ("edited_message", self._on_edited)):
+            handler = factory(kind, callback, self.chat)
+            app.add_handler(handler, group)
+            self._handlers.append((handler, group))
+
+    def detach(self, app: Any) -> None:
+        for handler, group in self._handlers:
+            app.remove_handler(handler, group)
+        self._handlers.clear()
+
+    async def _on_message(self, client: Any, message: Any) -> None:
+        if message.id <= self.last_seen_id:
+            return
+        self._push(message, edited=False, source="event")
+
+    async def _on_edited(self, client: Any, message: Any) -> None:
+        self._push(message, edited=True, source="event")
+
+    def _push(self, message: Any, edited: bool, source: str) -> None:
+        if not edited:
+            self.last_seen_id = max(self.last_seen_id, message.id)
+        self.last_event_at = time.monotonic()
+        self.queue.put_nowait(CapturedMessage(key=self.key, message=message, edited=edited, source=source, received_at=self.last_event_at))
+
+    async def delta_fetch(self, app: Any, initial_limit: int = DEFAULT_INITIAL_FETCH, max_fetch: int = DEFAULT_MAX_DELTA_FETCH) -> int:
+        limit = initial_limit if self.last_seen_id == 0 else max_fetch
+        self.last_fetch_at = time.monotonic()
+        missed: list[Any] = []
+        async for message in app.get_chat_history(self.chat, limit=limit):
+            if message.id <= self.last_seen_id:
+                break
+            missed.append(message)
+        for message in reversed(missed):
+            if message.id > self.last_seen_id:
+                self._push(message, edited=False, source="delta")
+        return len(missed)
+
+    def drain(self) -> list[CapturedMessage]:
+        items: list[CapturedMessage] = []
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    async def wait(self, timeout: float) -> list[CapturedMessage]:
+        if self.queue.empty():
+            try:
+                first = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            return [first, *self.drain()]
+        return self.drain()
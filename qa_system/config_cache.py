@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import copy
+import itertools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+# A file modified this recently may be rewritten again within the same mtime
+# tick without any stat field changing, so its bytes are compared on each read.
+RACY_WINDOW_NS = 2_000_000_000
+
+_MISSING = (-1, -1, -1)
+
+
+def _immutable(self: Any, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError(f"{type(self).__name__} is a read-only config snapshot; copy it first")
+
+
+class FrozenDict(dict):
+    """A ``dict`` that refuses mutation. ``dict(d)``, ``d.copy()`` and ``copy.copy``/``copy.deepcopy`` give mutable copies."""
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        return hash(frozenset(self.items()))
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict:
+        return {copy.deepcopy(k, memo): copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The default pickle protocol rebuilds dict subclasses item by item through __setitem__.
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A ``list`` that refuses mutation; concatenation and ``copy.copy``/``copy.deepcopy`` return plain lists."""
+
+    __setitem__ = __delitem__ = append = extend = insert = pop = remove = clear = sort = reverse = __iadd__ = __imul__ = _immutable
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        return hash(tuple(self))
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list:
+        return [copy.deepcopy(v, memo) for v in self]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    path: Path
+    version: int
+    data: Any
+    stat_key: tuple[int, int, int]
+    raw: bytes | None
+    racy: bool
+    _derived: dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    def derive(self, name: str, factory: Callable[[Any], Any]) -> Any:
+        """``factory(self.data)``, built once per snapshot version.
+
+        Compiled helpers (parsers, evaluators, rate limits) hang off the snapshot
+        they were built from, so a reload invalidates them for free.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            value = self._derived[name] = factory(self.data)
+            return value
+
+
+class ConfigCache:
+    """Parsed JSON config files, re-read only when they change on disk.
+
+    Each lookup costs one ``stat``: the cached snapshot is reused while the
+    file's ``(mtime_ns, inode, size)`` is unchanged, and files written within
+    the last couple of seconds are additionally byte-compared so a same-size
+    rewrite inside one mtime tick is not missed. Snapshots are deeply frozen
+    and carry a process-wide increasing ``version``; a new version is issued
+    only when the content actually changed.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: dict[Path, Snapshot] = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "reloads": 0, "rechecks": 0}
+
+    def snapshot(self, path: Path, default: Any = None) -> Snapshot:
+        path = Path(path)
+        try:
+            st = os.stat(path)
+            stat_key = (st.st_mtime_ns, st.st_ino, st.st_size)
+        except FileNotFoundError:
+            stat_key = _MISSING
+        with self._lock:
+            cached = self._snapshots.get(path)
+            if cached is not None and cached.stat_key == stat_key and not cached.racy:
+                self.counters["hits"] += 1
+                return cached
+            if stat_key == _MISSING:
+                if cached is not None and cached.stat_key == _MISSING:
+                    self.counters["hits"] += 1
+                    return cached
+                return self._store(path, freeze(default), _MISSING, None)
+            raw = path.read_bytes()
+            racy = time.time_ns() - stat_key[0] < RACY_WINDOW_NS
+            if cached is not None and cached.raw == raw:
+                self.counters["rechecks"] += 1
+                if cached.stat_key != stat_key or cached.racy != racy:
+                    # Same bytes (touched, or still settling): keep the version and compiled helpers.
+                    cached = Snapshot(cached.path, cached.version, cached.data, stat_key, raw, racy, cached._derived)
+                    self._snapshots[path] = cached
+                return cached
+            return self._store(path, freeze(json.loads(raw.decode("utf-8"))), stat_key, raw, racy)
+
+    def _store(self, path: Path, data: Any, stat_key: tuple[int, int, int], raw: bytes | None, racy: bool = False) -> Snapshot:
+        self.counters["reloads"] += 1
+        snapshot = Snapshot(path=path, version=next(self._versions), data=data, stat_key=stat_key, raw=raw, racy=racy)
+        self._snapshots[path] = snapshot
+        return snapshot
+
+    def load(self, path: Path, default: Any = None) -> Any:
+        return self.snapshot(path, default).data
+
+    def invalidate(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(Path(path), None)
+
+
+CONFIG_CACHE = ConfigCache()
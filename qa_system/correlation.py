@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+DEFAULT_REPLY_TIMEOUT = 30.0
+DEFAULT_SETTLE = 5.0
+PERCENTILES = (50, 95, 99)
+KINDS = ("command", "callback")
+LATENCY_LOG = "latency_log.json"
+SUMMARY_FILENAME = "latency_summary.json"
+
+
+def command_label(text: str) -> str:
+    """``/start foo`` and ``/start@RunewagerBot`` are both measured as ``/start``."""
+    head = text.split(maxsplit=1)[0] if text.strip() else ""
+    return head.split("@", 1)[0] if head.startswith("/") else head
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty sample."""
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def distribution(samples: Iterable[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {**{f"p{q}": round(percentile(ordered, q), 2) for q in PERCENTILES}, "max": round(ordered[-1], 2)}
+
+
+@dataclass
+class PendingSend:
+    chat: str
+    message_id: int
+    kind: str
+    label: str
+    sent_at: float
+    first_reply_at: float | None = None
+    last_update_at: float | None = None
+    reply_ids: list[int] = field(default_factory=list)
+    edits: int = 0
+
+    def as_entry(self, timed_out: bool) -> dict[str, Any]:
+        def ms(at: float | None) -> float | None:
+            return None if at is None else round((at - self.sent_at) * 1000, 2)
+
+        return {
+            "kind": self.kind,
+            "label": self.label,
+            "chat": self.chat,
+            "message_id": self.message_id,
+            "first_reply_ms": ms(self.first_reply_at),
+            "final_edit_ms": ms(self.last_update_at),
+            "replies": len(self.reply_ids),
+            "edits": self.edits,
+            "timed_out": timed_out,
+        }
+
+
+@dataclass
+class LatencyStats:
+    """Per-(kind, label) latency samples in milliseconds, summarised as percentiles."""
+
+    first_reply: dict[tuple[str, str], list[float]] = field(default_factory=dict)
+    final_edit: dict[tuple[str, str], list[float]] = field(default_factory=dict)
+    sends: dict[tuple[str, str], int] = field(default_factory=dict)
+    timeouts: dict[tuple[str, str], int] = field(default_factory=dict)
+
+    def add(self, entry: dict[str, Any]) -> None:
+        key = (entry["kind"], entry["label"])
+        self.sends[key] = self.sends.get(key, 0) + 1
+        if entry.get("first_reply_ms") is None:
+            self.timeouts[key] = self.timeouts.get(key, 0) + 1
+            return
+        self.first_reply.setdefault(key, []).append(float(entry["first_reply_ms"]))
+        self.final_edit.setdefault(key, []).append(float(entry["final_edit_ms"]))
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        out: dict[str, dict[str, Any]] = {f"{kind}s": {} for kind in KINDS}
+        for kind, label in sorted(self.sends):
+            key = (kind, label)
+            out.setdefault(f"{kind}s", {})[label] = {
+                "sends": self.sends[key],
+                "replied": len(self.first_reply.get(key, [])),
+                "timeouts": self.timeouts.get(key, 0),
+                "first_reply_ms": distribution(self.first_reply.get(key, [])),
+                "final_edit_ms": distribution(self.final_edit.get(key, [])),
+            }
+        return out
+
+
+class ResponseCorrelator:
+    """Links bot replies and edits back to the send that triggered them.
+
+    ``track`` registers an outgoing command or a callback press (keyed by the
+    pressed bot message; ``answered`` stamps the callback answer as its first
+    reply, and later edits of that message are attributed to it). ``observe``
+    attributes each incoming message in the same chat (``chat`` is the
+    executor's per-session capture key, since message ids are per account):
+    an explicit ``reply_to_message_id`` wins, otherwise the oldest send still
+    waiting for its first reply, otherwise the newest send already answered
+    (follow-up messages). Edits are attributed through the reply they modify.
+
+    A send is finalised once it has been quiet for ``settle`` seconds after
+    its last reply/edit, or ``timeout`` seconds after sending. First-reply
+    latency runs to the first attributed message and final-edit latency to
+    the last reply or edit; sends with no reply count as timeouts.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_REPLY_TIMEOUT, settle: float = DEFAULT_SETTLE) -> None:
+        self.timeout = timeout
+        self.settle = settle
+        self._pending: OrderedDict[tuple[str, int], PendingSend] = OrderedDict()
+        self._replies: dict[tuple[str, int], PendingSend] = {}
+        self._finished: list[dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, chat: str, message_id: int, kind: str, label: str, sent_at: float) -> PendingSend:
+        previous = self._pending.pop((chat, message_id), None)
+        if previous is not None:
+            # A new press on the same message closes the previous one.
+            self._finished.append(self._close(previous))
+        pending = PendingSend(chat=chat, message_id=message_id, kind=kind, label=label, sent_at=sent_at)
+        self._pending[(chat, message_id)] = pending
+        return pending
+
+    @staticmethod
+    def answered(pending: PendingSend, at: float) -> None:
+        if pending.first_reply_at is None:
+            pending.first_reply_at = at
+        pending.last_update_at = max(pending.last_update_at or at, at)
+
+    def _candidate(self, chat: str, message: Any, received_at: float) -> PendingSend | None:
+        reply_to = getattr(message, "reply_to_message_id", None)
+        if reply_to is not None and (chat, reply_to) in self._pending:
+            return self._pending[(chat, reply_to)]
+        answered: PendingSend | None = None
+        for pending in self._pending.values():
+            if pending.chat != chat or pending.sent_at > received_at or received_at - pending.sent_at > self.timeout:
+                continue
+            if pending.first_reply_at is None:
+                return pending
+            answered = pending
+        return answered
+
+    def observe(self, chat: str, message: Any, received_at: float, edited: bool = False) -> PendingSend | None:
+        if getattr(message, "outgoing", False):
+            return None
+        pressed = self._pending.get((chat, message.id)) if edited else None
+        if pressed is not None and pressed.kind == "callback" and received_at >= pressed.sent_at:
+            pressed.last_update_at = max(pressed.last_update_at or received_at, received_at)
+            pressed.edits += 1
+            return pressed
+        owner = self._replies.get((chat, message.id))
+        if owner is not None:
+            owner.last_update_at = max(owner.last_update_at or received_at, received_at)
+            owner.edits += int(edited)
+            return owner
+        if edited:
+            return None
+        pending = self._candidate(chat, message, received_at)
+        if pending is None:
+            return None
+        if pending.first_reply_at is None:
+            pending.first_reply_at = received_at
+        pending.last_update_at = max(pending.last_update_at or received_at, received_at)
+        pending.reply_ids.append(message.id)
+        self._replies[(chat, message.id)] = pending
+        return pending
+
+    def expire(self, now: float, force: bool = False) -> list[dict[str, Any]]:
+        """Finalise settled or timed-out sends, returning their latency log entries."""
+        done, self._finished = self._finished, []
+        for key, pending in list(self._pending.items()):
+            timed_out = now - pending.sent_at >= self.timeout
+            settled = pending.last_update_at is not None and now - pending.last_update_at >= self.settle
+            if not (force or timed_out or settled):
+                continue
+            del self._pending[key]
+            done.append(self._close(pending))
+        return done
+
+    def _close(self, pending: PendingSend) -> dict[str, Any]:
+        for reply_id in pending.reply_ids:
+            self._replies.pop((pending.chat, reply_id), None)
+        return pending.as_entry(timed_out=pending.first_reply_at is None)
+
+
+def write_latency_summary(day_dir: Path, payload: dict[str, Any]) -> Path:
+    path = day_dir / SUMMARY_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def latest_latency_summary(root: Path, bot_name: str) -> dict[str, Any] | None:
+    """The newest day's ``latency_summary.json`` under ``qa/logs/<bot_name>``, if any."""
+    bot_logs = root / "qa" / "logs" / bot_name
+    if not bot_logs.is_dir():
+        return None
+    for day_dir in sorted((d for d in bot_logs.iterdir() if d.is_dir()), reverse=True):
+        path = day_dir / SUMMARY_FILENAME
+        if path.exists():
+            return {"day": day_dir.name, **json.loads(path.read_text(encoding="utf-8"))}
+    return None
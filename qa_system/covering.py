@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations, product
+from math import prod
+from typing import Any, Mapping, Sequence
+
+
+@dataclass(frozen=True)
+class Factor:
+    name: str
+    values: tuple[str, ...]
+    weights: tuple[float, ...] = ()
+
+    def weight(self, index: int) -> float:
+        return self.weights[index] if self.weights else 1.0
+
+
+def factor(name: str, values: Sequence[str], weights: Mapping[str, float] | None = None) -> Factor:
+    unique = tuple(dict.fromkeys(values))
+    if not unique:
+        raise ValueError(f"Factor {name!r} has no values")
+    weights = weights or {}
+    return Factor(name=name, values=unique, weights=tuple(float(weights.get(v, 1.0)) for v in unique))
+
+
+@dataclass(frozen=True)
+class CoverageReport:
+    strength: int
+    full_product: int
+    rows: int
+    tuples_required: int
+    must_include: int
+
+    @property
+    def reduction_ratio(self) -> float:
+        return round(self.full_product / self.rows, 3) if self.rows else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "strength": self.strength,
+            "full_product": self.full_product,
+            "rows": self.rows,
+            "reduction_ratio": self.reduction_ratio,
+            "tuples_required": self.tuples_required,
+            "must_include": self.must_include,
+        }
+
+
+Tuple = tuple[tuple[int, ...], tuple[int, ...]]
+
+
+def _row_tuples(row: Sequence[int], strength: int) -> list[Tuple]:
+    return [(combo, tuple(row[i] for i in combo)) for combo in combinations(range(len(row)), strength)]
+
+
+def covering_array(
+    factors: Sequence[Factor],
+    strength: int = 2,
+    must_include: Sequence[Mapping[str, str]] = (),
+) -> tuple[list[dict[str, str]], CoverageReport]:
+    """Greedy t-wise covering array over ``factors``.
+
+    Every combination of ``strength`` factor values appears in at least one
+    row. ``must_include`` rows (possibly partial) come first; after that each
+    row is seeded with the heaviest uncovered tuple and its remaining factors
+    are chosen to cover the most uncovered weight, so rows are emitted in
+    priority order and a truncated run still exercises the heaviest
+    combinations. The result is deterministic for the same input.
+    """
+    if not factors:
+        return [], CoverageReport(strength, 0, 0, 0, 0)
+    strength = max(1, min(strength, len(factors)))
+    names = [f.name for f in factors]
+    lookup = [{v: i for i, v in enumerate(f.values)} for f in factors]
+
+    def weight(t: Tuple) -> float:
+        return prod(factors[f].weight(v) for f, v in zip(*t))
+
+    uncovered: dict[Tuple, float] = {}
+    for combo in combinations(range(len(factors)), strength):
+        for values in product(*(range(len(factors[f].values)) for f in combo)):
+            t = (combo, values)
+            uncovered[t] = weight(t)
+    required = len(uncovered)
+    # Heaviest first, generation order breaks ties; a cursor skips covered entries.
+    queue = sorted(uncovered, key=lambda t: -uncovered[t])
+    cursor = 0
+
+    def complete(row: list[Any]) -> list[int]:
+        for f in range(len(factors)):
+            if row[f] is not None:
+                continue
+            others = [i for i, v in enumerate(row) if v is not None]
+            best, best_score = 0, (-1.0, 0.0)
+            for v in range(len(factors[f].values)):
+                row[f] = v
+                score = 0.0
+                for combo in combinations(others, strength - 1):
+                    key = tuple(sorted((*combo, f)))
+                    score += uncovered.get((key, tuple(row[i] for i in key)), 0.0)
+                # Ties go to the heavier value.
+                if (score, factors[f].weight(v)) > best_score:
+                    best, best_score = v, (score, factors[f].weight(v))
+            row[f] = best
+        return row
+
+    rows: list[list[int]] = []
+    for spec in must_include:
+        unknown = set(spec) - set(names)
+        if unknown:
+            raise ValueError(f"must_include names unknown factors: {sorted(unknown)}")
+        row: list[Any] = [None] * len(factors)
+        for f, name in enumerate(names):
+            if name in spec:
+                if spec[name] not in lookup[f]:
+                    raise ValueError(f"must_include value {spec[name]!r} is not a {name}")
+                row[f] = lookup[f][spec[name]]
+        done = complete(row)
+        rows.append(done)
+        for t in _row_tuples(done, strength):
+            uncovered.pop(t, None)
+
+    while uncovered:
+        while queue[cursor] not in uncovered:
+            cursor += 1
+        combo, values = queue[cursor]
+        row = [None] * len(factors)
+        for f, v in zip(combo, values):
+            row[f] = v
+        done = complete(row)
+        rows.append(done)
+        for t in _row_tuples(done, strength):
+            uncovered.pop(t, None)
+
+    full = prod(len(f.values) for f in factors)
+    report = CoverageReport(strength=strength, full_product=full, rows=len(rows), tuples_required=required, must_include=len(must_include))
+    return [{names[f]: factors[f].values[v] for f, v in enumerate(row)} for row in rows], report
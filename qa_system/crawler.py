@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Mapping
+
+from .capture import MessageCapture
+from .debug_metadata import DebugMetadataParser
+from .send_scheduler import SendScheduler
+from .session_pool import SessionPool, flood_wait_seconds
+
+GRAPH_VERSION = 1
+DEFAULT_ROOT_COMMAND = "/start"
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_BUDGET = 200
+DEFAULT_CONCURRENCY = 2
+DEFAULT_REPLY_TIMEOUT = 10.0
+# How long to wait after a callback answer for the bot to edit the message or send a new one.
+DEFAULT_SETTLE = 0.5
+
+
+def crawl_graph_path(root: Path, bot_name: str) -> Path:
+    return root / "qa" / "state" / "crawl" / bot_name / "callback_graph.json"
+
+
+def keyboard_layout(message: Any) -> list[list[list[str | None]]]:
+    markup = getattr(message, "reply_markup", None)
+    return [[[btn.text, getattr(btn, "callback_data", None)] for btn in row] for row in getattr(markup, "inline_keyboard", None) or []]
+
+
+def screen_hash(text: str, layout: list[list[list[str | None]]]) -> str:
+    """Identity of a screen: whitespace-normalised text plus the button layout."""
+    normalized = "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+    return hashlib.blake2b(json.dumps([normalized, layout], separators=(",", ":")).encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class Screen:
+    hash: str
+    text: str
+    layout: list[list[list[str | None]]]
+    menu_id: str | None
+    depth: int
+    path: list[str]
+
+    @property
+    def callbacks(self) -> list[str]:
+        return [data for row in self.layout for _, data in row if data]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"text": self.text, "buttons": self.layout, "menu_id": self.menu_id, "depth": self.depth, "path": self.path}
+
+
+@dataclass
+class _Waiter:
+    key: str
+    anchor: int
+    edits: bool
+    future: asyncio.Future
+
+
+@dataclass
+class CrawlGraph:
+    roots: list[str]
+    screens: dict[str, Screen] = field(default_factory=dict)
+    edges: dict[tuple[str, str], dict[str, Any]] = field(default_factory=dict)
+    root_screens: dict[str, str] = field(default_factory=dict)
+
+    def callbacks(self) -> list[str]:
+        return sorted({data for screen in self.screens.values() for data in screen.callbacks})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "version": GRAPH_VERSION,
+            "roots": {root: self.root_screens.get(root) for root in self.roots},
+            "screens": {h: screen.as_dict() for h, screen in sorted(self.screens.items())},
+            "edges": [{"from": src, "callback_data": data, **edge} for (src, data), edge in sorted(self.edges.items())],
+            "callbacks": self.callbacks(),
+        }
+
+
+class MenuCrawler:
+    """Breadth-first exploration of a bot's inline-keyboard menus.
+
+    Each root command is sent once to find its screen. Every unexplored
+    button is then visited by replaying the button path from a fresh root
+    message, pressing the button, and waiting for the bot to edit that
+    message (or send a new one) before reading the resulting screen.
+    Screens are identified by ``screen_hash`` (text plus button layout), so
+    a screen reached again by another path is recorded as an edge but not
+    expanded twice.
+
+    ``max_depth`` caps presses per path, ``budget`` caps the total sends and
+    presses (replays included), and ``concurrency`` caps paths in flight.
+    Messages without ``reply_to_message_id`` are handed to the oldest waiting
+    path in that chat, as ``ResponseCorrelator`` does. Root commands go
+    through a ``SendScheduler`` (built from the capabilities' ``rate_limits``
+    unless one is passed in), so a crawl is shaped like queued actions and
+    a ``FloodWait`` delays the send instead of failing the path.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        chat: str,
+        capabilities: Mapping[str, Any],
+        roots: list[str] | None = None,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        budget: int = DEFAULT_BUDGET,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        reply_timeout: float = DEFAULT_REPLY_TIMEOUT,
+        settle: float = DEFAULT_SETTLE,
+        scheduler: SendScheduler | None = None,
+    ) -> None:
+        self.app = app
+        self.chat = chat
+        self.capabilities = capabilities
+        declared = [menu for menu in capabilities.get("menus", []) if str(menu).startswith("/")]
+        self.roots = list(dict.fromkeys(roots or [DEFAULT_ROOT_COMMAND, *declared]))
+        self.max_depth = max_depth
+        self.budget = budget
+        self.reply_timeout = reply_timeout
+        self.settle = settle
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or SendScheduler.from_capabilities(dict(capabilities))
+        self._slots = asyncio.Semaphore(max(concurrency, 1))
+        self._parser = DebugMetadataParser.from_capabilities(capabilities)
+        # Buttons leading to declared menus are tried first within each level.
+        self._menus = set(capabilities.get("menus", []))
+        self._waiters: OrderedDict[int, _Waiter] = OrderedDict()
+        self._tokens = 0
+        self.graph = CrawlGraph(roots=self.roots)
+        self.counters = {"sends": 0, "presses": 0, "replays": 0, "timeouts": 0, "errors": 0, "budget_exhausted": 0}
+
+    def _sessions(self) -> list[tuple[str | None, Any]]:
+        return list(self.app.sessions()) if isinstance(self.app, SessionPool) else [(None, self.app)]
+
+    def _key(self, session: str | None) -> str:
+        return self.chat if session is None else f"{self.chat}@{session}"
+
+    def _spend(self) -> bool:
+        if self.counters["sends"] + self.counters["presses"] >= self.budget:
+            self.counters["budget_exhausted"] += 1
+            return False
+        return True
+
+    def _wait_for(self, key: str, anchor: int, edits: bool) -> _Waiter:
+        future = asyncio.get_running_loop().create_future()
+        self._tokens += 1
+        waiter = self._waiters[self._tokens] = _Waiter(key=key, anchor=anchor, edits=edits, future=future)
+        future.add_done_callback(lambda _, token=self._tokens: self._waiters.pop(token, None))
+        return waiter
+
+    def _dispatch(self, key: str, message: Any, edited: bool) -> None:
+        if getattr(message, "outgoing", False):
+            return
+        waiters = [w for w in self._waiters.values() if w.key == key and not w.future.done()]
+        if edited:
+            target = next((w for w in waiters if w.edits and w.anchor == message.id), None)
+        else:
+            reply_to = getattr(message, "reply_to_message_id", None)
+            target = next((w for w in waiters if w.anchor == reply_to), None) if reply_to is not None else None
+            target = target or (waiters[0] if waiters else None)
+        if target is not None:
+            target.future.set_result(message)
+
+    async def _consume(self, queue: asyncio.Queue, stop: asyncio.Event) -> None:
+        while not (stop.is_set() and queue.empty()):
+            try:
+                item = await asyncio.wait_for(queue.get(), 0.05)
+            except asyncio.TimeoutError:
+                continue
+            self._dispatch(item.key, item.message, item.edited)
+
+    def _client(self, path_index: int) -> tuple[str | None, Any]:
+        sessions = self._sessions()
+        return sessions[path_index % len(sessions)]
+
+    async def _open(self, session: str | None, client: Any, root: str) -> Any | None:
+        if not self._spend():
+            return None
+        self.counters["sends"] += 1
+
+        async def send() -> tuple[Any, _Waiter]:
+            # Registered right before each attempt (not while queued) so a fast reply cannot slip past
+            # and a queued root does not claim other paths' replies; the anchor is filled in once known.
+            waiter = self._wait_for(self._key(session), -1, edits=False)
+            try:
+                return await client.send_message(self.chat, root), waiter
+            except Exception:
+                waiter.future.cancel()
+                raise
+
+        sent, waiter = (await self.scheduler.submit(self.chat, send)).result
+        waiter.anchor = sent.id
+        try:
+            return await asyncio.wait_for(waiter.future, self.reply_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            return None
+
+    async def _press(self, session: str | None, client: Any, message: Any, data: str) -> tuple[Any | None, Any]:
+        """Press ``data`` on ``message``; returns (answer, message now showing the resulting screen)."""
+        self.counters["presses"] += 1
+        waiter = self._wait_for(self._key(session), message.id, edits=True)
+        answer = None
+        for attempt in range(3):
+            try:
+                answer = await client.request_callback_answer(self.chat, message.id, data, timeout=self.reply_timeout)
+                break
+            except (TimeoutError, asyncio.TimeoutError):
+                self.counters["timeouts"] += 1
+                break
+            except Exception as exc:
+                wait = flood_wait_seconds(exc)
+                if wait is None or attempt == 2:
+                    waiter.future.cancel()
+                    raise
+                await asyncio.sleep(wait)
+        try:
+            return answer, await asyncio.wait_for(waiter.future, self.settle)
+        except asyncio.TimeoutError:
+            # No edit or new message: the screen did not change (or changed in place without an update).
+            return answer, message
+
+    def _screen(self, message: Any, depth: int, path: list[str]) -> Screen:
+        text = message.text or message.caption or ""
+        layout = keyboard_layout(message)
+        return Screen(screen_hash(text, layout), text, layout, self._parser.parse(text).get("menu_id"), depth, path)
+
+    async def _visit(self, index: int, root: str, path: list[str]) -> tuple[Screen | None, Any]:
+        """Replay ``path`` from a fresh ``root`` message; returns the final screen and last answer."""
+        async with self._slots:
+            session, client = self._client(index)
+            message = await self._open(session, client, root)
+            if message is None:
+                return None, None
+            answer = None
+            for step, data in enumerate(path):
+                if not self._spend():
+                    return None, None
+                if step < len(path) - 1:
+                    self.counters["replays"] += 1
+                answer, message = await self._press(session, client, message, data)
+            return self._screen(message, len(path), [root, *path]), answer
+
+    def _record(self, screen: Screen) -> bool:
+        if screen.hash in self.graph.screens:
+            return False
+        self.graph.screens[screen.hash] = screen
+        return True
+
+    async def run(self) -> CrawlGraph:
+        queue: asyncio.Queue = asyncio.Queue()
+        captures: list[tuple[Any, MessageCapture]] = []
+        for session, client in self._sessions():
+            capture = MessageCapture(self.chat, key=self._key(session), queue=queue)
+            capture.attach(client)
+            captures.append((client, capture))
+        stop = asyncio.Event()
+        consumer = asyncio.ensure_future(self._consume(queue, stop))
+        try:
+            frontier: list[tuple[str, Screen]] = []
+            for root in self.roots:
+                screen, _ = await self._visit(0, root, [])
+                if screen is None:
+                    continue
+                self.graph.root_screens[root] = screen.hash
+                if self._record(screen):
+                    frontier.append((root, screen))
+            while frontier:
+                jobs: list[tuple[str, Screen, str]] = []
+                for root, screen in frontier:
+                    if screen.depth >= self.max_depth:
+                        continue
+                    ordered = sorted(dict.fromkeys(screen.callbacks), key=lambda data: data not in self._menus)
+                    jobs.extend((root, screen, data) for data in ordered if (screen.hash, data) not in self.graph.edges)
+                results = await asyncio.gather(
+                    *(self._visit(i, root, [*screen.path[1:], data]) for i, (root, screen, data) in enumerate(jobs)), return_exceptions=True
+                )
+                frontier = []
+                for (root, parent, data), result in zip(jobs, results):
+                    if isinstance(result, BaseException):
+                        self.counters["errors"] += 1
+                        self.graph.edges[(parent.hash, data)] = {"to": None, "error": f"{type(result).__name__}: {result}"}
+                        continue
+                    child, answer = result
+                    if child is None:
+                        continue
+                    self.graph.edges[(parent.hash, data)] = {
+                        "to": child.hash,
+                        "answer": getattr(answer, "message", None),
+                        "alert": bool(getattr(answer, "alert", False)),
+                    }
+                    if self._record(child):
+                        frontier.append((root, child))
+        finally:
+            stop.set()
+            await consumer
+            for client, capture in captures:
+                capture.detach(client)
+            if self._owns_scheduler:
+                await self.scheduler.stop()
+        return self.graph
+
+    def stats(self) -> dict[str, Any]:
+        reached = {screen.menu_id for screen in self.graph.screens.values() if screen.menu_id}
+        return {
+            **self.counters,
+            "screens": len(self.graph.screens),
+            "edges": len(self.graph.edges),
+            "callbacks": len(self.graph.callbacks()),
+            "max_depth_reached": max((s.depth for s in self.graph.screens.values()), default=0),
+            "menus_reached": sorted(reached & self._menus),
+            "menus_missing": sorted(self._menus - reached),
+            "flood_waits": self.scheduler.counters["flood_waits"],
+        }
+
+
+def load_graph(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return {"version": GRAPH_VERSION, "roots": {}, "screens": {}, "edges": [], "callbacks": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_graph(path: Path, graph: CrawlGraph, stats: dict[str, Any]) -> dict[str, Any]:
+    """Merge ``graph`` into the persisted graph at ``path``; newer edges replace older ones."""
+    previous = load_graph(path)
+    current = graph.as_dict()
+    edges = {(e["from"], e["callback_data"]): e for e in previous.get("edges", [])}
+    edges.update({(e["from"], e["callback_data"]): e for e in current["edges"]})
+    screens = {**previous.get("screens", {}), **current["screens"]}
+    merged = {
+        "version": GRAPH_VERSION,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "roots": {**previous.get("roots", {}), **current["roots"]},
+        "screens": dict(sorted(screens.items())),
+        "edges": [edges[key] for key in sorted(edges)],
+        "callbacks": sorted({*previous.get("callbacks", []), *current["callbacks"]}),
+        "last_crawl": stats,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(merged, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    return merged
+
+
+async def crawl(app: Any, chat: str, capabilities: Mapping[str, Any], **kwargs: Any) -> tuple[CrawlGraph, dict[str, Any]]:
+    crawler = MenuCrawler(app, chat, capabilities, **kwargs)
+    started = time.monotonic()
+    graph = await crawler.run()
+    return graph, {**crawler.stats(), "elapsed_s": round(time.monotonic() - started, 3)}
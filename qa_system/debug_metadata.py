@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+from .multi_match import literal_alternation
+
+DEFAULT_DEBUG_KEYS = ("menu_id", "callback_id", "pending_action", "error_code")
+# How many trailing "{"-led lines to try when looking for a JSON footer.
+_MAX_FOOTER_CANDIDATES = 3
+
+
+class DebugMetadataParser:
+    """Extracts debug metadata fields from a bot reply in one regex pass.
+
+    Three forms are recognised for every declared key:
+
+    - ``key: value`` runs to the end of the line, as the executor always did;
+    - ``key=value`` takes one token (quoted strings keep their spaces);
+    - a JSON object on the last line(s), optionally in a code fence, whose
+      declared keys take precedence over inline markers.
+
+    The first inline occurrence of a key wins. Undeclared keys are ignored and
+    missing ones are ``None``.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self.keys = tuple(dict.fromkeys(k for k in keys if k))
+        self._key_set = frozenset(self.keys)
+        # Keys form a prefix trie, so scanning costs about the same however many
+        # are declared. The ``key:`` value is captured in a lookahead so later
+        # keys on the same line are still seen, as with the old per-key split.
+        self._pattern = re.compile(
+            rf"({literal_alternation(self.keys)})(?::(?=([^\n]*))|[ \t]*=[ \t]*(\"[^\"\n]*\"|'[^'\n]*'|[^\s,;]+))"
+        ) if self.keys else None
+
+    @classmethod
+    def from_capabilities(cls, capabilities: Mapping[str, Any]) -> "DebugMetadataParser":
+        return _parser_for(tuple(capabilities.get("debug_metadata") or DEFAULT_DEBUG_KEYS))
+
+    def _footer(self, text: str) -> dict[str, Any]:
+        body = text.rstrip()
+        if body.endswith("```"):
+            body = body[:-3].rstrip()
+        if not body.endswith("}"):
+            return {}
+        end = len(body)
+        for _ in range(_MAX_FOOTER_CANDIDATES):
+            start = body.rfind("\n{", 0, end)
+            candidate = body[start + 1 :] if start >= 0 else body
+            try:
+                payload = json.loads(candidate)
+            except ValueError:
+                if start < 0:
+                    return {}
+                end = start
+                continue
+            return {k: v for k, v in payload.items() if k in self._key_set} if isinstance(payload, dict) else {}
+        return {}
+
+    def parse(self, text: str) -> dict[str, Any]:
+        metadata: dict[str, Any] = dict.fromkeys(self.keys)
+        if not text or self._pattern is None:
+            return metadata
+        found = 0
+        # findall yields (key, line, token); the unmatched alternative is "".
+        for key, line, token in self._pattern.findall(text):
+            if metadata[key] is not None:
+                continue
+            if token:
+                metadata[key] = token[1:-1] if token[0] in "\"'" else token
+            else:
+                metadata[key] = line.strip()
+            found += 1
+            if found == len(self.keys):
+                break
+        if "{" in text:
+            metadata.update(self._footer(text))
+        return metadata
+
+
+@lru_cache(maxsize=32)
+def _parser_for(keys: tuple[str, ...]) -> DebugMetadataParser:
+    return DebugMetadataParser(keys)
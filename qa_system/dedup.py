@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+DEFAULT_MAX_SEEN = 4096
+DEFAULT_PERSIST_INTERVAL = 5.0
+PERSISTED_EDITS = 256
+
+SeenKey = tuple[str, int, str | None]
+
+
+def hwm_path(root: Path, bot_name: str) -> Path:
+    return root / "qa" / "state" / "message_hwm" / f"{bot_name}.json"
+
+
+class MessageDeduper:
+    """Decides whether a captured message or edit still needs to be logged.
+
+    Originals at or below the per-chat high-water mark were already recorded.
+    A bounded, insertion-ordered seen-set of ``(chat, message_id, edit_date)``
+    catches repeats above it and repeated edits. The high-water marks and the
+    newest edit keys are persisted so restarts do not re-log history.
+    """
+
+    def __init__(self, state_path: Path, max_seen: int = DEFAULT_MAX_SEEN, persist_interval: float = DEFAULT_PERSIST_INTERVAL) -> None:
+        self.state_path = state_path
+        self.max_seen = max_seen
+        self.persist_interval = persist_interval
+        self.high_water_marks: dict[str, int] = {}
+        self._seen: OrderedDict[SeenKey, None] = OrderedDict()
+        self.counters = {"accepted": 0, "accepted_edits": 0, "duplicates_suppressed": 0, "below_hwm_suppressed": 0}
+        self._dirty = False
+        self._last_persist = time.monotonic()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path.exists():
+            return
+        raw = json.loads(self.state_path.read_text(encoding="utf-8"))
+        self.high_water_marks = {str(chat): int(mid) for chat, mid in raw.get("high_water_marks", {}).items()}
+        self.counters.update({k: int(v) for k, v in raw.get("counters", {}).items() if k in self.counters})
+        for chat, message_id, edit_date in raw.get("recent_edits", []):
+            self._remember((str(chat), int(message_id), edit_date))
+
+    def _remember(self, key: SeenKey) -> None:
+        self._seen[key] = None
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+    def high_water_mark(self, chat: str) -> int:
+        return self.high_water_marks.get(chat, 0)
+
+    def accept(self, chat: str, message_id: int, edit_date: str | None = None) -> bool:
+        key = (chat, message_id, edit_date)
+        if key in self._seen:
+            self.counters["duplicates_suppressed"] += 1
+            return False
+        if edit_date is None and message_id <= self.high_water_mark(chat):
+            self.counters["below_hwm_suppressed"] += 1
+            return False
+        self._remember(key)
+        if message_id > self.high_water_mark(chat):
+            self.high_water_marks[chat] = message_id
+        self.counters["accepted_edits" if edit_date else "accepted"] += 1
+        self._dirty = True
+        if time.monotonic() - self._last_persist >= self.persist_interval:
+            self.persist()
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        suppressed = self.counters["duplicates_suppressed"] + self.counters["below_hwm_suppressed"]
+        return {**self.counters, "suppressed_total": suppressed, "seen_set_size": len(self._seen), "high_water_marks": dict(self.high_water_marks)}
+
+    def persist(self) -> None:
+        self._last_persist = time.monotonic()
+        if not self._dirty:
+            return
+        edits = [list(key) for key in self._seen if key[2] is not None][-PERSISTED_EDITS:]
+        payload = {"high_water_marks": self.high_water_marks, "recent_edits": edits, "counters": self.counters}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        tmp.replace(self.state_path)
+        self._dirty = False
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+from .test_engine import MessageEvaluator
+
+# Word runs count one token per four characters, every other non-space character one token:
+# close to what BPE tokenizers produce for English log text, and identical on every run.
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_NUMBERS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+MAX_TEXT_CHARS = 240
+RECENT_ACTIONS = 10
+# Anomaly score per flagged category.
+SEVERITY = {"bugs": 3, "unexpected_errors": 2, "missing_behavior": 1}
+# Sections in the order they claim budget.
+SECTIONS = ("anomalies", "errors", "actions", "messages")
+
+
+def estimate_tokens(value: Any) -> int:
+    """Deterministic token estimate for a string, or for any JSON value as compact JSON."""
+    text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    return sum(-(-len(piece) // 4) if piece[0].isalnum() or piece[0] == "_" else 1 for piece in _PIECES.findall(text))
+
+
+def _clip(text: str) -> str:
+    text = _SPACES.sub(" ", text).strip()
+    return text if len(text) <= MAX_TEXT_CHARS else text[: MAX_TEXT_CHARS - 1] + "…"
+
+
+def _shape(text: str) -> str:
+    # Replies that differ only in ids, amounts or counters are the same message for the brain.
+    return _NUMBERS.sub("#", _SPACES.sub(" ", text).strip())
+
+
+@dataclass
+class _MessageGroup:
+    text: str
+    first: str | None
+    last: str | None
+    count: int
+    edits: int
+    callbacks: list[str]
+    debug_metadata: dict[str, Any]
+
+    def as_item(self) -> dict[str, Any]:
+        item: dict[str, Any] = {"text": _clip(self.text), "count": self.count, "first": self.first, "last": self.last}
+        if self.edits:
+            item["edits"] = self.edits
+        if self.callbacks:
+            item["callbacks"] = self.callbacks
+        metadata = {key: value for key, value in self.debug_metadata.items() if value not in (None, "")}
+        if metadata:
+            item["debug_metadata"] = metadata
+        return item
+
+
+def dedupe_messages(messages: Iterable[Mapping[str, Any]]) -> list[_MessageGroup]:
+    """Group ``message_log`` entries by text shape (digits masked), keeping the newest example."""
+    groups: dict[str, _MessageGroup] = {}
+    for entry in messages:
+        text = str(entry.get("text") or "")
+        timestamp = entry.get("timestamp")
+        group = groups.get(_shape(text))
+        if group is None:
+            groups[_shape(text)] = _MessageGroup(text, timestamp, timestamp, 1, int(bool(entry.get("edited"))), list(entry.get("callbacks") or []), dict(entry.get("debug_metadata") or {}))
+            continue
+        group.count += 1
+        group.edits += int(bool(entry.get("edited")))
+        group.text, group.last = text, timestamp
+        group.callbacks = list(entry.get("callbacks") or group.callbacks)
+        group.debug_metadata = dict(entry.get("debug_metadata") or group.debug_metadata)
+    return list(groups.values())
+
+
+def collapse_errors(errors: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """Collapse runs of consecutive identical ``error_log`` entries into one item with a count."""
+    runs: list[dict[str, Any]] = []
+    previous: tuple[str, str] | None = None
+    for entry in errors:
+        detail = str(entry.get("detail") or entry.get("text") or entry.get("callback_data") or "")
+        key = (str(entry.get("error") or "error"), _shape(detail))
+        if key == previous:
+            runs[-1]["count"] += 1
+            runs[-1]["last"] = entry.get("timestamp")
+            continue
+        previous = key
+        run: dict[str, Any] = {"error": key[0], "count": 1, "first": entry.get("timestamp"), "last": entry.get("timestamp")}
+        if detail:
+            run["detail"] = _clip(detail)
+        runs.append(run)
+    return runs
+
+
+def rank_anomalies(groups: Iterable[_MessageGroup], evaluator: MessageEvaluator) -> list[tuple[_MessageGroup, dict[str, Any]]]:
+    """Message groups the evaluator flags, most severe first (ties: most frequent, then newest)."""
+    ranked: list[tuple[int, int, str, _MessageGroup, dict[str, Any]]] = []
+    for group in groups:
+        result = evaluator.evaluate(group.text)
+        flags = {category: values for category, values in result.items() if values}
+        if not flags:
+            continue
+        score = sum(SEVERITY.get(category, 1) * len(values) for category, values in flags.items())
+        ranked.append((score, group.count, group.last or "", group, {"score": score, "flags": flags, **group.as_item()}))
+    ranked.sort(key=lambda row: row[:3], reverse=True)
+    return [(row[3], row[4]) for row in ranked]
+
+
+def summarize_actions(actions: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    counts: dict[str, int] = {}
+    timed_out = 0
+    recent: list[dict[str, Any]] = []
+    for entry in actions:
+        action = str(entry.get("action") or entry.get("type") or "unknown")
+        label = f"{action} {entry['text']}" if action == "send_command" and entry.get("text") else action
+        if action == "press_callback" and entry.get("callback_data"):
+            label = f"press_callback {entry['callback_data']}"
+        counts[label] = counts.get(label, 0) + 1
+        timed_out += int(bool(entry.get("timed_out")))
+        recent.append({key: entry[key] for key in ("timestamp", "action", "text", "callback_data", "mode", "timed_out") if entry.get(key) not in (None, "")})
+    return {"counts": dict(sorted(counts.items(), key=lambda item: (-item[1], item[0]))), "timed_out": timed_out, "recent": recent[-RECENT_ACTIONS:]}
+
+
+def build_digest(logs: Mapping[str, list[Any]], capabilities: Mapping[str, Any], budget: int) -> dict[str, Any]:
+    """Condense ``action_log``/``message_log``/``error_log`` entries into at most ``budget`` estimated tokens.
+
+    Sections claim budget in ``SECTIONS`` order, each item whole or not at all:
+    ranked anomalies, collapsed error runs, the action summary, then the
+    remaining message groups newest first. What did not fit is counted under
+    ``omitted``.
+    """
+    messages = logs.get("message_log", [])
+    errors = logs.get("error_log", [])
+    actions = logs.get("action_log", [])
+    groups = dedupe_messages(messages)
+    anomalies = rank_anomalies(groups, MessageEvaluator.from_capabilities(capabilities))
+    flagged = {id(group) for group, _ in anomalies}
+    candidates: dict[str, list[Any]] = {
+        "anomalies": [item for _, item in anomalies],
+        "errors": collapse_errors(errors),
+        "actions": [summarize_actions(actions)] if actions else [],
+        "messages": [group.as_item() for group in sorted(groups, key=lambda group: group.last or "", reverse=True) if id(group) not in flagged],
+    }
+    digest: dict[str, Any] = {
+        "budget_tokens": budget,
+        "totals": {"messages": len(messages), "distinct_messages": len(groups), "errors": len(errors), "actions": len(actions), "anomalies": len(anomalies)},
+        **{section: [] for section in SECTIONS},
+        "omitted": {},
+    }
+    # Reserve room for the envelope and the omitted counts before filling sections.
+    used = estimate_tokens({**digest, "omitted": {section: 10**6 for section in SECTIONS}, "estimated_tokens": budget})
+    for section in SECTIONS:
+        for position, item in enumerate(candidates[section]):
+            cost = estimate_tokens(item) + 1
+            if used + cost > budget:
+                digest["omitted"][section] = len(candidates[section]) - position
+                break
+            digest[section].append(item)
+            used += cost
+    digest["actions"] = digest["actions"][0] if digest["actions"] else {}
+    digest["estimated_tokens"] = estimate_tokens(digest)
+    return digest
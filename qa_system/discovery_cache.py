@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from .source_scanner import MAX_FILE_SIZE_BYTES, PATTERNS_FINGERPRINT, FileSymbols, is_source_path, iter_source_entries, merge_symbols, scan_files_with_digest
+
+CACHE_FILENAME = "discovery_cache.json"
+CACHE_VERSION = 1
+
+
+@dataclass
+class CacheEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    symbols: FileSymbols
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"mtime_ns": self.mtime_ns, "size": self.size, "digest": self.digest, "commands": list(self.symbols.commands), "buttons": list(self.symbols.buttons)}
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> "CacheEntry":
+        return cls(
+            mtime_ns=int(raw["mtime_ns"]),
+            size=int(raw["size"]),
+            digest=str(raw["digest"]),
+            symbols=FileSymbols(commands=tuple(raw.get("commands", [])), buttons=tuple(raw.get("buttons", []))),
+        )
+
+
+@dataclass
+class RefreshStats:
+    files: int = 0
+    unchanged: int = 0
+    rehashed: int = 0
+    reparsed: int = 0
+    deleted: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class DiscoveryCache:
+    """Per-file discovery results, persisted next to the generated artifacts.
+
+    Entries are keyed by repo-relative path and validated by ``mtime_ns`` and
+    size; a file whose stat changed is re-read and only re-parsed when its
+    content hash changed too. Files that disappear from the walk are dropped.
+    The whole cache is discarded when the scan patterns or the repo root change.
+    With ``persist=False`` it is a scratch index that ``save`` never writes.
+    """
+
+    path: Path
+    repo_root: str = ""
+    entries: dict[str, CacheEntry] = field(default_factory=dict)
+    stats: RefreshStats = field(default_factory=RefreshStats)
+    persist: bool = True
+    _dirty: bool = False
+
+    @classmethod
+    def load(cls, path: Path, repo_root: Path, rebuild: bool = False) -> "DiscoveryCache":
+        root = str(repo_root.resolve())
+        cache = cls(path=path, repo_root=root)
+        if rebuild or not path.exists():
+            cache._dirty = True
+            return cache
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            if raw.get("version") != CACHE_VERSION or raw.get("patterns") != PATTERNS_FINGERPRINT or raw.get("repo_root") != root:
+                cache._dirty = True
+                return cache
+            cache.entries = {rel: CacheEntry.from_dict(entry) for rel, entry in raw.get("files", {}).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # A corrupt cache only costs a full rescan.
+            cache.entries = {}
+            cache._dirty = True
+        return cache
+
+    def refresh(self, repo_root: Path, workers: int = 0) -> dict[str, FileSymbols]:
+        stats = RefreshStats()
+        current: dict[str, CacheEntry] = {}
+        stale: dict[Path, tuple[str, int, int]] = {}
+        for path, stat in iter_source_entries(repo_root):
+            rel = path.relative_to(repo_root).as_posix()
+            stats.files += 1
+            entry = self.entries.get(rel)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                current[rel] = entry
+                stats.unchanged += 1
+            else:
+                stale[path] = (rel, stat.st_mtime_ns, stat.st_size)
+        self._rescan(stale, current, stats, workers)
+        stats.deleted = len(self.entries.keys() - current.keys())
+        if stale or stats.deleted:
+            self._dirty = True
+        self.entries = current
+        self.stats = stats
+        return self.symbols()
+
+    def update(self, repo_root: Path, paths: Iterable[str], workers: int = 0) -> dict[str, FileSymbols]:
+        """Re-scan only ``paths`` (repo-relative), e.g. the files a diff touched."""
+        stats = RefreshStats()
+        current = dict(self.entries)
+        stale: dict[Path, tuple[str, int, int]] = {}
+        for rel in paths:
+            stats.files += 1
+            path = repo_root / rel
+            try:
+                stat = path.stat()
+            except OSError:
+                stat = None
+            if stat is None or not path.is_file() or not is_source_path(rel) or stat.st_size > MAX_FILE_SIZE_BYTES:
+                if current.pop(rel, None) is not None:
+                    stats.deleted += 1
+                continue
+            entry = current.get(rel)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                stats.unchanged += 1
+            else:
+                stale[path] = (rel, stat.st_mtime_ns, stat.st_size)
+        self._rescan(stale, current, stats, workers)
+        if stale or stats.deleted:
+            self._dirty = True
+        self.entries = current
+        self.stats = stats
+        return self.symbols()
+
+    def _rescan(self, stale: dict[Path, tuple[str, int, int]], current: dict[str, CacheEntry], stats: RefreshStats, workers: int) -> None:
+        for path, (digest, symbols) in scan_files_with_digest(stale, workers=workers).items():
+            rel, mtime_ns, size = stale[path]
+            if digest is None:
+                current.pop(rel, None)
+                continue
+            previous = self.entries.get(rel)
+            if previous is not None and previous.digest == digest:
+                # Touched but not edited: keep the parsed symbols, refresh the stat key.
+                symbols = previous.symbols
+                stats.rehashed += 1
+            else:
+                stats.reparsed += 1
+            current[rel] = CacheEntry(mtime_ns=mtime_ns, size=size, digest=digest, symbols=symbols)
+
+    def symbols(self) -> dict[str, FileSymbols]:
+        return {rel: entry.symbols for rel, entry in self.entries.items()}
+
+    def save(self) -> None:
+        if not self._dirty or not self.persist:
+            return
+        payload = {
+            "version": CACHE_VERSION,
+            "patterns": PATTERNS_FINGERPRINT,
+            "repo_root": self.repo_root,
+            "files": {rel: self.entries[rel].as_dict() for rel in sorted(self.entries)},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        # Compact on purpose: one entry per source file adds up on large trees.
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.path)
+        self._dirty = False
+
+
+def discover_cached(repo_root: Path, cache_path: Path, workers: int = 0, rebuild: bool = False) -> tuple[list[str], list[str], DiscoveryCache]:
+    cache = DiscoveryCache.load(cache_path, repo_root, rebuild=rebuild)
+    symbols = cache.refresh(repo_root, workers=workers)
+    cache.save()
+    commands, buttons = merge_symbols(symbols.values())
+    return commands, buttons, cache
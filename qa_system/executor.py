@@ -2,16 +2,39 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import contextlib
 import json
 import os
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+from .action_queue import DEFAULT_CONSUMER, DEFAULT_MAX_ATTEMPTS, ActionQueue, QueuedAction
 from .bot_registry import BotRegistry
-from .capabilities import load_capabilities, load_repo_info
+from .capabilities import capabilities_snapshot, load_capabilities, load_repo_info
+from .config_cache import CONFIG_CACHE
+from .crawler import DEFAULT_BUDGET, DEFAULT_CONCURRENCY, DEFAULT_MAX_DEPTH, crawl, crawl_graph_path, save_graph
+from .correlation import LATENCY_LOG, LatencyStats, ResponseCorrelator, command_label, write_latency_summary
+from .debug_metadata import DebugMetadataParser
+from .capture import MessageCapture
 from .config import DEFAULT_ROOT
+from .dedup import MessageDeduper, hwm_path
+from .fake_bot import FakeBotProfile, fake_bot_factory
+from .load_test import run_load_test
+from .log_store import LogStore, read_log, tail_log
+from .recent_messages import DEFAULT_CAPACITY, MESSAGE_LOG, RecentMessages
+from .send_scheduler import SendScheduler, limits_from_capabilities
+from .session_pool import SessionPool, flood_wait_seconds, route_key
+
+CAPTURE_MODES = ("events", "poll")
+DEFAULT_FALLBACK_INTERVAL = 30.0
+DEFAULT_MAX_IN_FLIGHT = 1
+DEFAULT_CALLBACKS_IN_FLIGHT = 4
+DEFAULT_CALLBACK_TIMEOUT = 10.0
+DEFAULT_CLAIM_LIMIT = 100
+MAX_CALLBACK_FLOOD_RETRIES = 3
 
 
 @dataclass
@@ -30,32 +53,89 @@ class QAState:
         }
 
 
+def make_client(root: Path, client_factory: Callable[[], Any] | None = None) -> Any:
+    if client_factory is not None:
+        return client_factory()
+    api_id = os.getenv("TELEGRAM_API_ID")
+    api_hash = os.getenv("TELEGRAM_API_HASH")
+    session_name = str(root / "qa" / "runtime" / "qa_userbot")
+
+    try:
+        from pyrogram import Client
+    except Exception as exc:  # pragma: no cover
+        raise RuntimeError("pyrogram is required for executor service") from exc
+
+    return Client(session_name, api_id=int(api_id) if api_id else None, api_hash=api_hash)
+
+
+def bot_state_file(root: Path, bot_name: str) -> Path:
+    return root / "qa" / "state" / "bots" / bot_name / "executor_state.json"
+
+
 class QAExecutor:
-    def __init__(self, root: Path) -> None:
+    def __init__(
+        self,
+        root: Path,
+        client_factory: Callable[[], Any] | None = None,
+        bot_name: str | None = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_callbacks_in_flight: int = DEFAULT_CALLBACKS_IN_FLIGHT,
+        callback_timeout: float = DEFAULT_CALLBACK_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
         self.root = root
+        self.client_factory = client_factory
+        self.pinned_bot = bot_name
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_callbacks_in_flight = max(max_callbacks_in_flight, 1)
+        self.callback_timeout = callback_timeout
+        self.max_attempts = max(max_attempts, 1)
         self.registry = BotRegistry(root)
         self.registry.ensure_defaults()
-        self.state_file = root / "qa" / "state" / "executor_state.json"
+        self.state_file = bot_state_file(root, bot_name) if bot_name else root / "qa" / "state" / "executor_state.json"
         self.state = self._load_state()
+        if bot_name:
+            self.state.selected_bot = bot_name
         self._processed_actions = 0
-
-    def _bot_queue_file(self, bot_name: str) -> Path:
-        return self.root / "qa" / "actions" / bot_name / "queue.json"
+        self._log_store: LogStore | None = None
+        self._recent: dict[str, RecentMessages] = {}
+        self._queues: dict[str, ActionQueue] = {}
+        self._dedupers: dict[str, MessageDeduper] = {}
+        self._scheduler: SendScheduler | None = None
+        self._correlator = ResponseCorrelator()
+        self._latency: LatencyStats | None = None
+        self._latency_dir: Path | None = None
+        # Newest captured message carrying each callback_data, per bot chat: data -> (capture key, message_id).
+        self._callback_targets: dict[str, dict[str, tuple[str, int]]] = {}
+        self._message_locks: dict[tuple[str, int], asyncio.Lock] = {}
+
+    def _bot_queue(self, bot_name: str) -> ActionQueue:
+        queue = self._queues.get(bot_name)
+        if queue is None:
+            queue = ActionQueue.for_bot(self.root, bot_name)
+            self._queues[bot_name] = queue
+        return queue
+
+    def _deduper(self, bot_name: str) -> MessageDeduper:
+        deduper = self._dedupers.get(bot_name)
+        if deduper is None:
+            deduper = MessageDeduper(hwm_path(self.root, bot_name))
+            self._dedupers[bot_name] = deduper
+        return deduper
 
     def _today_dir(self, bot_name: str) -> Path:
         day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         return self.root / "qa" / "logs" / bot_name / day
 
     def _read_json(self, path: Path, default: Any) -> Any:
-        if not path.exists():
-            return default
-        return json.loads(path.read_text(encoding="utf-8"))
+        return CONFIG_CACHE.load(path, default)
 
     def _load_state(self) -> QAState:
-        raw = self._read_json(
-            self.state_file,
-            {"qa_enabled": False, "mode": "user", "telegram_default": True, "selected_bot": self.registry.selected_bot()},
-        )
+        default = {"qa_enabled": False, "mode": "user", "telegram_default": True, "selected_bot": self.registry.selected_bot()}
+        if self.pinned_bot:
+            # A bot's first supervised run starts from the single-bot executor state.
+            default = self._read_json(self.root / "qa" / "state" / "executor_state.json", default)
+        raw = self._read_json(self.state_file, default)
         return QAState(
             qa_enabled=bool(raw.get("qa_enabled", False)),
             mode=str(raw.get("mode", "user")),
@@ -66,23 +146,29 @@ class QAExecutor:
     def _save_state(self) -> None:
         self.state_file.parent.mkdir(parents=True, exist_ok=True)
         self.state_file.write_text(json.dumps(self.state.as_dict(), indent=2), encoding="utf-8")
+        CONFIG_CACHE.invalidate(self.state_file)
 
     def _current_bot_config(self):
         return self.registry.load_bot(self.state.selected_bot)
 
+    def _day_log_store(self) -> LogStore:
+        day_dir = self._today_dir(self.state.selected_bot)
+        if self._log_store is None or self._log_store.directory != day_dir:
+            if self._log_store is not None:
+                self._log_store.close()
+            self._log_store = LogStore(day_dir)
+        return self._log_store
+
     def write_log(self, entry: dict[str, Any], log_name: str = "action_log.json") -> None:
-        bot_name = self.state.selected_bot
-        day_dir = self._today_dir(bot_name)
-        day_dir.mkdir(parents=True, exist_ok=True)
-        path = day_dir / log_name
-        logs = self._read_json(path, [])
-        logs.append(entry)
-        path.write_text(json.dumps(logs, indent=2), encoding="utf-8")
+        self._day_log_store().append(log_name, entry)
+
+    def close_logs(self) -> None:
+        if self._log_store is not None:
+            self._log_store.close()
+            self._log_store = None
 
     def queue_action(self, action_type: str, payload: dict[str, Any], bot_name: str | None = None) -> None:
         selected_bot = bot_name or self.state.selected_bot
-        queue_file = self._bot_queue_file(selected_bot)
-        queue_file.parent.mkdir(parents=True, exist_ok=True)
         envelope = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "action_id": f"act-{int(datetime.now(timezone.utc).timestamp() * 1000)}-{self._processed_actions}",
@@ -90,31 +176,44 @@ class QAExecutor:
             "payload": payload,
             "bot_name": selected_bot,
         }
-        queued = self._read_json(queue_file, [])
-        queued.append(envelope)
-        queue_file.write_text(json.dumps(queued, indent=2), encoding="utf-8")
+        self._bot_queue(selected_bot).enqueue(envelope)
+
+    def _tail_messages(self, limit: int) -> list[dict[str, Any]]:
+        if self._log_store is not None and self._log_store.directory == self._today_dir(self.state.selected_bot):
+            return self._log_store.tail(MESSAGE_LOG, limit)
+        return tail_log(self._today_dir(self.state.selected_bot), MESSAGE_LOG, limit)
+
+    def _recent_messages(self) -> RecentMessages:
+        bot_name = self.state.selected_bot
+        day_dir = self._today_dir(bot_name)
+        recent = self._recent.get(bot_name)
+        if recent is None or recent.directory != day_dir:
+            # Read the log tail once per bot and day; captured messages keep the buffer current from then on.
+            recent = RecentMessages.warm_start(day_dir, entries=self._tail_messages(DEFAULT_CAPACITY))
+            self._recent[bot_name] = recent
+        return recent
 
     def get_recent_messages(self, limit: int = 10) -> list[dict[str, Any]]:
-        messages = self._read_json(self._today_dir(self.state.selected_bot) / "message_log.json", [])
-        return messages[-limit:]
+        recent = self._recent_messages().recent(limit)
+        return self._tail_messages(limit) if recent is None else recent
 
     def get_buttons(self) -> list[str]:
-        values: list[str] = []
-        for message in self.get_recent_messages(limit=20):
-            values.extend(message.get("buttons", []))
-        return sorted(set(values))
+        return list(self._recent_messages().buttons())
 
     def get_callbacks(self) -> list[str]:
-        values: list[str] = []
-        for message in self.get_recent_messages(limit=20):
-            values.extend(message.get("callbacks", []))
-        return sorted(set(values))
+        return list(self._recent_messages().callbacks())
 
     def get_state(self) -> dict[str, Any]:
         cfg = self._current_bot_config()
         capabilities = load_capabilities(cfg.capabilities_path)
         repo_info = load_repo_info(cfg.repo_info_path)
-        return {**self.state.as_dict(), "bot_username": cfg.bot_username, "repo_info": repo_info, "capability_sections": sorted(capabilities.keys())}
+        return {
+            **self.state.as_dict(),
+            "bot_username": cfg.bot_username,
+            "repo_info": repo_info,
+            "capability_sections": sorted(capabilities.keys()),
+            "capture_stats": self._deduper(self.state.selected_bot).stats(),
+        }
 
     def _apply_control_command(self, text: str) -> bool:
         stripped = text.strip()
@@ -132,6 +231,10 @@ class QAExecutor:
                 return False
         elif stripped.startswith("/qa/select_bot"):
             parts = stripped.split(maxsplit=1)
+            if self.pinned_bot:
+                # Supervised executors serve exactly one bot; selection is a no-op there.
+                self.write_log({"timestamp": datetime.now(timezone.utc).isoformat(), "error": "select_bot_ignored", "bot": self.pinned_bot, "text": stripped}, "error_log.json")
+                return True
             if len(parts) == 2:
                 self.registry.select_bot(parts[1].strip())
                 self.state.selected_bot = parts[1].strip()
@@ -142,96 +245,460 @@ class QAExecutor:
         self._save_state()
         return True
 
-    def _consume_actions(self) -> list[dict[str, Any]]:
-        queue_file = self._bot_queue_file(self.state.selected_bot)
-        if not queue_file.exists():
-            return []
-        parsed = self._read_json(queue_file, [])
-        queue_file.write_text("[]", encoding="utf-8")
-        self._processed_actions += len(parsed)
-        return parsed
+    def _consume_actions(self, limit: int = DEFAULT_CLAIM_LIMIT) -> list[QueuedAction]:
+        claimed = self._bot_queue(self.state.selected_bot).claim(DEFAULT_CONSUMER, limit)
+        self._processed_actions += len(claimed)
+        return claimed
 
-    def _extract_debug_metadata(self, message: Any) -> dict[str, Any]:
+    def _ack_action(self, bot_name: str, item: QueuedAction) -> None:
+        self._bot_queue(bot_name).ack([item.seq], DEFAULT_CONSUMER)
+
+    def close(self) -> None:
+        self._flush_latency(force=True)
+        self.close_logs()
+        for deduper in self._dedupers.values():
+            deduper.persist()
+        for queue in self._queues.values():
+            queue.close()
+        self._queues.clear()
+
+    def _extract_debug_metadata(self, message: Any, capabilities: dict[str, Any] | None = None) -> dict[str, Any]:
         text = (message.text or message.caption or "") if message else ""
-        metadata = {"menu_id": None, "callback_id": None, "pending_action": None, "error_code": None}
-        for key in metadata:
-            marker = f"{key}:"
-            if marker in text:
-                part = text.split(marker, 1)[1].split("\n", 1)[0].strip()
-                metadata[key] = part
-        return metadata
-
-    async def run_service(self, poll_interval: float = 1.0) -> None:
+        return DebugMetadataParser.from_capabilities(capabilities or {}).parse(text)
+
+    def _make_client(self) -> Any:
+        return make_client(self.root, self.client_factory)
+
+    async def run_service(self, poll_interval: float = 1.0, capture_mode: str = "events") -> None:
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        app = self._make_client()
+        try:
+            await self._serve(app, poll_interval, capture_mode)
+        finally:
+            self.close()
+
+    async def run_load_test(self, rate: float, duration: float, seed: int = 0, **kwargs: Any) -> dict[str, Any]:
+        """Open-loop load test against the selected bot; the report is appended to ``load_test_log``."""
         bot_cfg = self._current_bot_config()
-        api_id = os.getenv("TELEGRAM_API_ID")
-        api_hash = os.getenv("TELEGRAM_API_HASH")
-        session_name = str(self.root / "qa" / "runtime" / "qa_userbot")
+        capabilities = load_capabilities(bot_cfg.capabilities_path)
+        app = self._make_client()
+        try:
+            async with app:
+                report = await run_load_test(app, bot_cfg.bot_username, capabilities, rate, duration, seed=seed, **kwargs)
+            report = {"timestamp": datetime.now(timezone.utc).isoformat(), "bot": self.state.selected_bot, "seed": seed, **report}
+            self.write_log(report, "load_test_log.json")
+            return report
+        finally:
+            self.close()
+
+    async def crawl_menus(self, **kwargs: Any) -> dict[str, Any]:
+        """Breadth-first crawl of the selected bot's menus, merged into ``qa/state/crawl/<bot>/callback_graph.json``."""
+        bot_cfg = self._current_bot_config()
+        capabilities = load_capabilities(bot_cfg.capabilities_path)
+        app = self._make_client()
+        try:
+            async with app:
+                graph, stats = await crawl(app, bot_cfg.bot_username, capabilities, **kwargs)
+            path = crawl_graph_path(self.root, self.state.selected_bot)
+            merged = save_graph(path, graph, stats)
+            report = {"timestamp": datetime.now(timezone.utc).isoformat(), "bot": self.state.selected_bot, **stats, "graph_callbacks": len(merged["callbacks"]), "graph": str(path)}
+            self.write_log(report, "crawl_log.json")
+            return report
+        finally:
+            self.close()
+
+    async def _dispatch_action(self, app: Any, bot_cfg: Any, action: dict[str, Any]) -> None:
+        action_type = action.get("type", "")
+        payload = action.get("payload", {})
+        if action_type == "set_mode":
+            mode = payload.get("mode", "")
+            if mode in {"user", "admin"}:
+                self.state.mode = mode
+                self._save_state()
+                self.write_log({"timestamp": action["timestamp"], "action": "set_mode", "mode": mode})
+        elif action_type == "send_command":
+            text = str(payload.get("text", "")).strip()
+            if self._apply_control_command(text):
+                self.write_log({"timestamp": action["timestamp"], "action": text, "mode": self.state.mode})
+                return
+            sent, session, timing, sent_at = await self._send_message(app, bot_cfg, text, payload)
+            self._correlator.track(self._chat_key(bot_cfg.bot_username, session), sent.id, "command", command_label(text), sent_at)
+            entry = {"timestamp": action["timestamp"], "action": "send_command", "text": text, "message_id": sent.id, "mode": self.state.mode, **timing}
+            if session is not None:
+                entry["session"] = session
+            self.write_log(entry)
+        elif action_type == "press_callback":
+            await self._press_callback(app, bot_cfg, action)
+        else:
+            self.write_log({"timestamp": action.get("timestamp"), "error": "unsupported_action", "action": action}, "error_log.json")
+
+    def _resolve_callback(self, chat: str, data: str, payload: dict[str, Any]) -> tuple[str, int] | None:
+        session = payload.get("session")
+        key = self._chat_key(chat, str(session)) if session else None
+        if payload.get("message_id") is not None:
+            return key or chat, int(payload["message_id"])
+        target = self._callback_targets.get(chat, {}).get(data)
+        if target is not None and (key is None or target[0] == key):
+            return target
+        # Not seen since startup: fall back to the day's message log.
+        for message in reversed(self.get_recent_messages(limit=50)):
+            if data in message.get("callbacks", []) and message.get("message_id") is not None:
+                return key or chat, int(message["message_id"])
+        return None
+
+    def _client_for(self, app: Any, chat: str, key: str) -> Any:
+        if not isinstance(app, SessionPool):
+            return app
+        for session, client in app.sessions():
+            if self._chat_key(chat, session) == key:
+                return client
+        return app.clients[app.home(key)]
+
+    def _remember_callbacks(self, key: str, msg: Any) -> None:
+        markup = getattr(msg, "reply_markup", None)
+        chat = key.split("@", 1)[0]
+        for row in getattr(markup, "inline_keyboard", None) or []:
+            for button in row:
+                if getattr(button, "callback_data", None):
+                    self._callback_targets.setdefault(chat, {})[button.callback_data] = (key, msg.id)
+
+    async def _press_callback(self, app: Any, bot_cfg: Any, action: dict[str, Any]) -> None:
+        payload = action.get("payload", {})
+        chat = bot_cfg.bot_username
+        data = str(payload.get("callback_data", ""))
+        entry: dict[str, Any] = {"timestamp": action["timestamp"], "action": "press_callback", "payload": payload, "callback_data": data, "mode": self.state.mode}
+        target = self._resolve_callback(chat, data, payload) if data else None
+        if target is None:
+            self.write_log({**entry, "error": "callback_unresolved"}, "error_log.json")
+            return
+        key, message_id = target
+        client = self._client_for(app, chat, key)
+        lock = self._message_locks.setdefault((key, message_id), asyncio.Lock())
+        # Presses on one message depend on each other (each may edit it); other presses run concurrently.
+        async with lock:
+            pending = self._correlator.track(key, message_id, "callback", data, time.monotonic())
+            attempts, flood_waited, answer = 0, 0.0, None
+            try:
+                while True:
+                    attempts += 1
+                    pending.sent_at = time.monotonic()
+                    try:
+                        answer = await client.request_callback_answer(chat, message_id, data, timeout=self.callback_timeout)
+                        break
+                    except (TimeoutError, asyncio.TimeoutError):
+                        break
+                    except Exception as exc:
+                        wait = flood_wait_seconds(exc)
+                        if wait is None or attempts > MAX_CALLBACK_FLOOD_RETRIES:
+                            raise
+                        flood_waited += wait
+                        await asyncio.sleep(wait)
+            except Exception as exc:
+                self.write_log({**entry, "message_id": message_id, "error": "callback_failed", "detail": f"{type(exc).__name__}: {exc}"}, "error_log.json")
+                return
+            answered_at = time.monotonic()
+        entry.update({"message_id": message_id, "attempts": attempts, "flood_wait_s": flood_waited, "timed_out": answer is None})
+        if answer is not None:
+            self._correlator.answered(pending, answered_at)
+            entry["answer_ms"] = round((answered_at - pending.sent_at) * 1000, 2)
+            entry["answer"] = getattr(answer, "message", None)
+            entry["alert"] = bool(getattr(answer, "alert", False))
+        if key != chat:
+            entry["session"] = key.split("@", 1)[1]
+        self.write_log(entry)
+
+    async def _send_message(self, app: Any, bot_cfg: Any, text: str, payload: dict[str, Any]) -> tuple[Any, str | None, dict[str, Any], float]:
+        chat = bot_cfg.bot_username
+        sent_at = 0.0
+
+        async def send() -> tuple[Any, str | None]:
+            nonlocal sent_at
+            # Latency is measured from the attempt that went through, not from when the send was queued.
+            sent_at = time.monotonic()
+            if isinstance(app, SessionPool):
+                session, sent = await app.send_message(chat, text, route=route_key(payload.get("scenario_id"), payload.get("role", self.state.mode)))
+                return sent, session
+            return await app.send_message(chat, text), None
+
+        if self._scheduler is None:
+            sent, session = await send()
+            return sent, session, {}, sent_at
+        chat_limit, _ = capabilities_snapshot(bot_cfg.capabilities_path).derive("rate_limits", limits_from_capabilities)
+        scheduled = await self._scheduler.submit(chat, send, chat_limit=chat_limit)
+        sent, session = scheduled.result
+        timing = {"queued_ms": round(scheduled.queued_for * 1000, 2), "attempts": scheduled.attempts, "flood_wait_s": scheduled.flood_waited}
+        return sent, session, timing, sent_at
+
+    @staticmethod
+    def _sessions(app: Any) -> list[tuple[str | None, Any]]:
+        return list(app.sessions()) if isinstance(app, SessionPool) else [(None, app)]
+
+    @staticmethod
+    def _chat_key(chat: str, session: str | None) -> str:
+        # Message ids are per account, so each pooled session tracks its own high-water mark.
+        return chat if session is None else f"{chat}@{session}"
+
+    def _record_message(
+        self, chat: str, msg: Any, capabilities: dict[str, Any], source: str = "poll", edited: bool = False, received_at: float | None = None
+    ) -> bool:
+        edit_date = getattr(msg, "edit_date", None)
+        if not self._deduper(self.state.selected_bot).accept(chat, msg.id, edit_date.isoformat() if edit_date else None):
+            return False
+        entry = self._message_entry(msg, capabilities, source=source, edited=edited)
+        self._remember_callbacks(chat, msg)
+        received_at = time.monotonic() if received_at is None else received_at
+        pending = self._correlator.observe(chat, msg, received_at, edited=edited)
+        if pending is not None:
+            entry["reply_to_send"] = pending.message_id
+            entry["send_label"] = pending.label
+            entry["latency_ms"] = round((received_at - pending.sent_at) * 1000, 2)
+        recent = self._recent_messages()
+        self.write_log(entry, MESSAGE_LOG)
+        recent.append(entry)
+        return True
+
+    def _latency_stats(self) -> LatencyStats:
+        day_dir = self._today_dir(self.state.selected_bot)
+        if self._latency is None or self._latency_dir != day_dir:
+            # Percentiles cover the whole day, so a restart picks up the samples already logged.
+            self._latency = LatencyStats()
+            self._latency_dir = day_dir
+            for entry in read_log(day_dir, LATENCY_LOG):
+                self._latency.add(entry)
+        return self._latency
+
+    def _flush_latency(self, force: bool = False) -> None:
+        finished = self._correlator.expire(time.monotonic(), force=force)
+        if not finished:
+            return
+        stats = self._latency_stats()
+        timestamp = datetime.now(timezone.utc).isoformat()
+        for entry in finished:
+            stats.add(entry)
+            self.write_log({"timestamp": timestamp, "bot": self.state.selected_bot, **entry}, LATENCY_LOG)
+        write_latency_summary(
+            self._latency_dir,
+            {
+                "bot": self.state.selected_bot,
+                "updated_at": timestamp,
+                "reply_timeout_s": self._correlator.timeout,
+                "settle_s": self._correlator.settle,
+                **stats.summary(),
+            },
+        )
+
+    def _message_entry(self, msg: Any, capabilities: dict[str, Any], source: str = "poll", edited: bool = False) -> dict[str, Any]:
+        keyboard = msg.reply_markup.inline_keyboard if getattr(msg, "reply_markup", None) else []
+        edit_date = getattr(msg, "edit_date", None)
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "message_id": msg.id,
+            "text": msg.text or msg.caption or "",
+            "buttons": [btn.text for row in keyboard for btn in row],
+            "callbacks": [btn.callback_data for row in keyboard for btn in row if getattr(btn, "callback_data", None)],
+            "mode": self.state.mode,
+            "bot": self.state.selected_bot,
+            "debug_metadata": self._extract_debug_metadata(msg, capabilities),
+            "expected_success_messages": capabilities.get("expected_success_messages", []),
+            "expected_failure_messages": capabilities.get("expected_failure_messages", []),
+            "source": source,
+            "edited": edited,
+            "edit_date": edit_date.isoformat() if edit_date else None,
+        }
+
+    @staticmethod
+    def _is_control_action(action: dict[str, Any]) -> bool:
+        if action.get("type") == "set_mode":
+            return True
+        return action.get("type") == "send_command" and str(action.get("payload", {}).get("text", "")).strip().startswith("/qa")
+
+    async def _dispatch_and_ack(self, app: Any, bot_cfg: Any, queue_bot: str, item: QueuedAction, slots: asyncio.Semaphore, global_slots: asyncio.Semaphore | None) -> None:
+        async with slots, (global_slots or contextlib.nullcontext()):
+            await self._run_action(app, bot_cfg, queue_bot, item)
 
+    async def _run_action(self, app: Any, bot_cfg: Any, queue_bot: str, item: QueuedAction) -> None:
+        """Dispatch and ack one action; a failure is logged and retried on lease expiry until ``max_attempts``."""
         try:
-            from pyrogram import Client
-        except Exception as exc:  # pragma: no cover
-            raise RuntimeError("pyrogram is required for executor service") from exc
+            await self._dispatch_action(app, bot_cfg, item.action)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            detail = f"{type(exc).__name__}: {exc}"
+            entry = {"timestamp": datetime.now(timezone.utc).isoformat(), "error": "action_failed", "seq": item.seq, "attempts": item.attempts, "detail": detail, "action": item.action}
+            if item.attempts >= self.max_attempts:
+                self._bot_queue(queue_bot).dead_letter(item.seq, detail, DEFAULT_CONSUMER)
+                entry["dead_lettered"] = True
+            self.write_log(entry, "error_log.json")
+            return
+        self._ack_action(queue_bot, item)
+
+    def _dead_letter_exhausted(self, queue_bot: str, item: QueuedAction) -> bool:
+        # Deliveries past the cutoff mean earlier attempts never finished, e.g. the action crashed the process.
+        if item.attempts <= self.max_attempts:
+            return False
+        detail = f"no result after {item.attempts - 1} deliveries"
+        self._bot_queue(queue_bot).dead_letter(item.seq, detail, DEFAULT_CONSUMER)
+        self.write_log({"timestamp": datetime.now(timezone.utc).isoformat(), "error": "action_failed", "seq": item.seq, "attempts": item.attempts, "detail": detail, "action": item.action, "dead_lettered": True}, "error_log.json")
+        return True
 
-        app = Client(session_name, api_id=int(api_id) if api_id else None, api_hash=api_hash)
+    async def _gather(self, in_flight: list[asyncio.Future]) -> None:
+        # return_exceptions keeps one failing task from orphaning its siblings.
+        for result in await asyncio.gather(*in_flight, return_exceptions=True):
+            if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                self.write_log({"timestamp": datetime.now(timezone.utc).isoformat(), "error": "dispatch_task_failed", "detail": f"{type(result).__name__}: {result}"}, "error_log.json")
+
+    def _claim_limit(self, bot_cfg: Any, lease_seconds: float) -> int:
+        # No more actions than the send rate can start within one lease, so a batch normally drains
+        # before its leases lapse and replies are recorded between batches rather than after a long one.
+        chat_limit, _ = capabilities_snapshot(bot_cfg.capabilities_path).derive("rate_limits", limits_from_capabilities)
+        return max(1, min(DEFAULT_CLAIM_LIMIT, int(chat_limit.rate * lease_seconds)))
+
+    async def _renew_leases(self, queue_bot: str, seqs: list[int]) -> None:
+        queue = self._bot_queue(queue_bot)
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            queue.extend(seqs, DEFAULT_CONSUMER)
+
+    async def _process_actions(self, app: Any, bot_cfg: Any, global_slots: asyncio.Semaphore | None = None) -> bool:
+        queue_bot = self.state.selected_bot
+        claimed = self._consume_actions(self._claim_limit(bot_cfg, self._bot_queue(queue_bot).lease_seconds))
+        if not claimed:
+            return self.state.qa_enabled
+        # Held leases are renewed until the batch is done, so a FloodWait or a slow bot cannot let
+        # another consumer re-claim (and re-send) actions that are still in flight here.
+        renewal = asyncio.ensure_future(self._renew_leases(queue_bot, [item.seq for item in claimed]))
+        try:
+            await self._run_batch(app, bot_cfg, queue_bot, claimed, global_slots)
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+        return self.state.qa_enabled
+
+    async def _run_batch(self, app: Any, bot_cfg: Any, queue_bot: str, claimed: list[QueuedAction], global_slots: asyncio.Semaphore | None) -> None:
+        slots = asyncio.Semaphore(self.max_in_flight)
+        # Callback answers are cheap round-trips, so presses get their own, wider window.
+        callback_slots = asyncio.Semaphore(self.max_callbacks_in_flight)
+        in_flight: list[asyncio.Future] = []
+        for item in claimed:
+            if self._dead_letter_exhausted(queue_bot, item):
+                continue
+            if self._is_control_action(item.action):
+                # Control actions change mode/state, so everything queued before them must finish first.
+                await self._gather(in_flight)
+                in_flight.clear()
+                await self._run_action(app, bot_cfg, queue_bot, item)
+            elif not self.state.qa_enabled:
+                # While QA is off only control actions (e.g. /qa_on) are honoured; the rest are dropped.
+                self._ack_action(queue_bot, item)
+            else:
+                item_slots = callback_slots if item.action.get("type") == "press_callback" else slots
+                in_flight.append(asyncio.ensure_future(self._dispatch_and_ack(app, bot_cfg, queue_bot, item, item_slots, global_slots)))
+        await self._gather(in_flight)
+
+    async def _serve(self, app: Any, poll_interval: float, capture_mode: str = "events") -> None:
         async with app:
+            await self.serve_connected(app, poll_interval, capture_mode)
+
+    async def serve_connected(
+        self,
+        app: Any,
+        poll_interval: float,
+        capture_mode: str = "events",
+        global_slots: asyncio.Semaphore | None = None,
+        scheduler: SendScheduler | None = None,
+    ) -> None:
+        owned = scheduler is None
+        self._scheduler = scheduler or SendScheduler.from_capabilities(load_capabilities(self._current_bot_config().capabilities_path))
+        try:
+            if capture_mode == "poll":
+                await self._serve_polling(app, poll_interval, global_slots)
+            else:
+                await self._serve_events(app, poll_interval, global_slots=global_slots)
+        finally:
+            if owned:
+                await self._scheduler.stop()
+            self._scheduler = None
+
+    async def _serve_polling(self, app: Any, poll_interval: float, global_slots: asyncio.Semaphore | None = None) -> None:
+        while True:
+            bot_cfg = self._current_bot_config()
+            capabilities = load_capabilities(bot_cfg.capabilities_path)
+            if not await self._process_actions(app, bot_cfg, global_slots):
+                await asyncio.sleep(poll_interval)
+                continue
+
+            for session, client in self._sessions(app):
+                history = [msg async for msg in client.get_chat_history(bot_cfg.bot_username, limit=5)]
+                for msg in reversed(history):
+                    self._record_message(self._chat_key(bot_cfg.bot_username, session), msg, capabilities, edited=getattr(msg, "edit_date", None) is not None)
+            self._flush_latency()
+
+            await asyncio.sleep(poll_interval)
+
+    async def _serve_events(
+        self,
+        app: Any,
+        poll_interval: float,
+        fallback_interval: float = DEFAULT_FALLBACK_INTERVAL,
+        global_slots: asyncio.Semaphore | None = None,
+    ) -> None:
+        captures: list[tuple[Any, MessageCapture]] = []
+        try:
             while True:
                 bot_cfg = self._current_bot_config()
                 capabilities = load_capabilities(bot_cfg.capabilities_path)
-                actions = self._consume_actions()
-
-                if not self.state.qa_enabled:
-                    await asyncio.sleep(poll_interval)
+                if not captures or captures[0][1].chat != bot_cfg.bot_username:
+                    for client, capture in captures:
+                        capture.detach(client)
+                    captures = []
+                    shared: asyncio.Queue = asyncio.Queue()
+                    for session, client in self._sessions(app):
+                        capture = MessageCapture(bot_cfg.bot_username, key=self._chat_key(bot_cfg.bot_username, session), queue=shared)
+                        capture.last_seen_id = self._deduper(self.state.selected_bot).high_water_mark(capture.key)
+                        capture.attach(client)
+                        await capture.delta_fetch(client)
+                        captures.append((client, capture))
+
+                enabled = await self._process_actions(app, bot_cfg, global_slots)
+                # Waiting on the capture queue instead of sleeping wakes the loop as soon as a reply lands.
+                captured = await captures[0][1].wait(poll_interval)
+                for client, capture in captures:
+                    if time.monotonic() - max(capture.last_event_at, capture.last_fetch_at) >= fallback_interval:
+                        await capture.delta_fetch(client)
+                        captured.extend(capture.drain())
+                if not enabled:
                     continue
-
-                for action in actions:
-                    action_type = action.get("type", "")
-                    payload = action.get("payload", {})
-                    if action_type == "set_mode":
-                        mode = payload.get("mode", "")
-                        if mode in {"user", "admin"}:
-                            self.state.mode = mode
-                            self._save_state()
-                            self.write_log({"timestamp": action["timestamp"], "action": "set_mode", "mode": mode})
-                    elif action_type == "send_command":
-                        text = str(payload.get("text", "")).strip()
-                        if self._apply_control_command(text):
-                            self.write_log({"timestamp": action["timestamp"], "action": text, "mode": self.state.mode})
-                            continue
-                        sent = await app.send_message(bot_cfg.bot_username, text)
-                        self.write_log({"timestamp": action["timestamp"], "action": "send_command", "text": text, "message_id": sent.id, "mode": self.state.mode})
-                    elif action_type == "press_callback":
-                        self.write_log({"timestamp": action["timestamp"], "action": "press_callback", "payload": payload, "mode": self.state.mode})
-                    else:
-                        self.write_log({"timestamp": action.get("timestamp"), "error": "unsupported_action", "action": action}, "error_log.json")
-
-                history = []
-                async for msg in app.get_chat_history(bot_cfg.bot_username, limit=5):
-                    debug = self._extract_debug_metadata(msg)
-                    history.append(
-                        {
-                            "timestamp": datetime.now(timezone.utc).isoformat(),
-                            "message_id": msg.id,
-                            "text": msg.text or msg.caption or "",
-                            "buttons": [btn.text for row in (msg.reply_markup.inline_keyboard if msg.reply_markup else []) for btn in row],
-                            "callbacks": [btn.callback_data for row in (msg.reply_markup.inline_keyboard if msg.reply_markup else []) for btn in row if getattr(btn, "callback_data", None)],
-                            "mode": self.state.mode,
-                            "bot": self.state.selected_bot,
-                            "debug_metadata": debug,
-                            "expected_success_messages": capabilities.get("expected_success_messages", []),
-                            "expected_failure_messages": capabilities.get("expected_failure_messages", []),
-                        }
-                    )
-                if history:
-                    for entry in reversed(history):
-                        self.write_log(entry, "message_log.json")
-
-                await asyncio.sleep(poll_interval)
+                for item in captured:
+                    self._record_message(item.key, item.message, capabilities, source=item.source, edited=item.edited, received_at=item.received_at)
+                self._flush_latency()
+        finally:
+            for client, capture in captures:
+                capture.detach(client)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="RuneWager Telegram QA executor")
     parser.add_argument("--root", default=str(DEFAULT_ROOT), help="Project root")
     parser.add_argument("--service", action="store_true", help="Run long-lived QA executor service")
+    parser.add_argument("--capture", default="events", choices=CAPTURE_MODES, help="Message capture: pyrogram update handlers or legacy history polling")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between queue checks")
+    parser.add_argument("--sessions-dir", default=None, help="Shard sends across every *.session userbot in this directory")
+    parser.add_argument("--fake-bot", action="store_true", help="Run against an in-process fake bot instead of Telegram")
+    parser.add_argument("--fake-reply-delay", type=float, default=0.05, help="Seconds the fake bot takes to reply")
+    parser.add_argument("--fake-jitter", type=float, default=0.0, help="Mean extra exponential reply delay of the fake bot")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="Share of fake bot replies that are injected errors")
+    parser.add_argument("--fake-edit-rate", type=float, default=0.0, help="Share of fake bot replies followed by an edit")
+    parser.add_argument("--fake-flood-rate", type=float, default=0.0, help="Share of sends after which the fake bot raises FloodWait")
+    parser.add_argument("--fake-rate-limits", action="store_true", help="Make the fake bot enforce rate_limits from bot_capabilities.json with FloodWait")
+    parser.add_argument("--load-test", action="store_true", help="Drive an open-loop command/callback mix at --rate for --duration and report SLOs")
+    parser.add_argument("--rate", type=float, default=1.0, help="Load test arrivals per second (Poisson)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Load test duration in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Load test random seed")
+    parser.add_argument("--crawl", action="store_true", help="Explore inline-keyboard menus breadth-first from /start and record the callback graph")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="Crawl: maximum button presses per path")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="Crawl: maximum sends plus presses in total")
+    parser.add_argument("--crawl-concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Crawl: paths explored at once")
     parser.add_argument("--queue-action", default=None, help="Queue action type")
     parser.add_argument("--payload", default="{}", help="JSON payload for queued action")
     parser.add_argument("--bot-name", default=None, help="Optional bot name for queue actions")
@@ -243,7 +710,19 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = parse_args()
-    executor = QAExecutor(Path(args.root))
+    factory = (lambda: SessionPool.from_dir(Path(args.sessions_dir))) if args.sessions_dir else None
+    executor = QAExecutor(Path(args.root), client_factory=factory)
+    if args.fake_bot:
+        profile = FakeBotProfile(
+            latency=args.fake_reply_delay,
+            jitter=args.fake_jitter,
+            error_rate=args.fake_error_rate,
+            edit_rate=args.fake_edit_rate,
+            flood_wait_rate=args.fake_flood_rate,
+            enforce_rate_limits=args.fake_rate_limits,
+            seed=args.seed,
+        )
+        executor.client_factory = fake_bot_factory(executor._current_bot_config().capabilities_path, profile)
     if args.list_bots:
         print(json.dumps(executor.registry.list_bots(), indent=2))
         return
@@ -258,10 +737,17 @@ def main() -> None:
     if args.state:
         print(json.dumps(executor.get_state(), indent=2))
         return
+    if args.crawl:
+        report = asyncio.run(executor.crawl_menus(max_depth=args.max_depth, budget=args.budget, concurrency=args.crawl_concurrency))
+        print(json.dumps(report, indent=2))
+        return
+    if args.load_test:
+        print(json.dumps(asyncio.run(executor.run_load_test(args.rate, args.duration, seed=args.seed)), indent=2))
+        return
     if args.service:
-        asyncio.run(executor.run_service())
+        asyncio.run(executor.run_service(poll_interval=args.poll_interval, capture_mode=args.capture))
         return
-    raise SystemExit("Use one of: --service | --queue-action | --state | --list-bots | --select-bot")
+    raise SystemExit("Use one of: --service | --load-test | --crawl | --queue-action | --state | --list-bots | --select-bot")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .log_store import read_legacy_log, read_log_from
+
+EXPORT_LOGS = ("action_log", "message_log", "error_log")
+COMPRESSIONS = ("gzip", "zstd")
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def cursor_path(root: Path, bot_name: str, consumer: str) -> Path:
+    return root / "qa" / "state" / "export_cursors" / bot_name / f"{consumer}.json"
+
+
+def log_days(root: Path, bot_name: str) -> list[Path]:
+    base = root / "qa" / "logs" / bot_name
+    if not base.exists():
+        return []
+    return sorted(p for p in base.iterdir() if p.is_dir())
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position in a bot's logs: a day directory and a byte offset into each of its ``.jsonl`` logs.
+
+    An empty cursor (``day is None``) starts at the beginning of the newest day,
+    which is what a full export has always contained.
+    """
+
+    bot: str
+    day: str | None = None
+    offsets: dict[str, int] = field(default_factory=dict)
+
+    def encode(self) -> str:
+        raw = json.dumps({"v": 1, "bot": self.bot, "day": self.day, "offsets": self.offsets}, separators=(",", ":"), sort_keys=True)
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(str(raw["bot"]), raw.get("day"), {str(k): int(v) for k, v in (raw.get("offsets") or {}).items()})
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"invalid export cursor: {token!r}") from exc
+
+    def covers(self, other: "Cursor") -> bool:
+        """True when everything before ``other`` is also before this cursor."""
+        if other.day is None:
+            return True
+        if self.day is None or self.day < other.day:
+            return False
+        if self.day > other.day:
+            return True
+        return all(self.offsets.get(name, 0) >= offset for name, offset in other.offsets.items())
+
+
+def collect_delta(root: Path, bot_name: str, since: Cursor) -> tuple[dict[str, list[Any]], list[Path], Cursor]:
+    """Log entries appended after ``since``, the day directories they came from, and the cursor after them.
+
+    The rest of the cursor's day is read from its offsets, and any later day in
+    full (legacy ``.json`` arrays included). A cursor whose day was pruned
+    resumes at the next day that still exists.
+    """
+    days = log_days(root, bot_name)
+    if since.day is None:
+        days = days[-1:]
+    else:
+        days = [day for day in days if day.name >= since.day]
+    logs: dict[str, list[Any]] = {name: [] for name in EXPORT_LOGS}
+    position = since
+    for day in days:
+        resume = day.name == since.day
+        offsets: dict[str, int] = {}
+        for name in EXPORT_LOGS:
+            if not resume:
+                logs[name].extend(read_legacy_log(day, name))
+            entries, offsets[name] = read_log_from(day, name, since.offsets.get(name, 0) if resume else 0)
+            logs[name].extend(entries)
+        position = Cursor(bot_name, day.name, offsets)
+    return logs, days, position
+
+
+class ConsumerCursor:
+    """Persisted export position of one consumer of a bot's logs.
+
+    ``acked`` only moves on ``ack``, so an export that never reaches the brain
+    is sent again from the same place next time (at-least-once delivery).
+    ``pending`` is the newest cursor handed out and not yet acknowledged.
+    """
+
+    def __init__(self, root: Path, bot_name: str, consumer: str) -> None:
+        self.bot_name = bot_name
+        self.consumer = consumer
+        self.path = cursor_path(root, bot_name, consumer)
+        raw = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        self.acked = Cursor.decode(raw["acked"]) if raw.get("acked") else Cursor(bot_name)
+        self.pending = Cursor.decode(raw["pending"]) if raw.get("pending") else None
+        self.acked_at: str | None = raw.get("acked_at")
+        self.exported_at: str | None = raw.get("exported_at")
+
+    def exported(self, cursor: Cursor) -> None:
+        self.pending = cursor
+        self.exported_at = datetime.now(timezone.utc).isoformat()
+        self._persist()
+
+    def ack(self, token: str) -> Cursor:
+        cursor = Cursor.decode(token)
+        if cursor.bot != self.bot_name:
+            raise ValueError(f"cursor belongs to bot {cursor.bot!r}, not {self.bot_name!r}")
+        # Acks may arrive late or twice; the position never moves backwards.
+        if not self.acked.covers(cursor):
+            self.acked = cursor
+            self.acked_at = datetime.now(timezone.utc).isoformat()
+        if self.pending is not None and self.acked.covers(self.pending):
+            self.pending = None
+        self._persist()
+        return self.acked
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "consumer": self.consumer,
+            "bot": self.bot_name,
+            "acked": self.acked.encode() if self.acked.day else None,
+            "acked_at": self.acked_at,
+            "pending": self.pending.encode() if self.pending else None,
+            "exported_at": self.exported_at,
+        }
+
+    def _persist(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.as_dict(), indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+def compression_for(path: Path, compress: str | None = None) -> str | None:
+    if compress in (None, "", "none"):
+        return {".gz": "gzip", ".zst": "zstd"}.get(path.suffix) if compress is None else None
+    if compress not in COMPRESSIONS:
+        raise ValueError(f"unsupported compression {compress!r}; expected one of {', '.join(COMPRESSIONS)}")
+    return compress
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except Exception as exc:  # pragma: no cover
+        raise RuntimeError("zstandard is required for zstd export framing") from exc
+    return zstandard
+
+
+def encode_bundle(payload: dict[str, Any], compress: str | None = None) -> bytes:
+    data = json.dumps(payload, indent=None if compress else 2, separators=(",", ":") if compress else None).encode("utf-8")
+    if compress == "gzip":
+        # mtime=0 keeps identical bundles byte-identical.
+        return gzip.compress(data, mtime=0)
+    if compress == "zstd":
+        return _zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def decode_bundle(data: bytes) -> dict[str, Any]:
+    """Inverse of ``encode_bundle``; the framing is detected from the magic bytes."""
+    if data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+    elif data.startswith(ZSTD_MAGIC):
+        data = _zstandard().ZstdDecompressor().decompress(data)
+    return json.loads(data)
+
+
+def read_bundle(path: Path) -> dict[str, Any]:
+    return decode_bundle(path.read_bytes())
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Mapping
+
+from .capabilities import load_capabilities
+from .fake_client import FakeCallbackAnswer, FakeClient, FakeMarkup, FakeMessage, keyboard
+from .send_scheduler import TokenBucket, limits_from_capabilities
+
+CommandScript = Callable[["FakeBot", FakeClient, FakeMessage], Awaitable[None]]
+CallbackScript = Callable[["FakeBot", FakeClient, FakeMessage, str], Awaitable[FakeCallbackAnswer]]
+
+
+@dataclass(frozen=True)
+class FakeBotProfile:
+    """Timing and fault injection for ``FakeBot``; rates are probabilities per request."""
+
+    latency: float = 0.05
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    edit_rate: float = 0.0
+    edit_delay: float = 0.05
+    flood_wait_rate: float = 0.0
+    flood_wait_seconds: float = 1.0
+    enforce_rate_limits: bool = False
+    admin: bool = True
+    reply_to: bool = True
+    seed: int = 0
+
+
+class FakeBot:
+    """Plays RuneWager inside a ``FakeClient``, driven by ``bot_capabilities.json``.
+
+    Declared user commands reply with the first success phrase, the first menu
+    as ``menu_id`` debug metadata and an inline keyboard of every declared
+    callback. Admin commands do the same when ``profile.admin`` is set and
+    answer ``ERR_PERMISSION`` (or the first declared error) otherwise; other
+    text gets ``ERR_INVALID_CONTEXT``. Pressing a declared callback answers
+    the query and edits the message to that menu (or keeps the current one).
+
+    ``profile`` adds latency with exponential jitter, injected error replies
+    with a random declared ``error_code``, follow-up edits, and FloodWait:
+    injected at ``flood_wait_rate``, or from the ``rate_limits`` token bucket
+    when ``enforce_rate_limits`` is set. ``script`` overrides any command or
+    callback with a coroutine.
+    """
+
+    def __init__(self, capabilities: Mapping[str, Any], profile: FakeBotProfile | None = None) -> None:
+        self.capabilities = capabilities
+        self.profile = profile or FakeBotProfile()
+        self._rng = random.Random(self.profile.seed)
+        commands = capabilities.get("commands", {})
+        self.user_commands = frozenset(commands.get("user", []))
+        self.admin_commands = frozenset(commands.get("admin", []))
+        self.callbacks = tuple(capabilities.get("callbacks", []))
+        self.menus = tuple(capabilities.get("menus", [])) or ("main_menu",)
+        self.errors = tuple(capabilities.get("error_messages", [])) or ("ERR_UNKNOWN",)
+        self.success = (capabilities.get("expected_success_messages") or ["Done"])[0]
+        self.failure = (capabilities.get("expected_failure_messages") or ["Error"])[0]
+        chat_limit, _ = limits_from_capabilities(capabilities)
+        self._buckets: dict[int, TokenBucket] = {}
+        self._chat_limit = chat_limit
+        self._command_scripts: dict[str, CommandScript] = {}
+        self._callback_scripts: dict[str, CallbackScript] = {}
+        self.counters = {"commands": 0, "callbacks": 0, "errors_injected": 0, "edits": 0, "flood_waits": 0}
+
+    @classmethod
+    def from_capabilities_file(cls, path: Path, profile: FakeBotProfile | None = None) -> "FakeBot":
+        return cls(load_capabilities(path), profile)
+
+    def client(self) -> FakeClient:
+        """A fresh ``FakeClient`` wired to this bot; pass ``bot.client`` as a ``client_factory``."""
+        return FakeClient(responder=self.on_message, callback_responder=self.on_callback)
+
+    def script(self, trigger: str, handler: CommandScript | CallbackScript) -> None:
+        """Replace the built-in behaviour for a command (``/x``) or a callback's data."""
+        target = self._command_scripts if trigger.startswith("/") else self._callback_scripts
+        target[trigger] = handler  # type: ignore[assignment]
+
+    def _delay(self) -> float:
+        jitter = self._rng.expovariate(1 / self.profile.jitter) if self.profile.jitter > 0 else 0.0
+        return self.profile.latency + jitter
+
+    def _chance(self, rate: float) -> bool:
+        return rate > 0 and self._rng.random() < rate
+
+    def _throttle(self, client: FakeClient, message: FakeMessage) -> None:
+        if self._chance(self.profile.flood_wait_rate):
+            client.throttle(self.profile.flood_wait_seconds)
+            self.counters["flood_waits"] += 1
+            return
+        if not self.profile.enforce_rate_limits:
+            return
+        bucket = self._buckets.setdefault(message.chat.id, TokenBucket(self._chat_limit))
+        now = time.monotonic()
+        wait = bucket.wait_time(now)
+        if wait > 0:
+            # Like Telegram, the request that overran the limit still lands; the next sends are refused.
+            client.throttle(wait)
+            self.counters["flood_waits"] += 1
+        else:
+            bucket.consume(now)
+
+    def menu_markup(self) -> FakeMarkup | None:
+        return keyboard(*[[(data.replace("_", " ").title(), data)] for data in self.callbacks]) if self.callbacks else None
+
+    def error_text(self, code: str) -> str:
+        return f"{self.failure}: {code}\nerror_code: {code}"
+
+    def _reply_to(self, message: FakeMessage) -> int | None:
+        return message.id if self.profile.reply_to else None
+
+    async def on_message(self, client: FakeClient, message: FakeMessage) -> None:
+        text = (message.text or "").strip()
+        command = text.split(maxsplit=1)[0].split("@", 1)[0] if text else ""
+        if text in self.user_commands or text in self.admin_commands:
+            # Declared commands may carry arguments, e.g. "/qa_mode admin".
+            command = text
+        self.counters["commands"] += 1
+        self._throttle(client, message)
+        await asyncio.sleep(self._delay())
+        chat = message.chat.username
+        if command in self._command_scripts:
+            await self._command_scripts[command](self, client, message)
+            return
+        if self._chance(self.profile.error_rate):
+            self.counters["errors_injected"] += 1
+            client.bot_reply(chat, self.error_text(self._rng.choice(self.errors)), reply_to_message_id=self._reply_to(message))
+            return
+        if command in self.admin_commands and not self.profile.admin:
+            code = "ERR_PERMISSION" if "ERR_PERMISSION" in self.errors else self.errors[0]
+            client.bot_reply(chat, self.error_text(code), reply_to_message_id=self._reply_to(message))
+            return
+        if command not in self.user_commands and command not in self.admin_commands:
+            code = "ERR_INVALID_CONTEXT" if "ERR_INVALID_CONTEXT" in self.errors else self.errors[0]
+            client.bot_reply(chat, self.error_text(code), reply_to_message_id=self._reply_to(message))
+            return
+        reply = client.bot_reply(chat, f"{self.success}: {command}\nmenu_id: {self.menus[0]}", reply_markup=self.menu_markup(), reply_to_message_id=self._reply_to(message))
+        if self._chance(self.profile.edit_rate):
+            await asyncio.sleep(self.profile.edit_delay)
+            self.counters["edits"] += 1
+            client.bot_edit(chat, reply.id, text=f"{reply.text}\n(updated)")
+
+    async def on_callback(self, client: FakeClient, message: FakeMessage, data: str) -> FakeCallbackAnswer:
+        self.counters["callbacks"] += 1
+        await asyncio.sleep(self._delay())
+        if data in self._callback_scripts:
+            return await self._callback_scripts[data](self, client, message, data)
+        chat = message.chat.username
+        if data not in self.callbacks:
+            return FakeCallbackAnswer(message=self.error_text(self.errors[0]), alert=True)
+        if self._chance(self.profile.error_rate):
+            self.counters["errors_injected"] += 1
+            return FakeCallbackAnswer(message=self.error_text(self._rng.choice(self.errors)), alert=True)
+        menu = data if data in self.menus else self.menus[0]
+        client.bot_edit(chat, message.id, text=f"{self.success}: {data}\nmenu_id: {menu}\ncallback_id: {data}", reply_markup=self.menu_markup())
+        return FakeCallbackAnswer(message=f"{self.success}: {data}")
+
+
+def fake_bot_factory(capabilities_path: Path, profile: FakeBotProfile | None = None) -> Callable[[], FakeClient]:
+    """``client_factory`` for ``QAExecutor`` that plays the bot described by ``capabilities_path``."""
+    return FakeBot.from_capabilities_file(capabilities_path, profile).client
+
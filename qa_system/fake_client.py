@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+
+@dataclass
+class FakeButton:
+    text: str
+    callback_data: str | None = None
+
+
+@dataclass
+class FakeMarkup:
+    inline_keyboard: list[list[FakeButton]]
+
+
+@dataclass
+class FakeChat:
+    id: int
+    username: str
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    chat: FakeChat
+    text: str | None = None
+    caption: str | None = None
+    reply_markup: FakeMarkup | None = None
+    outgoing: bool = False
+    reply_to_message_id: int | None = None
+    date: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    edit_date: datetime | None = None
+
+
+@dataclass(frozen=True)
+class FakeHandler:
+    kind: str
+    callback: Callable[[Any, Any], Awaitable[None]]
+    chat: str | int | None = None
+
+
+@dataclass(frozen=True)
+class FakeCallbackAnswer:
+    """Mirrors ``pyrogram.types.BotCallbackAnswer``."""
+
+    message: str | None = None
+    alert: bool = False
+    url: str | None = None
+
+
+class DataInvalid(Exception):
+    """Mirrors ``pyrogram.errors.DataInvalid``: the message has no button with that callback data."""
+
+
+class FloodWait(Exception):
+    """Mirrors ``pyrogram.errors.FloodWait``: ``value`` is the wait in seconds."""
+
+    def __init__(self, value: float) -> None:
+        super().__init__(f"A wait of {value} seconds is required")
+        self.value = value
+
+
+Responder = Callable[["FakeClient", FakeMessage], Awaitable[None]]
+CallbackResponder = Callable[["FakeClient", FakeMessage, str], Awaitable[FakeCallbackAnswer]]
+
+
+def keyboard(*rows: list[tuple[str, str]]) -> FakeMarkup:
+    return FakeMarkup(inline_keyboard=[[FakeButton(text, data) for text, data in row] for row in rows])
+
+
+class FakeClient:
+    """In-process stand-in for the subset of ``pyrogram.Client`` the executor uses.
+
+    Outgoing ``send_message`` calls are handed to an optional ``responder``
+    coroutine, which plays the bot by calling ``bot_reply``/``bot_edit``.
+    Those dispatch to registered message/edited-message handlers exactly as
+    pyrogram would, and are also visible through ``get_chat_history``.
+    ``request_callback_answer`` presses a button on a bot message and awaits
+    the ``callback_responder``'s answer.
+    """
+
+    def __init__(self, responder: Responder | None = None, callback_responder: CallbackResponder | None = None) -> None:
+        self.responder = responder
+        self.callback_responder = callback_responder
+        self._ids = itertools.count(1)
+        self._chats: dict[str, FakeChat] = {}
+        self._history: dict[int, list[FakeMessage]] = {}
+        self._handlers: dict[int, list[FakeHandler]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.sent: list[FakeMessage] = []
+        self.flood_until = 0.0
+
+    def throttle(self, seconds: float) -> None:
+        self.flood_until = time.monotonic() + seconds
+
+    async def __aenter__(self) -> "FakeClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.drain()
+
+    async def drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def chat(self, chat_id: str | int) -> FakeChat:
+        key = str(chat_id).lstrip("@")
+        if key not in self._chats:
+            self._chats[key] = FakeChat(id=-(len(self._chats) + 1000), username=key)
+        return self._chats[key]
+
+    @staticmethod
+    def make_handler(kind: str, callback: Callable[[Any, Any], Awaitable[None]], chat: str | int | None = None) -> FakeHandler:
+        return FakeHandler(kind=kind, callback=callback, chat=chat)
+
+    def add_handler(self, handler: FakeHandler, group: int = 0) -> FakeHandler:
+        self._handlers.setdefault(group, []).append(handler)
+        return handler
+
+    def remove_handler(self, handler: FakeHandler, group: int = 0) -> None:
+        handlers = self._handlers.get(group, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def _dispatch(self, kind: str, message: FakeMessage) -> None:
+        for group in sorted(self._handlers):
+            for handler in self._handlers[group]:
+                if handler.kind != kind:
+                    continue
+                if handler.chat is not None and self.chat(handler.chat).id != message.chat.id:
+                    continue
+                self._spawn(handler.callback(self, message))
+                break
+
+    def _store(self, message: FakeMessage) -> FakeMessage:
+        self._history.setdefault(message.chat.id, []).append(message)
+        return message
+
+    async def send_message(self, chat_id: str | int, text: str, **kwargs: Any) -> FakeMessage:
+        remaining = self.flood_until - time.monotonic()
+        if remaining > 0:
+            raise FloodWait(round(remaining, 3))
+        message = self._store(FakeMessage(id=next(self._ids), chat=self.chat(chat_id), text=text, outgoing=True))
+        self.sent.append(message)
+        self._dispatch("message", message)
+        if self.responder is not None:
+            self._spawn(self.responder(self, message))
+        return message
+
+    async def request_callback_answer(self, chat_id: str | int, message_id: int, callback_data: str | bytes, timeout: float = 10) -> FakeCallbackAnswer:
+        data = callback_data.decode("utf-8") if isinstance(callback_data, bytes) else callback_data
+        message = self.find_message(chat_id, message_id)
+        if message is None or message.reply_markup is None:
+            raise DataInvalid(f"Message {message_id} in {chat_id} has no inline keyboard")
+        if not any(btn.callback_data == data for row in message.reply_markup.inline_keyboard for btn in row):
+            raise DataInvalid(f"No button with callback data {data!r} on message {message_id}")
+        if self.callback_responder is None:
+            # Like pyrogram when the bot never answers the query.
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(self.callback_responder(self, message, data), timeout)
+
+    def bot_reply(self, chat_id: str | int, text: str, reply_markup: FakeMarkup | None = None, reply_to_message_id: int | None = None) -> FakeMessage:
+        message = self._store(
+            FakeMessage(id=next(self._ids), chat=self.chat(chat_id), text=text, reply_markup=reply_markup, reply_to_message_id=reply_to_message_id)
+        )
+        self._dispatch("message", message)
+        return message
+
+    def bot_edit(self, chat_id: str | int, message_id: int, text: str | None = None, reply_markup: FakeMarkup | None = None) -> FakeMessage:
+        message = self.find_message(chat_id, message_id)
+        if message is None:
+            raise ValueError(f"Unknown message {message_id} in {chat_id}")
+        if text is not None:
+            message.text = text
+        if reply_markup is not None:
+            message.reply_markup = reply_markup
+        message.edit_date = datetime.now(timezone.utc)
+        self._dispatch("edited_message", message)
+        return message
+
+    def find_message(self, chat_id: str | int, message_id: int) -> FakeMessage | None:
+        for message in self._history.get(self.chat(chat_id).id, []):
+            if message.id == message_id:
+                return message
+        return None
+
+    async def get_chat_history(self, chat_id: str | int, limit: int = 0, offset_id: int = 0) -> AsyncIterator[FakeMessage]:
+        history = self._history.get(self.chat(chat_id).id, [])
+        served = 0
+        for message in reversed(list(history)):
+            if offset_id and message.id >= offset_id:
+                continue
+            if limit and served >= limit:
+                return
+            served += 1
+            yield message
+
+
+def echo_responder(delay: float = 0.0, replies: int = 1) -> Responder:
+    async def respond(client: FakeClient, message: FakeMessage) -> None:
+        for i in range(replies):
+            await asyncio.sleep(delay)
+            client.bot_reply(message.chat.username, f"Done: {message.text} #{i + 1}", reply_to_message_id=message.id)
+
+    return respond
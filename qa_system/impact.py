@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from .discovery_cache import DiscoveryCache
+from .models import Scenario
+from .source_scanner import FileSymbols, is_source_path, scan_text
+
+
+@dataclass(frozen=True)
+class ImpactReport:
+    rev_range: str
+    base: str
+    changed_files: tuple[str, ...]
+    commands: tuple[str, ...]
+    buttons: tuple[str, ...]
+    removed_commands: tuple[str, ...]
+    removed_buttons: tuple[str, ...]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rev_range": self.rev_range,
+            "base": self.base,
+            "changed_files": list(self.changed_files),
+            "commands": list(self.commands),
+            "buttons": list(self.buttons),
+            "removed_commands": list(self.removed_commands),
+            "removed_buttons": list(self.removed_buttons),
+        }
+
+
+def _git(repo_root: Path, *args: str, check: bool = True) -> str | None:
+    proc = subprocess.run(["git", "-C", str(repo_root), *args], capture_output=True)
+    if proc.returncode != 0:
+        if check:
+            raise ValueError(f"git {' '.join(args)} failed: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+        return None
+    return proc.stdout.decode("utf-8", errors="ignore")
+
+
+def changed_files(repo_root: Path, rev_range: str) -> list[str]:
+    # --relative keeps paths relative to repo_root even when it is a subdirectory of the checkout.
+    out = _git(repo_root, "diff", "--name-only", "--no-renames", "--relative", "-z", rev_range) or ""
+    return sorted({name for name in out.split("\0") if name})
+
+
+def base_revision(repo_root: Path, rev_range: str) -> str:
+    if "..." in rev_range:
+        left, right = rev_range.split("...", 1)
+        return (_git(repo_root, "merge-base", left or "HEAD", right or "HEAD") or "").strip()
+    left = rev_range.split("..", 1)[0] if ".." in rev_range else rev_range
+    return (_git(repo_root, "rev-parse", "--verify", f"{left or 'HEAD'}^{{commit}}") or "").strip()
+
+
+def symbols_at_revision(repo_root: Path, rev: str, rel_path: str) -> FileSymbols:
+    text = _git(repo_root, "show", f"{rev}:./{rel_path}", check=False)
+    return FileSymbols() if text is None else scan_text(text)
+
+
+def _capability_symbols(capabilities: dict[str, Any]) -> tuple[set[str], set[str]]:
+    commands = capabilities.get("commands", {})
+    return set(commands.get("user", [])) | set(commands.get("admin", [])), set(capabilities.get("callbacks", []))
+
+
+def analyze_impact(
+    repo_root: Path,
+    rev_range: str,
+    cache: DiscoveryCache,
+    capabilities: dict[str, Any],
+    capabilities_rel: str | None = None,
+    workers: int = 0,
+    crawled_buttons: Iterable[str] = (),
+) -> ImpactReport:
+    """Commands and buttons touched by ``rev_range``.
+
+    The base side of each changed file is scanned from git; the head side is
+    the checked-out tree, re-scanned through ``cache`` so the persisted
+    file-to-symbol index stays current. A symbol is impacted when a changed
+    file mentions it on either side; impacted symbols no longer defined
+    anywhere in the tree (or, for callbacks, seen by the menu crawler) are
+    reported as removed instead.
+    """
+    base = base_revision(repo_root, rev_range)
+    changed = changed_files(repo_root, rev_range)
+    sources = [rel for rel in changed if is_source_path(rel)]
+    if cache.entries:
+        index = cache.update(repo_root, sources, workers=workers)
+    else:
+        # No index yet (fresh CI checkout): build it once for the whole tree.
+        index = cache.refresh(repo_root, workers=workers)
+    cache.save()
+
+    touched_commands: set[str] = set()
+    touched_buttons: set[str] = set()
+    for rel in sources:
+        for symbols in (symbols_at_revision(repo_root, base, rel), index.get(rel, FileSymbols())):
+            touched_commands.update(symbols.commands)
+            touched_buttons.update(symbols.buttons)
+
+    cap_commands, cap_buttons = _capability_symbols(capabilities)
+    if capabilities_rel and capabilities_rel in changed:
+        text = _git(repo_root, "show", f"{base}:./{capabilities_rel}", check=False)
+        try:
+            old_commands, old_buttons = _capability_symbols(json.loads(text) if text else {})
+        except ValueError:
+            old_commands, old_buttons = set(), set()
+        touched_commands |= old_commands ^ cap_commands
+        touched_buttons |= old_buttons ^ cap_buttons
+
+    live_commands = cap_commands.union(*(s.commands for s in index.values()))
+    live_buttons = cap_buttons.union(crawled_buttons, *(s.buttons for s in index.values()))
+    return ImpactReport(
+        rev_range=rev_range,
+        base=base,
+        changed_files=tuple(changed),
+        commands=tuple(sorted(touched_commands & live_commands)),
+        buttons=tuple(sorted(touched_buttons & live_buttons)),
+        removed_commands=tuple(sorted(touched_commands - live_commands)),
+        removed_buttons=tuple(sorted(touched_buttons - live_buttons)),
+    )
+
+
+def impacted_scenarios(scenarios: list[Scenario], report: ImpactReport, capabilities: dict[str, Any], contexts: set[str]) -> list[dict[str, Any]]:
+    commands = capabilities.get("commands", {})
+    admin_only = set(commands.get("admin", [])) - set(commands.get("user", []))
+    selected: list[dict[str, Any]] = []
+    for scenario in scenarios:
+        if not scenario.active or scenario.context not in contexts:
+            continue
+        # Reduced scenarios carry their one command; full-product ones run every impacted command.
+        candidates = (scenario.command,) if scenario.command else report.commands
+        scenario_commands = [c for c in candidates if scenario.role == "admin" or c not in admin_only]
+        if not scenario_commands and not report.buttons:
+            continue
+        selected.append({**scenario.to_dict(), "commands": scenario_commands, "buttons": list(report.buttons)})
+    return selected
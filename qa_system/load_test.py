@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from .capture import MessageCapture
+from .correlation import LatencyStats, ResponseCorrelator, command_label, distribution
+from .debug_metadata import DebugMetadataParser
+from .multi_match import literal_alternation
+from .session_pool import SessionPool, flood_wait_seconds
+
+DEFAULT_REPLY_TIMEOUT = 10.0
+DEFAULT_SETTLE = 1.0
+DEFAULT_MAX_OUTSTANDING = 1000
+# Upper bounds (ms) of the reported latency histogram buckets; the last bucket is open-ended.
+HISTOGRAM_BOUNDS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass(frozen=True)
+class MixEntry:
+    kind: str
+    text: str
+    weight: float = 1.0
+
+
+def load_mix(capabilities: Mapping[str, Any], include_callbacks: bool = True) -> list[MixEntry]:
+    """Commands (user and admin) and, optionally, callbacks from ``bot_capabilities.json``.
+
+    ``scenario_weights.command`` weights apply to commands as they do for scenario reduction.
+    """
+    weights = (capabilities.get("scenario_weights") or {}).get("command", {})
+    commands = capabilities.get("commands", {})
+    mix = [MixEntry("command", cmd, float(weights.get(cmd, 1.0))) for cmd in [*commands.get("user", []), *commands.get("admin", [])]]
+    if include_callbacks:
+        mix.extend(MixEntry("callback", data) for data in capabilities.get("callbacks", []))
+    return [entry for entry in mix if entry.weight > 0]
+
+
+def histogram(samples: list[float]) -> dict[str, int]:
+    buckets = {f"le_{bound}": 0 for bound in HISTOGRAM_BOUNDS_MS}
+    buckets["le_inf"] = 0
+    for sample in samples:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if sample <= bound:
+                buckets[f"le_{bound}"] += 1
+                break
+        else:
+            buckets["le_inf"] += 1
+    return buckets
+
+
+class LoadTest:
+    """Open-loop load generator: arrivals follow a Poisson process at ``rate`` per second.
+
+    Each arrival is fired without waiting for earlier ones to finish, so a slow
+    bot shows up as growing latency and timeouts rather than a lower offered
+    rate. ``max_outstanding`` only guards memory: arrivals beyond it are shed
+    and counted. Sends go through a ``SessionPool`` when given one (FloodWait
+    sessions are skipped) and replies are matched with ``ResponseCorrelator``.
+    Callback presses need a bot message carrying that ``callback_data`` and a
+    client with ``request_callback_answer``; otherwise they are counted as
+    skipped.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        chat: str,
+        capabilities: Mapping[str, Any],
+        rate: float,
+        duration: float,
+        seed: int = 0,
+        reply_timeout: float = DEFAULT_REPLY_TIMEOUT,
+        settle: float = DEFAULT_SETTLE,
+        max_outstanding: int = DEFAULT_MAX_OUTSTANDING,
+        include_callbacks: bool = True,
+    ) -> None:
+        if rate <= 0 or duration <= 0:
+            raise ValueError("rate and duration must be positive")
+        self.app = app
+        self.chat = chat
+        self.rate = rate
+        self.duration = duration
+        self.reply_timeout = reply_timeout
+        self.max_outstanding = max(max_outstanding, 1)
+        self.mix = load_mix(capabilities, include_callbacks)
+        if not self.mix:
+            raise ValueError("bot_capabilities.json declares no commands or callbacks to load-test")
+        self._rng = random.Random(seed)
+        self._weights = [entry.weight for entry in self.mix]
+        self._parser = DebugMetadataParser.from_capabilities(capabilities)
+        errors = literal_alternation(capabilities.get("error_messages", []))
+        self._errors = re.compile(errors) if errors else None
+        self._correlator = ResponseCorrelator(timeout=reply_timeout, settle=settle)
+        self._stats = LatencyStats()
+        self._buttons: dict[str, tuple[Any, int]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.counters = {"offered": 0, "sent": 0, "shed": 0, "callbacks_skipped": 0, "replies": 0}
+        self.send_errors: dict[str, int] = {}
+        self.error_codes: dict[str, int] = {}
+        self.callback_answer_ms: dict[str, list[float]] = {}
+
+    def _sessions(self) -> list[tuple[str | None, Any]]:
+        return list(self.app.sessions()) if isinstance(self.app, SessionPool) else [(None, self.app)]
+
+    def _key(self, session: str | None) -> str:
+        return self.chat if session is None else f"{self.chat}@{session}"
+
+    def _count(self, bucket: dict[str, int], key: str) -> None:
+        bucket[key] = bucket.get(key, 0) + 1
+
+    async def _fire(self, seq: int, entry: MixEntry) -> None:
+        try:
+            if entry.kind == "callback":
+                await self._press(entry.text)
+                return
+            sent_at = time.monotonic()
+            if isinstance(self.app, SessionPool):
+                session, sent = await self.app.send_message(self.chat, entry.text, route=f"load:{seq}")
+            else:
+                session, sent = None, await self.app.send_message(self.chat, entry.text)
+            self._correlator.track(self._key(session), sent.id, "command", command_label(entry.text), sent_at)
+            self.counters["sent"] += 1
+        except asyncio.TimeoutError:
+            self._count(self.send_errors, "timeout")
+        except Exception as exc:
+            self._count(self.send_errors, "FloodWait" if flood_wait_seconds(exc) is not None else type(exc).__name__)
+
+    async def _press(self, data: str) -> None:
+        target = self._buttons.get(data)
+        if target is None or not hasattr(target[0], "request_callback_answer"):
+            self.counters["callbacks_skipped"] += 1
+            return
+        client, message_id = target
+        started = time.monotonic()
+        answer = await asyncio.wait_for(client.request_callback_answer(self.chat, message_id, data), self.reply_timeout)
+        self.counters["sent"] += 1
+        self.callback_answer_ms.setdefault(data, []).append(round((time.monotonic() - started) * 1000, 2))
+        self._count_error(getattr(answer, "message", None) or "")
+
+    def _count_error(self, text: str) -> None:
+        code = self._parser.parse(text).get("error_code")
+        if not code and self._errors is not None:
+            match = self._errors.search(text)
+            code = match.group(0) if match else None
+        if code:
+            self._count(self.error_codes, str(code))
+
+    def _observe(self, item: Any, clients: dict[str, Any]) -> None:
+        message = item.message
+        if getattr(message, "outgoing", False):
+            return
+        if self._correlator.observe(item.key, message, item.received_at, edited=item.edited) is not None and not item.edited:
+            self.counters["replies"] += 1
+        markup = getattr(message, "reply_markup", None)
+        for row in getattr(markup, "inline_keyboard", None) or []:
+            for button in row:
+                if getattr(button, "callback_data", None):
+                    self._buttons[button.callback_data] = (clients[item.key], message.id)
+        if not item.edited:
+            self._count_error(message.text or message.caption or "")
+
+    def _finish(self, force: bool = False) -> None:
+        for entry in self._correlator.expire(time.monotonic(), force=force):
+            self._stats.add(entry)
+
+    async def _consume(self, queue: asyncio.Queue, clients: dict[str, Any], stop: asyncio.Event) -> None:
+        while not (stop.is_set() and queue.empty()):
+            try:
+                item = await asyncio.wait_for(queue.get(), 0.05)
+            except asyncio.TimeoutError:
+                self._finish()
+                continue
+            self._observe(item, clients)
+            self._finish()
+
+    async def run(self) -> dict[str, Any]:
+        queue: asyncio.Queue = asyncio.Queue()
+        captures: list[tuple[Any, MessageCapture]] = []
+        clients: dict[str, Any] = {}
+        for session, client in self._sessions():
+            capture = MessageCapture(self.chat, key=self._key(session), queue=queue)
+            capture.attach(client)
+            captures.append((client, capture))
+            clients[capture.key] = client
+        stop = asyncio.Event()
+        consumer = asyncio.ensure_future(self._consume(queue, clients, stop))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            next_at = started
+            seq = 0
+            while True:
+                next_at += self._rng.expovariate(self.rate)
+                if next_at - started >= self.duration:
+                    break
+                await asyncio.sleep(max(next_at - loop.time(), 0.0))
+                self.counters["offered"] += 1
+                if len(self._tasks) >= self.max_outstanding:
+                    self.counters["shed"] += 1
+                    continue
+                entry = self._rng.choices(self.mix, self._weights)[0]
+                task = asyncio.ensure_future(self._fire(seq, entry))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                seq += 1
+            send_window = loop.time() - started
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=self.reply_timeout)
+            # Give the last replies their full window before closing the books.
+            deadline = loop.time() + self.reply_timeout
+            while len(self._correlator) and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            stop.set()
+            await consumer
+            for task in list(self._tasks):
+                task.cancel()
+            for client, capture in captures:
+                capture.detach(client)
+        self._finish(force=True)
+        return self._report(send_window, loop.time() - started)
+
+    def _report(self, send_window: float, elapsed: float) -> dict[str, Any]:
+        first_reply = [sample for samples in self._stats.first_reply.values() for sample in samples]
+        final_edit = [sample for samples in self._stats.final_edit.values() for sample in samples]
+        answers = [sample for samples in self.callback_answer_ms.values() for sample in samples]
+        replies = self.counters["replies"] + len(answers)
+        timeouts = sum(self._stats.timeouts.values())
+        return {
+            "target_rate": self.rate,
+            "duration_s": self.duration,
+            "elapsed_s": round(elapsed, 3),
+            **self.counters,
+            "timeouts": timeouts,
+            "offered_per_second": round(self.counters["offered"] / max(send_window, 1e-9), 2),
+            "sent_per_second": round(self.counters["sent"] / max(send_window, 1e-9), 2),
+            "replies_per_second": round(replies / max(elapsed, 1e-9), 2),
+            "send_errors": dict(sorted(self.send_errors.items())),
+            "error_codes": {code: {"count": n, "rate": round(n / max(replies, 1), 4)} for code, n in sorted(self.error_codes.items())},
+            "latency": {
+                "first_reply_ms": {**distribution(first_reply), "histogram": histogram(first_reply)},
+                "final_edit_ms": {**distribution(final_edit), "histogram": histogram(final_edit)},
+                "callback_answer_ms": {**distribution(answers), "histogram": histogram(answers)},
+            },
+            "per_label": {
+                **self._stats.summary(),
+                "callbacks": {data: {"answers": len(samples), "answer_ms": distribution(samples)} for data, samples in sorted(self.callback_answer_ms.items())},
+            },
+        }
+
+
+async def run_load_test(app: Any, chat: str, capabilities: Mapping[str, Any], rate: float, duration: float, **kwargs: Any) -> dict[str, Any]:
+    return await LoadTest(app, chat, capabilities, rate, duration, **kwargs).run()
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Iterator
+
+LOG_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+DEFAULT_FSYNC_EVERY = 32
+DEFAULT_FSYNC_INTERVAL = 1.0
+DEFAULT_INDEX_EVERY = 64
+
+
+def _stem(log_name: str) -> str:
+    return log_name[: -len(".json")] if log_name.endswith(".json") else log_name
+
+
+def log_path(directory: Path, log_name: str) -> Path:
+    return directory / f"{_stem(log_name)}{LOG_SUFFIX}"
+
+
+def index_path(directory: Path, log_name: str) -> Path:
+    return directory / f"{_stem(log_name)}{INDEX_SUFFIX}"
+
+
+def _legacy_path(directory: Path, log_name: str) -> Path:
+    return directory / f"{_stem(log_name)}.json"
+
+
+def _encode(entry: Any) -> bytes:
+    return (json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _decode_lines(handle) -> Iterator[tuple[int, Any]]:
+    while True:
+        offset = handle.tell()
+        line = handle.readline()
+        if not line:
+            return
+        if not line.endswith(b"\n"):
+            # Torn tail from a crash mid-append; it is truncated on the next open.
+            return
+        try:
+            yield offset, json.loads(line)
+        except ValueError:
+            continue
+
+
+def _read_index(path: Path) -> list[tuple[int, int]]:
+    if not path.exists():
+        return []
+    points: list[tuple[int, int]] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+            points.append((int(parts[0]), int(parts[1])))
+    return points
+
+
+class _LogWriter:
+    def __init__(self, path: Path, idx_path: Path, index_every: int) -> None:
+        self.path = path
+        self.idx_path = idx_path
+        self.index_every = index_every
+        self.handle = path.open("ab")
+        self.idx_handle = idx_path.open("a", encoding="utf-8")
+        # Under the lock no other writer is mid-append, so a torn tail really is left over from a crash.
+        with self._locked():
+            self.count, self.size = self._recover()
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+
+    def _recover(self) -> tuple[int, int]:
+        size = self.path.stat().st_size
+        points = _read_index(self.idx_path)
+        valid = [point for point in points if point[1] <= size]
+        if len(valid) != len(points):
+            self.idx_path.write_text("".join(f"{c} {o}\n" for c, o in valid), encoding="utf-8")
+        count, offset = valid[-1] if valid else (0, 0)
+        good_end = offset
+        with self.path.open("rb") as handle:
+            handle.seek(offset)
+            while True:
+                line = handle.readline()
+                if not line or not line.endswith(b"\n"):
+                    break
+                good_end += len(line)
+                count += 1
+        if good_end != size:
+            with self.path.open("r+b") as handle:
+                handle.truncate(good_end)
+        return count, good_end
+
+    def _catch_up(self) -> None:
+        # Other processes writing the same day (--service next to --crawl or --load-test) move the end
+        # of the file; count their entries so index points stay true for every writer.
+        size = os.fstat(self.handle.fileno()).st_size
+        if size < self.size:
+            self.count, self.size = self._recover()
+        elif size > self.size:
+            with self.path.open("rb") as handle:
+                handle.seek(self.size)
+                self.count += sum(1 for line in handle if line.endswith(b"\n"))
+            self.size = size
+
+    def refresh(self) -> int:
+        with self._locked():
+            self._catch_up()
+        return self.count
+
+    def append(self, entry: Any) -> None:
+        data = _encode(entry)
+        # The entry and its index point reach the files before the lock is released.
+        with self._locked():
+            self._catch_up()
+            if self.count % self.index_every == 0:
+                self.idx_handle.write(f"{self.count} {self.size}\n")
+                self.idx_handle.flush()
+            self.handle.write(data)
+            self.handle.flush()
+            self.size += len(data)
+            self.count += 1
+        self.pending += 1
+
+    def flush(self, sync: bool) -> None:
+        self.handle.flush()
+        self.idx_handle.flush()
+        if sync and self.pending:
+            os.fsync(self.handle.fileno())
+            os.fsync(self.idx_handle.fileno())
+            self.pending = 0
+            self.last_sync = time.monotonic()
+
+    def close(self) -> None:
+        self.flush(sync=True)
+        self.handle.close()
+        self.idx_handle.close()
+
+
+class LogStore:
+    """Append-only JSON-lines logs for one day directory.
+
+    Each entry is one newline-framed JSON document in ``<name>.jsonl``. Every
+    ``index_every`` entries the sidecar ``<name>.idx`` records ``count offset``
+    so tails can be read without scanning the whole day. ``fsync`` is batched
+    by entry count and elapsed time. Appends hold an exclusive ``fcntl`` lock
+    on the log, so several processes can share a day directory.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        fsync_every: int = DEFAULT_FSYNC_EVERY,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+        index_every: int = DEFAULT_INDEX_EVERY,
+    ) -> None:
+        self.directory = directory
+        self.fsync_every = max(fsync_every, 1)
+        self.fsync_interval = fsync_interval
+        self.index_every = max(index_every, 1)
+        self._writers: dict[str, _LogWriter] = {}
+
+    def _writer(self, log_name: str) -> _LogWriter:
+        stem = _stem(log_name)
+        writer = self._writers.get(stem)
+        if writer is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            writer = _LogWriter(log_path(self.directory, stem), index_path(self.directory, stem), self.index_every)
+            self._writers[stem] = writer
+        return writer
+
+    def append(self, log_name: str, entry: Any) -> None:
+        writer = self._writer(log_name)
+        writer.append(entry)
+        due = writer.pending >= self.fsync_every or time.monotonic() - writer.last_sync >= self.fsync_interval
+        writer.flush(sync=due)
+
+    def count(self, log_name: str) -> int:
+        return self._writer(log_name).refresh()
+
+    def flush(self) -> None:
+        for writer in self._writers.values():
+            writer.flush(sync=True)
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def read(self, log_name: str) -> list[Any]:
+        self._flush_buffer(log_name)
+        return read_log(self.directory, log_name)
+
+    def tail(self, log_name: str, limit: int) -> list[Any]:
+        self._flush_buffer(log_name)
+        return tail_log(self.directory, log_name, limit)
+
+    def _flush_buffer(self, log_name: str) -> None:
+        writer = self._writers.get(_stem(log_name))
+        if writer is not None:
+            writer.flush(sync=False)
+
+
+def read_legacy_log(directory: Path, log_name: str) -> list[Any]:
+    """Entries of a legacy ``<name>.json`` array, or nothing when there is none."""
+    legacy = _legacy_path(directory, log_name)
+    if not legacy.exists():
+        return []
+    loaded = json.loads(legacy.read_text(encoding="utf-8"))
+    return loaded if isinstance(loaded, list) else []
+
+
+def read_log(directory: Path, log_name: str) -> list[Any]:
+    """Compatibility reader returning the JSON-array view of a log.
+
+    Entries from a legacy ``<name>.json`` array written before the switch to
+    JSON lines come first, followed by the appended ``.jsonl`` entries.
+    """
+    entries = read_legacy_log(directory, log_name)
+    path = log_path(directory, log_name)
+    if path.exists():
+        with path.open("rb") as handle:
+            entries.extend(entry for _, entry in _decode_lines(handle))
+    return entries
+
+
+def read_log_from(directory: Path, log_name: str, offset: int = 0) -> tuple[list[Any], int]:
+    """Entries of ``<name>.jsonl`` starting at byte ``offset``, plus the offset to resume from.
+
+    The resume offset stops before a torn tail, so an append still in flight
+    is picked up whole next time. An offset past the end of the file means it
+    was replaced, and reading starts again from the beginning.
+    """
+    path = log_path(directory, log_name)
+    if not path.exists():
+        return [], 0
+    if offset > path.stat().st_size:
+        offset = 0
+    entries: list[Any] = []
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        for line in iter(handle.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries, offset
+
+
+def tail_log(directory: Path, log_name: str, limit: int) -> list[Any]:
+    if limit <= 0:
+        return []
+    path = log_path(directory, log_name)
+    if not path.exists():
+        return read_log(directory, log_name)[-limit:]
+    points = _read_index(index_path(directory, log_name))
+    # Step back far enough that at least ``limit`` entries follow the checkpoint.
+    if points:
+        every = points[1][0] - points[0][0] if len(points) > 1 else max(points[0][0], 1)
+        back = -(-limit // max(every, 1)) + 1
+        start_count, start_offset = points[max(len(points) - back, 0)]
+    else:
+        start_count, start_offset = 0, 0
+    window: deque[Any] = deque(maxlen=limit)
+    with path.open("rb") as handle:
+        handle.seek(start_offset)
+        window.extend(entry for _, entry in _decode_lines(handle))
+    if len(window) < limit and start_count == 0:
+        legacy = _legacy_path(directory, log_name)
+        if legacy.exists():
+            return read_log(directory, log_name)[-limit:]
+    return list(window)
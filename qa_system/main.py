@@ -6,11 +6,15 @@ from pathlib import Path
 
 from .capabilities import load_capabilities, load_repo_info
 from .config import QAConfig, TELEGRAM_DEFAULT
+from .correlation import latest_latency_summary
+from .crawler import crawl_graph_path
 from .flows import write_admin_flow_map, write_error_flow_map, write_onboarding_flow_map
-from .matrix_generator import build_button_matrix, build_command_matrix, discover_buttons, discover_commands, write_button_matrix, write_command_matrix
+from .discovery_cache import CACHE_FILENAME, DiscoveryCache, discover_cached
+from .impact import analyze_impact, impacted_scenarios
+from .matrix_generator import MATRIX_CONTEXTS, crawled_callbacks, discover_symbols, iter_button_rows, iter_command_rows, write_button_matrix, write_command_matrix
 from .providers import resolve_provider
 from .reporter import write_improvements, write_logs, write_summary
-from .scenarios import generate_scenarios
+from .scenarios import generate_reduced_scenarios, generate_scenarios
 from .test_engine import build_test_plan
 
 
@@ -24,6 +28,14 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--repo-info", default=None, help="Path to repo_info.json")
     parser.add_argument("--ai-provider", default="termux_qwen", help="AI provider: termux_qwen|termux_deepseek_r1|deepseek_chat|gemini_free|chatgpt_free")
     parser.add_argument("--ai-model", default=None, help="Optional model override")
+    parser.add_argument("--scan-workers", type=int, default=0, help="Processes for source discovery (0 scans in-process)")
+    parser.add_argument("--matrix-constants-sidecar", action="store_true", help="Move constant matrix columns into <matrix>.constants.json")
+    parser.add_argument("--reduce", type=int, default=0, metavar="T", help="Emit a T-wise covering set of command/context/role scenarios instead of the full product (2 = pairwise)")
+    parser.add_argument("--crawl-graph", default=None, help="callback_graph.json from the executor's menu crawler (default: qa/state/crawl/<bot>/callback_graph.json)")
+    parser.add_argument("--impact", default=None, metavar="REV_RANGE", help="Only emit impacted_* artifacts for files changed in this git range (e.g. origin/main...HEAD)")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument("--no-cache", action="store_true", help=f"Rescan every source file and leave {CACHE_FILENAME} untouched")
+    cache.add_argument("--rebuild-cache", action="store_true", help=f"Discard {CACHE_FILENAME} and rebuild it from a full scan")
     return parser.parse_args()
 
 
@@ -43,7 +55,7 @@ def _atomic_write_json(path: Path, payload: object) -> None:
     tmp.replace(path)
 
 
-def run(config: QAConfig, bot_name: str = "runewager", capabilities_path: Path | None = None, repo_info_path: Path | None = None, ai_provider: str = "termux_qwen", ai_model: str | None = None) -> dict:
+def run(config: QAConfig, bot_name: str = "runewager", capabilities_path: Path | None = None, repo_info_path: Path | None = None, ai_provider: str = "termux_qwen", ai_model: str | None = None, scan_workers: int = 0, use_cache: bool = True, rebuild_cache: bool = False, constants_sidecar: bool = False, reduce_strength: int = 0, crawl_graph: Path | None = None) -> dict:
     output = config.output_dir
     output.mkdir(parents=True, exist_ok=True)
 
@@ -51,23 +63,36 @@ def run(config: QAConfig, bot_name: str = "runewager", capabilities_path: Path |
     repo_info = load_repo_info(repo_info_path or (config.repo_root / "qa" / "context" / "repo_info.json"))
     test_plan = build_test_plan(capabilities)
 
-    commands = sorted(set(discover_commands(config.repo_root) + capabilities.get("commands", {}).get("user", []) + capabilities.get("commands", {}).get("admin", [])))
-    buttons = sorted(set(discover_buttons(config.repo_root) + capabilities.get("callbacks", [])))
+    if use_cache:
+        discovered_commands, discovered_buttons, _ = discover_cached(config.repo_root, output / CACHE_FILENAME, workers=scan_workers, rebuild=rebuild_cache)
+    else:
+        discovered_commands, discovered_buttons = discover_symbols(config.repo_root, workers=scan_workers)
+    commands = sorted(set(discovered_commands + capabilities.get("commands", {}).get("user", []) + capabilities.get("commands", {}).get("admin", [])))
+    crawled = crawled_callbacks(crawl_graph or crawl_graph_path(config.repo_root, bot_name))
+    buttons = sorted(set(discovered_buttons + capabilities.get("callbacks", []) + crawled))
 
-    write_command_matrix(output / "command_matrix.csv", build_command_matrix(commands))
-    write_button_matrix(output / "button_callback_matrix.csv", build_button_matrix(buttons))
+    write_command_matrix(output / "command_matrix.csv", iter_command_rows(commands), constants_sidecar=constants_sidecar)
+    write_button_matrix(output / "button_callback_matrix.csv", iter_button_rows(buttons), constants_sidecar=constants_sidecar)
 
     write_onboarding_flow_map(output / "onboarding_flow_map.md")
     write_admin_flow_map(output / "admin_flow_map.md")
     write_error_flow_map(output / "error_flow_map.md")
 
-    scenarios = generate_scenarios()
+    reduction = None
+    if reduce_strength:
+        scenarios, coverage = generate_reduced_scenarios(commands, capabilities, strength=reduce_strength)
+        reduction = coverage.as_dict()
+        _atomic_write_json(output / "scenario_reduction.json", reduction)
+    else:
+        scenarios = generate_scenarios()
     write_logs(output, scenarios, dry_run=config.dry_run)
-    write_summary(output, len([s for s in scenarios if s.active]), len(commands), len(buttons), test_plan=test_plan)
+    # Reply latencies measured by the executor for this bot (newest day with samples), if it has run here.
+    latency = latest_latency_summary(config.repo_root, bot_name)
+    write_summary(output, len([s for s in scenarios if s.active]), len(commands), len(buttons), test_plan=test_plan, latency=latency)
     write_improvements(output)
 
     provider_cfg = resolve_provider(ai_provider, ai_model)
-    _atomic_write_json(output / "ai_reasoning_config.json", {"provider": provider_cfg.provider, "model": provider_cfg.model, "api_key_env": provider_cfg.api_key_env, "execution_location": provider_cfg.execution_location, "runs_on_vps": False})
+    _atomic_write_json(output / "ai_reasoning_config.json", {"provider": provider_cfg.provider, "model": provider_cfg.model, "api_key_env": provider_cfg.api_key_env, "execution_location": provider_cfg.execution_location, "digest_token_budget": provider_cfg.digest_token_budget, "runs_on_vps": False})
 
     meta = {
         "bot_name": bot_name,
@@ -76,6 +101,7 @@ def run(config: QAConfig, bot_name: str = "runewager", capabilities_path: Path |
         "dry_run": config.dry_run,
         "commands": len(commands),
         "buttons": len(buttons),
+        "crawled_callbacks": len(crawled),
         "scenarios": len(scenarios),
         "ai_provider": provider_cfg.provider,
         "ai_model": provider_cfg.model,
@@ -84,13 +110,74 @@ def run(config: QAConfig, bot_name: str = "runewager", capabilities_path: Path |
         "capabilities_loaded": sorted(capabilities.keys()),
         "repo_info": repo_info,
     }
+    if reduction is not None:
+        meta["scenario_reduction"] = reduction
     _atomic_write_json(output / "run_meta.json", meta)
     return meta
 
 
+def run_impact(config: QAConfig, rev_range: str, bot_name: str = "runewager", capabilities_path: Path | None = None, scan_workers: int = 0, use_cache: bool = True, rebuild_cache: bool = False, constants_sidecar: bool = False, reduce_strength: int = 0, crawl_graph: Path | None = None) -> dict:
+    output = config.output_dir
+    output.mkdir(parents=True, exist_ok=True)
+    capabilities_path = capabilities_path or (config.repo_root / "qa" / "context" / "bot_capabilities.json")
+    capabilities = load_capabilities(capabilities_path)
+    if use_cache:
+        cache = DiscoveryCache.load(output / CACHE_FILENAME, config.repo_root, rebuild=rebuild_cache)
+    else:
+        # Full scan into a throwaway index; the cache file is neither read nor written.
+        cache = DiscoveryCache(path=output / CACHE_FILENAME, repo_root=str(config.repo_root.resolve()), persist=False)
+    crawled = crawled_callbacks(crawl_graph or crawl_graph_path(config.repo_root, bot_name))
+    report = analyze_impact(config.repo_root, rev_range, cache, capabilities, capabilities_rel=_as_repo_relative(capabilities_path, config.repo_root), workers=scan_workers, crawled_buttons=crawled)
+
+    write_command_matrix(output / "impacted_command_matrix.csv", iter_command_rows(report.commands), constants_sidecar=constants_sidecar)
+    write_button_matrix(output / "impacted_button_callback_matrix.csv", iter_button_rows(report.buttons), constants_sidecar=constants_sidecar)
+    reduction = None
+    if reduce_strength and report.commands:
+        # Cover only the impacted commands; a buttons-only change keeps the full context/role list.
+        candidates, coverage = generate_reduced_scenarios(list(report.commands), capabilities, strength=reduce_strength)
+        reduction = coverage.as_dict()
+    else:
+        candidates = generate_scenarios()
+    scenarios = impacted_scenarios(candidates, report, capabilities, set(MATRIX_CONTEXTS))
+    payload = {**report.as_dict(), "scenarios": scenarios}
+    if reduction is not None:
+        payload["scenario_reduction"] = reduction
+    _atomic_write_json(output / "impacted_scenarios.json", payload)
+
+    meta = {
+        "rev_range": rev_range,
+        "base": report.base,
+        "output": _as_repo_relative(output, config.repo_root),
+        "changed_files": len(report.changed_files),
+        "impacted_commands": len(report.commands),
+        "impacted_buttons": len(report.buttons),
+        "impacted_scenarios": len(scenarios),
+        "crawled_callbacks": len(crawled),
+        "index": cache.stats.as_dict(),
+    }
+    if reduction is not None:
+        meta["scenario_reduction"] = reduction
+    return meta
+
+
 def main() -> None:
     args = parse_args()
     config = QAConfig.from_args(repo_root=args.repo_root, output_dir=args.output, dry_run=args.dry_run)
+    if args.impact:
+        meta = run_impact(
+            config,
+            args.impact,
+            bot_name=args.bot_name,
+            capabilities_path=Path(args.capabilities) if args.capabilities else None,
+            scan_workers=args.scan_workers,
+            use_cache=not args.no_cache,
+            rebuild_cache=args.rebuild_cache,
+            constants_sidecar=args.matrix_constants_sidecar,
+            reduce_strength=args.reduce,
+            crawl_graph=Path(args.crawl_graph) if args.crawl_graph else None,
+        )
+        print(json.dumps(meta, indent=2, sort_keys=True))
+        return
     meta = run(
         config,
         bot_name=args.bot_name,
@@ -98,6 +185,12 @@ def main() -> None:
         repo_info_path=Path(args.repo_info) if args.repo_info else None,
         ai_provider=args.ai_provider,
         ai_model=args.ai_model,
+        scan_workers=args.scan_workers,
+        use_cache=not args.no_cache,
+        rebuild_cache=args.rebuild_cache,
+        constants_sidecar=args.matrix_constants_sidecar,
+        reduce_strength=args.reduce,
+        crawl_graph=Path(args.crawl_graph) if args.crawl_graph else None,
     )
     print(json.dumps(meta, indent=2, sort_keys=True))
 
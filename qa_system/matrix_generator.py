@@ -1,120 +1,119 @@
 from __future__ import annotations
 
 import csv
-import re
+import json
+import sys
+from operator import attrgetter
 from pathlib import Path
+from typing import Any, Iterable, Iterator
 
 from .models import ButtonCase, CommandCase, Context
+from .source_scanner import merge_symbols, scan_repository
 
-_COMMAND_PATTERNS = [
-    re.compile(r"(?<![\w:/.-])(/[-A-Za-z0-9_]+)\b"),
-    re.compile(r"\bslash\s*[:=]\s*[\"']([^\"']+)[\"']", re.IGNORECASE),
-    re.compile(r"\bcommand\s*[:=]\s*[\"']([^\"']+)[\"']", re.IGNORECASE),
-]
-
-_BUTTON_PATTERNS = [
-    re.compile(r"callback_data\s*=\s*[\"']([^\"']+)[\"']"),
-    re.compile(r"custom_id\s*=\s*[\"']([^\"']+)[\"']"),
-    re.compile(r"InlineKeyboardButton\([^\)]*text\s*=\s*[\"']([^\"']+)[\"']"),
-]
-
-_SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "dist", "build", "qa_artifacts", "__pycache__", ".mypy_cache", ".pytest_cache", ".tox"}
-_MAX_FILE_SIZE_BYTES = 1_000_000
-
-
-def _iter_source_files(repo_root: Path):
-    for path in sorted(repo_root.rglob("*")):
-        if any(part in _SKIP_DIRS for part in path.parts):
-            continue
-        if not path.is_file() or path.suffix.lower() not in {".py", ".js", ".ts", ".md", ".go", ".rs"}:
-            continue
-        try:
-            if path.stat().st_size > _MAX_FILE_SIZE_BYTES:
-                continue
-        except OSError:
-            continue
-        yield path
-
-
-def discover_commands(repo_root: Path) -> list[str]:
-    found: set[str] = set()
-    for file in _iter_source_files(repo_root):
-        text = file.read_text(encoding="utf-8", errors="ignore")
-        for pattern in _COMMAND_PATTERNS:
-            for match in pattern.findall(text):
-                cmd = match if isinstance(match, str) else match[0]
-                cmd = cmd.strip()
-                if cmd:
-                    found.add(cmd if cmd.startswith("/") else f"/{cmd}")
-    return sorted(found or {"/start", "/help", "/qa_on", "/qa_off", "/qa_mode"})
-
-
-def discover_buttons(repo_root: Path) -> list[str]:
-    found: set[str] = set()
-    for file in _iter_source_files(repo_root):
-        text = file.read_text(encoding="utf-8", errors="ignore")
-        for pattern in _BUTTON_PATTERNS:
-            for match in pattern.findall(text):
-                value = match if isinstance(match, str) else match[0]
-                value = value.strip()
-                if value:
-                    found.add(value)
-    return sorted(found or {"profile", "admin_menu", "next_page", "confirm", "cancel"})
-
-
-def build_command_matrix(commands: list[str]) -> list[CommandCase]:
-    contexts: list[Context] = ["telegram_dm", "telegram_group", "telegram_channel"]
-    rows: list[CommandCase] = []
+
+def discover_symbols(repo_root: Path, workers: int = 0) -> tuple[list[str], list[str]]:
+    return merge_symbols(scan_repository(repo_root, workers=workers).values())
+
+
+def discover_commands(repo_root: Path, workers: int = 0) -> list[str]:
+    return discover_symbols(repo_root, workers)[0]
+
+
+def discover_buttons(repo_root: Path, workers: int = 0) -> list[str]:
+    return discover_symbols(repo_root, workers)[1]
+
+
+def crawled_callbacks(graph_path: Path) -> list[str]:
+    """Callback data found by the executor's menu crawler (``callback_graph.json``), if it has run."""
+    if not graph_path.exists():
+        return []
+    return sorted(json.loads(graph_path.read_text(encoding="utf-8")).get("callbacks", []))
+
+
+# Every row of a matrix shares these column values; interning keeps one copy
+# however many rows reference them.
+MATRIX_CONTEXTS: tuple[Context, ...] = ("telegram_dm", "telegram_group", "telegram_channel")
+
+COMMAND_FIELDS = ("command", "context", "expected_result", "error_state", "role", "notes")
+BUTTON_FIELDS = ("button_or_callback", "context", "success_path", "failure_path", "missing_permissions", "missing_onboarding", "rate_limit_behavior")
+
+_COMMAND_CONSTANTS = {
+    "expected_result": sys.intern("Command executes with success response in valid context"),
+    "error_state": sys.intern("Shows context/permission/onboarding/rate-limit aware error"),
+    "role": sys.intern("user"),
+    "notes": sys.intern("Also execute with admin, invalid user, and rate-limited variants"),
+}
+
+_BUTTON_CONSTANTS = {
+    "success_path": sys.intern("Target action completes and UI updates"),
+    "failure_path": sys.intern("Invalid state returns deterministic error"),
+    "missing_permissions": sys.intern("Permission denied message with remediation"),
+    "missing_onboarding": sys.intern("Prompt user to complete missing onboarding steps"),
+    "rate_limit_behavior": sys.intern("429-safe backoff + user-visible retry hint"),
+}
+
+_WRITE_BUFFER_BYTES = 1 << 16
+
+
+def iter_command_rows(commands: Iterable[str]) -> Iterator[CommandCase]:
     for command in commands:
-        for context in contexts:
-            rows.append(
-                CommandCase(
-                    command=command,
-                    context=context,
-                    expected_result="Command executes with success response in valid context",
-                    error_state="Shows context/permission/onboarding/rate-limit aware error",
-                    role="user",
-                    notes="Also execute with admin, invalid user, and rate-limited variants",
-                )
-            )
-    return rows
-
-
-def build_button_matrix(buttons: list[str]) -> list[ButtonCase]:
-    contexts: list[Context] = ["telegram_dm", "telegram_group", "telegram_channel"]
-    rows: list[ButtonCase] = []
+        for context in MATRIX_CONTEXTS:
+            yield CommandCase(command=command, context=context, **_COMMAND_CONSTANTS)
+
+
+def iter_button_rows(buttons: Iterable[str]) -> Iterator[ButtonCase]:
     for button in buttons:
-        for context in contexts:
-            rows.append(
-                ButtonCase(
-                    button_or_callback=button,
-                    context=context,
-                    success_path="Target action completes and UI updates",
-                    failure_path="Invalid state returns deterministic error",
-                    missing_permissions="Permission denied message with remediation",
-                    missing_onboarding="Prompt user to complete missing onboarding steps",
-                    rate_limit_behavior="429-safe backoff + user-visible retry hint",
-                )
-            )
-    return rows
-
-
-def write_command_matrix(path: Path, rows: list[CommandCase]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["command", "context", "expected_result", "error_state", "role", "notes"])
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row.__dict__)
+        for context in MATRIX_CONTEXTS:
+            yield ButtonCase(button_or_callback=button, context=context, **_BUTTON_CONSTANTS)
+
+
+def build_command_matrix(commands: Iterable[str]) -> list[CommandCase]:
+    return list(iter_command_rows(commands))
+
 
+def build_button_matrix(buttons: Iterable[str]) -> list[ButtonCase]:
+    return list(iter_button_rows(buttons))
 
-def write_button_matrix(path: Path, rows: list[ButtonCase]) -> None:
+
+def constants_path(path: Path) -> Path:
+    return path.with_suffix(".constants.json")
+
+
+def _write_matrix(path: Path, rows: Iterable[Any], fields: tuple[str, ...], constant_fields: tuple[str, ...], constants_sidecar: bool) -> int:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["button_or_callback", "context", "success_path", "failure_path", "missing_permissions", "missing_onboarding", "rate_limit_behavior"],
-        )
-        writer.writeheader()
+    sidecar = constants_path(path)
+    count = 0
+    with path.open("w", newline="", encoding="utf-8", buffering=_WRITE_BUFFER_BYTES) as f:
+        writer = csv.writer(f)
+        if not constants_sidecar:
+            writer.writerow(fields)
+            row_values = attrgetter(*fields)
+            for row in rows:
+                writer.writerow(row_values(row))
+                count += 1
+            sidecar.unlink(missing_ok=True)
+            return count
+        # Constant columns move to ``<name>.constants.json``: each distinct combination
+        # of their values is stored once as a profile and rows carry its id.
+        varying = tuple(name for name in fields if name not in constant_fields)
+        writer.writerow((*varying, "profile"))
+        varying_values = attrgetter(*varying)
+        constant_values = attrgetter(*constant_fields)
+        profiles: dict[tuple[str, ...], int] = {}
         for row in rows:
-            writer.writerow(row.__dict__)
+            profile = profiles.setdefault(constant_values(row), len(profiles))
+            writer.writerow((*varying_values(row), profile))
+            count += 1
+    payload = {"columns": list(fields), "profiles": {str(i): dict(zip(constant_fields, values)) for values, i in profiles.items()}}
+    tmp = sidecar.with_suffix(sidecar.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp.replace(sidecar)
+    return count
+
+
+def write_command_matrix(path: Path, rows: Iterable[CommandCase], constants_sidecar: bool = False) -> int:
+    return _write_matrix(path, rows, COMMAND_FIELDS, tuple(_COMMAND_CONSTANTS), constants_sidecar)
+
+
+def write_button_matrix(path: Path, rows: Iterable[ButtonCase], constants_sidecar: bool = False) -> int:
+    return _write_matrix(path, rows, BUTTON_FIELDS, tuple(_BUTTON_CONSTANTS), constants_sidecar)
@@ -14,7 +14,7 @@ Context = Literal[
 Role = Literal["user", "admin", "new_user", "returning_user", "invalid_user", "rate_limited_user"]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CommandCase:
     command: str
     context: Context
@@ -24,7 +24,7 @@ class CommandCase:
     notes: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ButtonCase:
     button_or_callback: str
     context: Context
@@ -44,6 +44,7 @@ class Scenario:
     steps: tuple[str, ...]
     expected: tuple[str, ...]
     active: bool = True
+    command: str | None = None
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+_END = ""
+
+
+def _build(node: dict[str, dict]) -> str:
+    parts: list[str] = []
+    for ch in sorted(node):
+        if ch == _END:
+            continue
+        chain = [re.escape(ch)]
+        child = node[ch]
+        # Walk single-child runs iteratively so long literals do not recurse per character.
+        while _END not in child and len(child) == 1:
+            (nxt, child), = child.items()
+            chain.append(re.escape(nxt))
+        rest = ""
+        if len(child) > 1 or _END not in child:
+            rest = _build(child)
+            if _END in child:
+                # A literal ends here and others extend it: greedy ``?`` prefers the longest.
+                rest = f"(?:{rest})?"
+        parts.append("".join(chain) + rest)
+    return parts[0] if len(parts) == 1 else "(?:" + "|".join(parts) + ")"
+
+
+def literal_alternation(patterns: Iterable[str], presence_only: bool = False) -> str:
+    """Regex source matching any of ``patterns``, shaped as a prefix trie.
+
+    The regex engine walks shared prefixes once instead of retrying each
+    literal at every offset, and prefers the longest literal at a position.
+    With ``presence_only`` a literal that extends another one is dropped,
+    since finding the shorter one already answers "does any occur?".
+    """
+    trie: dict[str, dict] = {}
+    for pattern in patterns:
+        if not pattern:
+            continue
+        node = trie
+        for ch in pattern:
+            if presence_only and _END in node:
+                break
+            node = node.setdefault(ch, {})
+        else:
+            if presence_only:
+                node.clear()
+            node[_END] = {}
+    return _build(trie) if trie else ""
+
+
+def literal_automaton(patterns: Iterable[str]) -> re.Pattern[str] | None:
+    """Compiled matcher whose ``search`` is one C-level pass stopping at the first literal found.
+
+    Returns ``None`` when there is nothing to match.
+    """
+    source = literal_alternation(patterns, presence_only=True)
+    return re.compile(source) if source else None
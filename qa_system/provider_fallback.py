@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import contextlib
+import fcntl
 import json
+import os
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator, TypeVar
 
 PROVIDER_ORDER = ["deepseek", "gemini", "chatgpt"]
 RESET_MINUTES = 10
 ALL_FAILED_WAIT_SECONDS = 60
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+T = TypeVar("T")
+StatusUpdate = Callable[["ProviderStatus"], Any]
 
 
 @dataclass
@@ -20,42 +29,98 @@ class ProviderStatus:
     last_failure_provider: str | None
 
 
+def _as_dict(status: ProviderStatus) -> dict[str, Any]:
+    # Fields hold only strings and None, so one level of copying is a full snapshot (dataclasses.asdict deep-copies).
+    return {
+        "provider_order": list(status.provider_order),
+        "cooldown_until": dict(status.cooldown_until),
+        "last_reset_at": status.last_reset_at,
+        "last_success_provider": status.last_success_provider,
+        "last_failure_provider": status.last_failure_provider,
+    }
+
+
 class ProviderFallbackManager:
-    def __init__(self, status_path: Path) -> None:
+    """Provider order and cooldowns shared through ``provider_status.json``.
+
+    Every update is a read-modify-write under an exclusive ``fcntl`` lock on
+    ``<status>.lock`` and lands with an atomic temp-file replace, so
+    concurrent ``brain_sync`` processes neither lose updates nor read a
+    half-written file; calls that change nothing do not write.
+
+    With ``in_memory=True`` the status stays in memory and is re-read only
+    when the file's stat changes. Updates are applied locally at once and
+    written behind at most every ``flush_interval`` seconds (and on
+    ``flush``/``close``): the pending updates are replayed under the lock on
+    top of whatever other processes wrote meanwhile, then written once.
+    """
+
+    def __init__(self, status_path: Path, in_memory: bool = False, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
         self.status_path = status_path
         self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = status_path.with_name(status_path.name + ".lock")
+        self.in_memory = in_memory
+        self.flush_interval = flush_interval
+        self._mutex = threading.RLock()
+        self._status: ProviderStatus | None = None
+        self._stat_key: tuple[int, int, int] | None = None
+        self._pending: list[StatusUpdate] = []
+        self._last_flush = time.monotonic()
+        self.counters = {"reads": 0, "updates": 0, "writes": 0}
+
+    def __enter__(self) -> "ProviderFallbackManager":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
     def _utc_now(self) -> datetime:
         return datetime.now(timezone.utc)
 
-    def _read_json(self, default: Any) -> Any:
-        if not self.status_path.exists():
-            return default
-        return json.loads(self.status_path.read_text(encoding="utf-8"))
-
-    def _write(self, payload: dict[str, Any]) -> None:
-        self.status_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-
-    def load(self) -> ProviderStatus:
+    def _default(self) -> dict[str, Any]:
+        return {
+            "provider_order": PROVIDER_ORDER,
+            "cooldown_until": {p: None for p in PROVIDER_ORDER},
+            "last_reset_at": self._utc_now().isoformat(),
+            "last_success_provider": None,
+            "last_failure_provider": None,
+        }
+
+    def _file_key(self) -> tuple[int, int, int] | None:
+        try:
+            stat = self.status_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read(self) -> ProviderStatus:
+        self.counters["reads"] += 1
+        self._stat_key = self._file_key()
+        raw = json.loads(self.status_path.read_text(encoding="utf-8")) if self._stat_key else self._default()
         now = self._utc_now().isoformat()
-        raw = self._read_json(
-            {
-                "provider_order": PROVIDER_ORDER,
-                "cooldown_until": {p: None for p in PROVIDER_ORDER},
-                "last_reset_at": now,
-                "last_success_provider": None,
-                "last_failure_provider": None,
-            }
-        )
-        status = ProviderStatus(
+        return ProviderStatus(
             provider_order=list(raw.get("provider_order", PROVIDER_ORDER)),
             cooldown_until=dict(raw.get("cooldown_until", {p: None for p in PROVIDER_ORDER})),
             last_reset_at=str(raw.get("last_reset_at", now)),
             last_success_provider=raw.get("last_success_provider"),
             last_failure_provider=raw.get("last_failure_provider"),
         )
-        self._periodic_reset(status)
-        return status
+
+    def _write(self, status: ProviderStatus) -> None:
+        tmp = self.status_path.with_name(f"{self.status_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(_as_dict(status), indent=2), encoding="utf-8")
+        tmp.replace(self.status_path)
+        self._stat_key = self._file_key()
+        self.counters["writes"] += 1
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._mutex, self.lock_path.open("a") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
 
     def _periodic_reset(self, status: ProviderStatus) -> None:
         last_reset = datetime.fromisoformat(status.last_reset_at)
@@ -63,52 +128,107 @@ class ProviderFallbackManager:
             status.provider_order = PROVIDER_ORDER.copy()
             status.cooldown_until = {p: None for p in PROVIDER_ORDER}
             status.last_reset_at = self._utc_now().isoformat()
-            self.persist(status)
+
+    def _update(self, update: Callable[[ProviderStatus], T]) -> T:
+        def step(status: ProviderStatus) -> T:
+            self._periodic_reset(status)
+            return update(status)
+
+        if not self.in_memory:
+            with self._locked():
+                status = self._read()
+                before = _as_dict(status)
+                result = step(status)
+                if _as_dict(status) != before:
+                    self.counters["updates"] += 1
+                    self._write(status)
+                return result
+        with self._mutex:
+            if self._status is None or self._file_key() != self._stat_key:
+                # Another process wrote: start from its state and keep our unflushed updates on top.
+                self._status = self._read()
+                for pending in self._pending:
+                    pending(self._status)
+            before = _as_dict(self._status)
+            result = step(self._status)
+            if _as_dict(self._status) != before:
+                self._pending.append(step)
+                self.counters["updates"] += 1
+            if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+            return result
+
+    def flush(self) -> None:
+        """Write pending in-memory updates now (no-op in the default mode)."""
+        with self._mutex:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            with self._locked():
+                status = self._read()
+                for pending in self._pending:
+                    pending(status)
+                self._write(status)
+                self._status = status
+                self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+    def load(self) -> ProviderStatus:
+        return self._update(lambda status: ProviderStatus(**_as_dict(status)))
 
     def persist(self, status: ProviderStatus) -> None:
-        self._write(
-            {
-                "provider_order": status.provider_order,
-                "cooldown_until": status.cooldown_until,
-                "last_reset_at": status.last_reset_at,
-                "last_success_provider": status.last_success_provider,
-                "last_failure_provider": status.last_failure_provider,
-            }
-        )
+        replacement = _as_dict(status)
+
+        def replace(current: ProviderStatus) -> None:
+            for name, value in _as_dict(ProviderStatus(**replacement)).items():
+                setattr(current, name, value)
+
+        self._update(replace)
 
     def pick_provider(self) -> str | None:
-        status = self.load()
         now = self._utc_now()
-        for provider in status.provider_order:
-            cooldown = status.cooldown_until.get(provider)
-            if not cooldown:
-                return provider
-            if datetime.fromisoformat(cooldown) <= now:
-                status.cooldown_until[provider] = None
-                self.persist(status)
-                return provider
-        return None
+
+        def pick(status: ProviderStatus) -> str | None:
+            for provider in status.provider_order:
+                cooldown = status.cooldown_until.get(provider)
+                if not cooldown:
+                    return provider
+                if datetime.fromisoformat(cooldown) <= now:
+                    status.cooldown_until[provider] = None
+                    return provider
+            return None
+
+        return self._update(pick)
 
     def mark_success(self, provider: str) -> None:
-        status = self.load()
-        status.last_success_provider = provider
-        status.last_failure_provider = None
-        status.cooldown_until[provider] = None
-        self.persist(status)
+        def success(status: ProviderStatus) -> None:
+            status.last_success_provider = provider
+            status.last_failure_provider = None
+            status.cooldown_until[provider] = None
+
+        self._update(success)
 
     def mark_failure(self, provider: str, rate_limited: bool = True) -> None:
-        status = self.load()
-        status.last_failure_provider = provider
-        if rate_limited:
-            status.cooldown_until[provider] = (self._utc_now() + timedelta(seconds=ALL_FAILED_WAIT_SECONDS)).isoformat()
-        self.persist(status)
+        until = (self._utc_now() + timedelta(seconds=ALL_FAILED_WAIT_SECONDS)).isoformat()
+
+        def failure(status: ProviderStatus) -> None:
+            status.last_failure_provider = provider
+            if rate_limited:
+                status.cooldown_until[provider] = until
+
+        self._update(failure)
 
     def all_failed_wait(self) -> int:
-        status = self.load()
         now = self._utc_now()
-        waits = []
-        for p in status.provider_order:
-            cd = status.cooldown_until.get(p)
-            if cd:
-                waits.append(max(int((datetime.fromisoformat(cd) - now).total_seconds()), 0))
-        return max(waits) if waits else 0
+
+        def wait(status: ProviderStatus) -> int:
+            waits = []
+            for p in status.provider_order:
+                cd = status.cooldown_until.get(p)
+                if cd:
+                    waits.append(max(int((datetime.fromisoformat(cd) - now).total_seconds()), 0))
+            return max(waits) if waits else 0
+
+        return self._update(wait)
@@ -12,6 +12,7 @@ class ProviderConfig:
     model: str
     api_key_env: str
     execution_location: str
+    digest_token_budget: int
 
 
 DEFAULT_MODELS: dict[AIProvider, str] = {
@@ -38,6 +39,16 @@ EXECUTION_LOCATION: dict[AIProvider, str] = {
     "chatgpt_free": "external_cloud",
 }
 
+# Input tokens a log digest (qa_system.digest) may use, per default model. The Termux models run
+# at 1.5B parameters on a phone, where each extra thousand prompt tokens costs seconds.
+DIGEST_TOKEN_BUDGETS: dict[str, int] = {
+    DEFAULT_MODELS["termux_qwen"]: 1500,
+    DEFAULT_MODELS["termux_deepseek_r1"]: 1200,
+    DEFAULT_MODELS["deepseek_chat"]: 12000,
+    DEFAULT_MODELS["gemini_free"]: 16000,
+    DEFAULT_MODELS["chatgpt_free"]: 12000,
+}
+
 
 def resolve_provider(provider: str, model: str | None = None) -> ProviderConfig:
     normalized = provider.strip().lower()
@@ -49,4 +60,6 @@ def resolve_provider(provider: str, model: str | None = None) -> ProviderConfig:
         model=model or DEFAULT_MODELS[p],
         api_key_env=API_KEY_ENV[p],
         execution_location=EXECUTION_LOCATION[p],
+        # An overridden model keeps its provider's budget unless it has one of its own.
+        digest_token_budget=DIGEST_TOKEN_BUDGETS.get(model or "", DIGEST_TOKEN_BUDGETS[DEFAULT_MODELS[p]]),
     )
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections import Counter, deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable
+
+from .log_store import tail_log
+
+MESSAGE_LOG = "message_log.json"
+DEFAULT_CAPACITY = 64
+# get_buttons/get_callbacks have always looked at the newest 20 message_log entries.
+DEFAULT_KEYBOARD_WINDOW = 20
+
+
+def _forget(counts: Counter[str], values: Iterable[str]) -> None:
+    # Counter.subtract keeps keys at zero; drop them so the key set stays bounded by the window.
+    for value in values:
+        counts[value] -= 1
+        if counts[value] <= 0:
+            del counts[value]
+
+
+class RecentMessages:
+    """Bounded in-memory view of the newest ``message_log`` entries of one bot and day.
+
+    ``append`` is called with each entry as it is logged; the buffer keeps the
+    last ``capacity`` of them. Buttons and callbacks of the newest
+    ``keyboard_window`` entries are reference-counted as entries enter and
+    leave that window, and their sorted lists are cached until the next
+    change, so reads never touch disk.
+    """
+
+    def __init__(self, directory: Path, capacity: int = DEFAULT_CAPACITY, keyboard_window: int = DEFAULT_KEYBOARD_WINDOW) -> None:
+        self.directory = directory
+        self.capacity = max(capacity, keyboard_window, 1)
+        self._entries: deque[dict[str, Any]] = deque(maxlen=self.capacity)
+        self._window: deque[dict[str, Any]] = deque(maxlen=max(keyboard_window, 1))
+        self._buttons: Counter[str] = Counter()
+        self._callbacks: Counter[str] = Counter()
+        self._sorted: dict[str, list[str]] = {}
+
+    @classmethod
+    def warm_start(
+        cls,
+        directory: Path,
+        capacity: int = DEFAULT_CAPACITY,
+        keyboard_window: int = DEFAULT_KEYBOARD_WINDOW,
+        entries: Iterable[dict[str, Any]] | None = None,
+    ) -> "RecentMessages":
+        """Seed the buffer from the tail of the day's message log (one indexed seek, not a full read).
+
+        Pass ``entries`` when the caller already holds the tail, e.g. from a ``LogStore`` with unflushed writes.
+        """
+        recent = cls(directory, capacity, keyboard_window)
+        for entry in tail_log(directory, MESSAGE_LOG, recent.capacity) if entries is None else entries:
+            recent.append(entry)
+        return recent
+
+    def append(self, entry: dict[str, Any]) -> None:
+        self._entries.append(entry)
+        if len(self._window) == self._window.maxlen:
+            leaving = self._window[0]
+            _forget(self._buttons, leaving.get("buttons", []))
+            _forget(self._callbacks, leaving.get("callbacks", []))
+        self._window.append(entry)
+        self._buttons.update(entry.get("buttons", []))
+        self._callbacks.update(entry.get("callbacks", []))
+        self._sorted.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def recent(self, limit: int) -> list[dict[str, Any]] | None:
+        """The newest ``limit`` entries, oldest first; ``None`` if more than the buffer holds were asked for."""
+        if limit <= 0:
+            return []
+        if limit > self.capacity:
+            return None
+        start = max(len(self._entries) - limit, 0)
+        return list(islice(self._entries, start, None))
+
+    def _values(self, name: str, counts: Counter[str]) -> list[str]:
+        cached = self._sorted.get(name)
+        if cached is None:
+            cached = self._sorted[name] = sorted(counts)
+        return cached
+
+    def buttons(self) -> list[str]:
+        return self._values("buttons", self._buttons)
+
+    def callbacks(self) -> list[str]:
+        return self._values("callbacks", self._callbacks)
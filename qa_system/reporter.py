@@ -32,7 +32,10 @@ def write_logs(output_dir: Path, scenarios: list[Scenario], dry_run: bool) -> No
     for scn in scenarios:
         if not scn.active:
             continue
-        action_log.append({"scenario_id": scn.scenario_id, "platform": scn.platform, "context": scn.context, "role": scn.role, "status": "simulated_pass" if dry_run else "pending_executor"})
+        entry = {"scenario_id": scn.scenario_id, "platform": scn.platform, "context": scn.context, "role": scn.role, "status": "simulated_pass" if dry_run else "pending_executor"}
+        if scn.command:
+            entry["command"] = scn.command
+        action_log.append(entry)
         message_log.append({"scenario_id": scn.scenario_id, "messages": ["placeholder: connector response capture"]})
         if scn.role in {"invalid_user", "rate_limited_user"}:
             error_log.append(
@@ -51,7 +54,14 @@ def write_logs(output_dir: Path, scenarios: list[Scenario], dry_run: bool) -> No
     _atomic_write_json(output_dir / "error_log.json", error_log)
 
 
-def write_summary(output_dir: Path, scenario_count: int, command_count: int, button_count: int, test_plan: dict[str, Any] | None = None) -> None:
+def write_summary(
+    output_dir: Path,
+    scenario_count: int,
+    command_count: int,
+    button_count: int,
+    test_plan: dict[str, Any] | None = None,
+    latency: dict[str, Any] | None = None,
+) -> None:
     output_dir.mkdir(parents=True, exist_ok=True)
     summary = {
         "summary": {
@@ -72,6 +82,8 @@ def write_summary(output_dir: Path, scenario_count: int, command_count: int, but
         "onboarding_issues": [],
         "suggestions_for_improvement": [],
     }
+    if latency is not None:
+        summary["latency"] = latency
     _atomic_write_json(output_dir / "final_report.json", summary)
 
 
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .sqlite_store import Transaction, connect_wal
+
+CACHE_DB_NAME = "response_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# Top-level payload keys that change on every export without changing what the brain is asked.
+VOLATILE_KEYS = frozenset({"exported_at"})
+COUNTERS = ("hits", "misses", "expired", "stores", "evicted")
+_SPACES = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def cache_path(root: Path) -> Path:
+    return root / "qa" / "state" / CACHE_DB_NAME
+
+
+def normalize_payload(payload: Any) -> str:
+    """Canonical text of a prompt or export payload: whitespace-collapsed strings, sorted compact JSON."""
+    if isinstance(payload, str):
+        return _SPACES.sub(" ", payload).strip()
+    if isinstance(payload, dict):
+        payload = {key: value for key, value in payload.items() if key not in VOLATILE_KEYS}
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def cache_key(provider: str, model: str, payload: Any) -> str:
+    digest = hashlib.sha256()
+    for part in (provider.strip().lower(), model.strip(), normalize_payload(payload)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    key: str
+    response: Any
+    age_seconds: float
+    hits: int
+
+
+class ResponseCache:
+    """Content-addressed provider responses in a SQLite WAL table.
+
+    Entries are keyed by ``cache_key`` (provider, model and normalized
+    payload), expire after ``ttl`` seconds and are evicted least recently
+    used first once the table holds more than ``max_entries`` rows or
+    ``max_bytes`` of responses. Hit/miss counters live in the same database,
+    so they add up across ``brain_sync`` invocations.
+    """
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(max_entries, 1)
+        self.max_bytes = max(max_bytes, 1)
+        self._conn = connect_wal(path, _SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: Path, **kwargs: Any) -> "ResponseCache":
+        return cls(cache_path(root), **kwargs)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if amount:
+            self._conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def get(self, provider: str, model: str, payload: Any) -> CacheHit | None:
+        key = cache_key(provider, model, payload)
+        now = time.time()
+        with self._transaction():
+            row = self._conn.execute("SELECT body, created_at, expires_at, hits FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[2] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count("expired")
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count("hits")
+        return CacheHit(key=key, response=json.loads(row[0]), age_seconds=now - row[1], hits=row[3] + 1)
+
+    def put(self, provider: str, model: str, payload: Any, response: Any, ttl: float | None = None) -> str:
+        key = cache_key(provider, model, payload)
+        body = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO responses (key, provider, model, body, size, created_at, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET body = excluded.body, size = excluded.size, created_at = excluded.created_at, "
+                "expires_at = excluded.expires_at, last_used = excluded.last_used",
+                (key, provider, model, body, len(body.encode("utf-8")), now, now + (self.ttl if ttl is None else ttl), now),
+            )
+            self._count("stores")
+            self._evict(now)
+        return key
+
+    def get_or_call(self, provider: str, model: str, payload: Any, call: Callable[[], Any]) -> tuple[Any, bool]:
+        """Cached response for the payload, or ``call()``'s result stored for next time; the flag is True on a hit."""
+        hit = self.get(provider, model, payload)
+        if hit is not None:
+            return hit.response, True
+        response = call()
+        self.put(provider, model, payload, response)
+        return response, False
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        self._count("expired", expired)
+        # Keep the most recently used rows that fit both bounds; everything older goes.
+        evicted = self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM (SELECT key, ROW_NUMBER() OVER w AS n, SUM(size) OVER w AS running FROM responses "
+            "WINDOW w AS (ORDER BY last_used DESC, key)) WHERE n > ? OR running > ?)",
+            (self.max_entries, self.max_bytes),
+        ).rowcount
+        self._count("evicted", evicted)
+
+    def stats(self) -> dict[str, Any]:
+        counters = dict.fromkeys(COUNTERS, 0)
+        counters.update({name: int(value) for name, value in self._conn.execute("SELECT name, value FROM counters")})
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None, "entries": int(entries), "bytes": int(size)}
+
+    def _transaction(self) -> Transaction:
+        return Transaction(self._conn)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import Literal
+from dataclasses import replace
+from typing import Any, Literal
 
+from .covering import CoverageReport, covering_array, factor
 from .models import Context, Role, Scenario
 
+SCENARIO_ROLES: tuple[Role, ...] = ("new_user", "returning_user", "user", "admin", "invalid_user", "rate_limited_user")
+TELEGRAM_CONTEXTS: tuple[Context, ...] = ("telegram_dm", "telegram_group", "telegram_channel")
+
 
 def generate_scenarios() -> list[Scenario]:
     telegram_contexts: list[tuple[Literal["telegram"], Context]] = [
@@ -15,7 +20,7 @@ def generate_scenarios() -> list[Scenario]:
         ("discord", "discord_dm_inactive"),
         ("discord", "discord_server_inactive"),
     ]
-    roles: list[Role] = ["new_user", "returning_user", "user", "admin", "invalid_user", "rate_limited_user"]
+    roles: list[Role] = list(SCENARIO_ROLES)
 
     scenarios: list[Scenario] = []
     counter = 1
@@ -63,3 +68,57 @@ def generate_scenarios() -> list[Scenario]:
         )
 
     return scenarios
+
+
+def generate_reduced_scenarios(commands: list[str], capabilities: dict[str, Any], strength: int = 2) -> tuple[list[Scenario], CoverageReport]:
+    """One scenario per command instead of the full command x context x role product.
+
+    Rows come from a ``strength``-wise covering array, so every (command,
+    context), (command, role) and (context, role) pair still appears at least
+    once for ``strength=2``. ``scenario_weights`` in ``bot_capabilities.json``
+    (``{"command"|"context"|"role": {value: weight}}``) moves heavier
+    combinations to the front, and each ``must_include`` entry (a possibly
+    partial ``{"command", "context", "role"}`` mapping) is always emitted
+    unless it names a command or context this run does not cover.
+    """
+    weights = capabilities.get("scenario_weights", {})
+    contexts = [c for c in capabilities.get("contexts", TELEGRAM_CONTEXTS) if c.startswith("telegram_")] or list(TELEGRAM_CONTEXTS)
+    factors = [
+        factor("command", commands, weights.get("command")),
+        factor("context", contexts, weights.get("context")),
+        factor("role", SCENARIO_ROLES, weights.get("role")),
+    ]
+    # Pins naming a command or context outside this run (e.g. an --impact slice) do not apply to it.
+    available = {f.name: set(f.values) for f in factors}
+    must_include = [spec for spec in capabilities.get("must_include", []) if all(value in available[name] for name, value in spec.items() if name in available)]
+    rows, report = covering_array(factors, strength=strength, must_include=must_include)
+
+    scenarios: list[Scenario] = []
+    for counter, row in enumerate(rows, start=1):
+        scenarios.append(
+            Scenario(
+                scenario_id=f"SCN-{counter:04d}",
+                platform="telegram",
+                context=row["context"],
+                role=row["role"],
+                steps=(
+                    "Open target context",
+                    "Run onboarding/profile checks by active qa mode",
+                    f"Send {row['command']} and capture every reply and edit",
+                    "Press inline buttons and callbacks the reply exposes",
+                    "Trigger error injections: permission, context, callback expiry, timeout, rate-limit",
+                ),
+                expected=(
+                    "Success paths return expected response",
+                    "Failure paths return explicit actionable errors",
+                    "Admin/user restrictions enforced",
+                    "Logs include structured records for every step",
+                ),
+                active=True,
+                command=row["command"],
+            )
+        )
+    # Keep the inactive Discord placeholders the full generator emits.
+    for offset, scenario in enumerate((s for s in generate_scenarios() if not s.active), start=len(scenarios) + 1):
+        scenarios.append(replace(scenario, scenario_id=f"SCN-{offset:04d}"))
+    return scenarios, report
@@ -6,6 +6,7 @@ import os
 from pathlib import Path
 
 from .executor import QAExecutor
+from .session_pool import SessionPool
 
 
 def parse_args() -> argparse.Namespace:
@@ -14,10 +15,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--service", action="store_true", help="Run QA executor service loop")
     parser.add_argument("--root", default="/var/www/html/Runewager", help="RuneWager project root")
     parser.add_argument("--session-dir", default="data", help="Directory to store session file")
+    parser.add_argument("--session-name", default="qa_userbot", help="Session file name; log in several to build a session pool")
+    parser.add_argument("--pool", action="store_true", help="With --service, shard work across every session in --session-dir")
     return parser.parse_args()
 
 
-async def login_flow(session_dir: Path) -> None:
+async def login_flow(session_dir: Path, session_name: str = "qa_userbot") -> None:
     try:
         from pyrogram import Client
     except Exception as exc:  # pragma: no cover
@@ -28,7 +31,7 @@ async def login_flow(session_dir: Path) -> None:
     phone = os.environ["TELEGRAM_PHONE"]
 
     session_dir.mkdir(parents=True, exist_ok=True)
-    session_path = session_dir / "qa_userbot"
+    session_path = session_dir / session_name
 
     async with Client(str(session_path), api_id=api_id, api_hash=api_hash, phone_number=phone) as app:
         me = await app.get_me()
@@ -38,10 +41,11 @@ async def login_flow(session_dir: Path) -> None:
 def main() -> None:
     args = parse_args()
     if args.login:
-        asyncio.run(login_flow(Path(args.session_dir)))
+        asyncio.run(login_flow(Path(args.session_dir), args.session_name))
         return
     if args.service:
-        asyncio.run(QAExecutor(Path(args.root)).run_service())
+        factory = (lambda: SessionPool.from_dir(Path(args.session_dir))) if args.pool else None
+        asyncio.run(QAExecutor(Path(args.root), client_factory=factory).run_service())
         return
     raise SystemExit("Choose one mode: --login or --service")
 
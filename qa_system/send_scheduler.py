@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from .session_pool import flood_wait_seconds
+
+_RATE_LIMIT_RE = re.compile(r"^(?P<count>\d+(?:\.\d+)?)_(?P<scope>[a-z]+)_per_(?P<unit>sec|second|min|minute|hour)$")
+_UNIT_SECONDS = {"sec": 1.0, "second": 1.0, "min": 60.0, "minute": 60.0, "hour": 3600.0}
+_GLOBAL_SCOPES = {"global", "total", "all"}
+
+# Telegram's documented ceilings: ~1 message/second per chat, ~30/second overall.
+DEFAULT_CHAT_LIMIT = (1.0, 1.0)
+DEFAULT_GLOBAL_LIMIT = (30.0, 1.0)
+DEFAULT_MAX_FLOOD_RETRIES = 5
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    tokens: float
+    per_seconds: float
+
+    def __post_init__(self) -> None:
+        if self.tokens <= 0 or self.per_seconds <= 0:
+            raise ValueError(f"rate limit must be positive, got {self.tokens:g} per {self.per_seconds:g}s")
+
+    @property
+    def rate(self) -> float:
+        return self.tokens / self.per_seconds
+
+
+def parse_rate_limit(spec: str) -> tuple[str, RateLimit] | None:
+    match = _RATE_LIMIT_RE.match(spec.strip().lower())
+    if not match or float(match.group("count")) <= 0:
+        return None
+    scope = "global" if match.group("scope") in _GLOBAL_SCOPES else "chat"
+    return scope, RateLimit(float(match.group("count")), _UNIT_SECONDS[match.group("unit")])
+
+
+def limits_from_capabilities(capabilities: dict[str, Any]) -> tuple[RateLimit, RateLimit]:
+    chat_limit = RateLimit(*DEFAULT_CHAT_LIMIT)
+    global_limit = RateLimit(*DEFAULT_GLOBAL_LIMIT)
+    for spec in capabilities.get("rate_limits", []):
+        parsed = parse_rate_limit(str(spec))
+        if parsed is None:
+            continue
+        scope, limit = parsed
+        if scope == "global":
+            global_limit = limit
+        else:
+            chat_limit = limit
+    return chat_limit, global_limit
+
+
+class TokenBucket:
+    def __init__(self, limit: RateLimit, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = limit.rate
+        self.capacity = max(limit.tokens, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+
+@dataclass(frozen=True)
+class ScheduledSend:
+    result: Any
+    queued_for: float
+    attempts: int
+    flood_waited: float
+
+
+@dataclass
+class _Job:
+    chat: str
+    fn: Callable[[], Awaitable[Any]]
+    submitted: float
+    future: asyncio.Future
+    attempts: int = 0
+    flood_waited: float = 0.0
+    seq: int = 0
+    chat_limit: RateLimit | None = None
+
+
+class SendScheduler:
+    """Rate-shapes sends between action dispatch and the Telegram client.
+
+    Each chat has its own token bucket and FIFO, and all chats share a global
+    bucket. The dispatcher always starts the oldest send whose chat is ready,
+    so a chat waiting on its bucket or a ``FloodWait`` does not hold up
+    independent sends to other chats, while order within one chat is kept.
+    A ``FloodWait`` blocks only that chat for exactly the requested duration
+    and the send is retried; ``ScheduledSend.queued_for`` reports how long the
+    send waited before its successful attempt started.
+    """
+
+    def __init__(
+        self,
+        chat_limit: RateLimit = RateLimit(*DEFAULT_CHAT_LIMIT),
+        global_limit: RateLimit = RateLimit(*DEFAULT_GLOBAL_LIMIT),
+        max_flood_retries: int = DEFAULT_MAX_FLOOD_RETRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.chat_limit = chat_limit
+        self.max_flood_retries = max_flood_retries
+        self.clock = clock
+        self._global = TokenBucket(global_limit, clock)
+        self._chat_buckets: dict[str, TokenBucket] = {}
+        self._pending: dict[str, deque[_Job]] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._busy: set[str] = set()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._seq = 0
+        self.counters = {"submitted": 0, "sent": 0, "failed": 0, "flood_waits": 0, "reordered": 0}
+
+    @classmethod
+    def from_capabilities(cls, capabilities: dict[str, Any], **kwargs: Any) -> "SendScheduler":
+        chat_limit, global_limit = limits_from_capabilities(capabilities)
+        return cls(chat_limit=chat_limit, global_limit=global_limit, **kwargs)
+
+    async def __aenter__(self) -> "SendScheduler":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+        for queue in self._pending.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+        self._pending.clear()
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        for queue in self._pending.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+        self._pending.clear()
+
+    async def submit(self, chat: str, fn: Callable[[], Awaitable[Any]], chat_limit: RateLimit | None = None) -> ScheduledSend:
+        self.start()
+        self._seq += 1
+        job = _Job(chat=chat, fn=fn, submitted=self.clock(), future=asyncio.get_running_loop().create_future(), seq=self._seq, chat_limit=chat_limit)
+        self._pending.setdefault(chat, deque()).append(job)
+        self.counters["submitted"] += 1
+        self._wake.set()
+        return await job.future
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def _bucket(self, chat: str, limit: RateLimit | None = None) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat)
+        if bucket is None:
+            bucket = TokenBucket(limit or self.chat_limit, self.clock)
+            self._chat_buckets[chat] = bucket
+        return bucket
+
+    def _next_ready(self, now: float) -> tuple[_Job | None, float | None]:
+        global_wait = self._global.wait_time(now)
+        best: _Job | None = None
+        oldest: _Job | None = None
+        soonest: float | None = None
+        for chat, queue in self._pending.items():
+            if not queue:
+                continue
+            head = queue[0]
+            if oldest is None or head.seq < oldest.seq:
+                oldest = head
+            if chat in self._busy:
+                continue
+            wait = max(self._blocked_until.get(chat, 0.0) - now, self._bucket(chat, head.chat_limit).wait_time(now), global_wait)
+            if wait <= 0:
+                if best is None or head.seq < best.seq:
+                    best = head
+            elif soonest is None or wait < soonest:
+                soonest = wait
+        if best is None:
+            return None, soonest
+        if oldest is not None and oldest is not best:
+            self.counters["reordered"] += 1
+        self._pending[best.chat].popleft()
+        self._bucket(best.chat).consume(now)
+        self._global.consume(now)
+        self._busy.add(best.chat)
+        return best, None
+
+    async def _run(self) -> None:
+        try:
+            await self._dispatch_loop()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Without the dispatcher nothing would ever resolve the queued sends; fail them instead of hanging.
+            self._task = None
+            self._fail_pending(exc)
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            job, wait = self._next_ready(self.clock())
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.ensure_future(self._execute(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, job: _Job) -> None:
+        started = self.clock()
+        try:
+            result = await job.fn()
+        except Exception as exc:
+            wait = flood_wait_seconds(exc)
+            if wait is not None and job.attempts < self.max_flood_retries:
+                self.counters["flood_waits"] += 1
+                job.attempts += 1
+                job.flood_waited += wait
+                self._blocked_until[job.chat] = max(self._blocked_until.get(job.chat, 0.0), self.clock() + wait)
+                self._pending.setdefault(job.chat, deque()).appendleft(job)
+            else:
+                self.counters["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(exc)
+        else:
+            self.counters["sent"] += 1
+            if not job.future.done():
+                job.future.set_result(ScheduledSend(result=result, queued_for=started - job.submitted, attempts=job.attempts + 1, flood_waited=job.flood_waited))
+        finally:
+            self._busy.discard(job.chat)
+            self._wake.set()
+
+    def stats(self) -> dict[str, Any]:
+        now = self.clock()
+        return {
+            **self.counters,
+            "queued": self.queued(),
+            "blocked_chats": {chat: round(until - now, 3) for chat, until in self._blocked_until.items() if until > now},
+        }
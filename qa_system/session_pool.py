@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+SESSION_SUFFIX = ".session"
+DEFAULT_VNODES = 64
+
+
+def flood_wait_seconds(exc: BaseException) -> float | None:
+    """Seconds to back off if ``exc`` is a pyrogram-style ``FloodWait``, else ``None``."""
+    if type(exc).__name__ not in {"FloodWait", "FloodPremiumWait", "SlowmodeWait"}:
+        return None
+    value = getattr(exc, "value", None)
+    if value is None:
+        value = getattr(exc, "x", None)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def discover_sessions(session_dir: Path) -> list[str]:
+    if not session_dir.exists():
+        return []
+    return sorted(p.name[: -len(SESSION_SUFFIX)] for p in session_dir.iterdir() if p.is_file() and p.name.endswith(SESSION_SUFFIX))
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: list[str], vnodes: int = DEFAULT_VNODES) -> None:
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def walk(self, key: str):
+        if not self._keys:
+            return
+        start = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        seen: set[str] = set()
+        for i in range(len(self._keys)):
+            node = self._nodes[(start + i) % len(self._keys)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+    def lookup(self, key: str, exclude: set[str] | frozenset[str] = frozenset()) -> str | None:
+        for node in self.walk(key):
+            if node not in exclude:
+                return node
+        return None
+
+
+def _pyrogram_session_client(session_dir: Path) -> Callable[[str], Any]:
+    def factory(name: str) -> Any:
+        try:
+            from pyrogram import Client
+        except Exception as exc:  # pragma: no cover
+            raise RuntimeError("pyrogram is required for the session pool") from exc
+        api_id = os.getenv("TELEGRAM_API_ID")
+        return Client(str(session_dir / name), api_id=int(api_id) if api_id else None, api_hash=os.getenv("TELEGRAM_API_HASH"))
+
+    return factory
+
+
+def route_key(scenario_id: str | None, role: str | None) -> str:
+    return f"{scenario_id or 'default'}:{role or 'user'}"
+
+
+class SessionPool:
+    """Shards QA work across several userbot sessions.
+
+    Work is keyed by ``scenario_id:role`` and placed on a consistent-hash ring,
+    so a scenario stays on one account and adding or removing a session only
+    moves that session's share. A session that hits ``FloodWait`` is skipped
+    until its wait expires and its work moves to the next session on the ring.
+    The pool can stand in for a single client in ``async with``.
+    """
+
+    def __init__(self, sessions: dict[str, Any], vnodes: int = DEFAULT_VNODES) -> None:
+        if not sessions:
+            raise ValueError("SessionPool needs at least one session")
+        self.clients = dict(sessions)
+        self.ring = HashRing(sorted(self.clients), vnodes=vnodes)
+        self.throttled_until: dict[str, float] = {}
+        self.counters: dict[str, dict[str, int]] = {name: {"sent": 0, "flood_waits": 0, "rerouted_in": 0} for name in self.clients}
+
+    @classmethod
+    def from_dir(cls, session_dir: Path, client_factory: Callable[[str], Any] | None = None, vnodes: int = DEFAULT_VNODES) -> "SessionPool":
+        names = discover_sessions(session_dir)
+        if not names:
+            raise ValueError(f"No {SESSION_SUFFIX} files in {session_dir}; create them with selfbot_runner --login --session-name")
+        factory = client_factory or _pyrogram_session_client(session_dir)
+        return cls({name: factory(name) for name in names}, vnodes=vnodes)
+
+    async def __aenter__(self) -> "SessionPool":
+        for client in self.clients.values():
+            await client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        for client in self.clients.values():
+            await client.__aexit__(*exc)
+
+    def _throttled(self, now: float) -> set[str]:
+        return {name for name, until in self.throttled_until.items() if until > now}
+
+    def mark_throttled(self, name: str, seconds: float) -> None:
+        self.throttled_until[name] = max(self.throttled_until.get(name, 0.0), time.monotonic() + seconds)
+        self.counters[name]["flood_waits"] += 1
+
+    def home(self, key: str) -> str:
+        return self.ring.lookup(key) or next(iter(self.clients))
+
+    def route(self, key: str) -> str | None:
+        return self.ring.lookup(key, exclude=self._throttled(time.monotonic()))
+
+    async def acquire(self, key: str) -> str:
+        while True:
+            name = self.route(key)
+            if name is not None:
+                return name
+            # Every session is in FloodWait: sleep until the earliest one frees up.
+            await asyncio.sleep(max(min(self.throttled_until.values()) - time.monotonic(), 0.0))
+
+    async def call(self, key: str, fn: Callable[[Any], Any]) -> tuple[str, Any]:
+        while True:
+            name = await self.acquire(key)
+            try:
+                result = await fn(self.clients[name])
+            except Exception as exc:
+                wait = flood_wait_seconds(exc)
+                if wait is None:
+                    raise
+                self.mark_throttled(name, wait)
+                continue
+            self.counters[name]["sent"] += 1
+            if name != self.home(key):
+                self.counters[name]["rerouted_in"] += 1
+            return name, result
+
+    async def send_message(self, chat_id: str | int, text: str, route: str | None = None, **kwargs: Any) -> tuple[str, Any]:
+        return await self.call(route or route_key(None, None), lambda client: client.send_message(chat_id, text, **kwargs))
+
+    def sessions(self) -> list[tuple[str, Any]]:
+        return sorted(self.clients.items())
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            name: {**counts, "throttled_for": round(max(self.throttled_until.get(name, 0.0) - now, 0.0), 3)}
+            for name, counts in sorted(self.counters.items())
+        }
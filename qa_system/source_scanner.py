@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+COMMAND_PATTERNS = [
+    re.compile(r"(?<![\w:/.-])(/[-A-Za-z0-9_]+)\b"),
+    re.compile(r"\bslash\s*[:=]\s*[\"']([^\"']+)[\"']", re.IGNORECASE),
+    re.compile(r"\bcommand\s*[:=]\s*[\"']([^\"']+)[\"']", re.IGNORECASE),
+]
+
+BUTTON_PATTERNS = [
+    re.compile(r"callback_data\s*=\s*[\"']([^\"']+)[\"']"),
+    re.compile(r"custom_id\s*=\s*[\"']([^\"']+)[\"']"),
+    re.compile(r"InlineKeyboardButton\([^\)]*text\s*=\s*[\"']([^\"']+)[\"']"),
+]
+
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "dist", "build", "qa_artifacts", "__pycache__", ".mypy_cache", ".pytest_cache", ".tox"}
+SOURCE_SUFFIXES = {".py", ".js", ".ts", ".md", ".go", ".rs"}
+MAX_FILE_SIZE_BYTES = 1_000_000
+# Below this many files the process pool costs more than it saves.
+MIN_FILES_FOR_POOL = 64
+
+DEFAULT_COMMANDS = ("/start", "/help", "/qa_on", "/qa_off", "/qa_mode")
+DEFAULT_BUTTONS = ("profile", "admin_menu", "next_page", "confirm", "cancel")
+
+
+@dataclass(frozen=True)
+class FileSymbols:
+    commands: tuple[str, ...] = ()
+    buttons: tuple[str, ...] = ()
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Every discovery pattern starts with one of these characters. Guarding the combined
+# pattern with them lets the regex engine skip ahead instead of trying every
+# alternative at every offset; extend it when adding a pattern.
+_LEADING_CHARS = "/sScCI"
+
+
+def _combine(patterns: list[tuple[str, re.Pattern[str]]]) -> tuple[re.Pattern[str], dict[int, tuple[int, str, int]]]:
+    # Each pattern sits in its own alternative inside a zero-width lookahead, so one
+    # left-to-right pass reports every pattern's matches without consuming text the
+    # others need. Scoped inline flags keep per-pattern IGNORECASE.
+    alternatives = []
+    for i, (_, pattern) in enumerate(patterns):
+        if pattern.groups != 1:
+            raise ValueError(f"Discovery patterns need exactly one capture group: {pattern.pattern}")
+        body = f"(?i:{pattern.pattern})" if pattern.flags & re.IGNORECASE else pattern.pattern
+        alternatives.append(f"(?P<p{i}>{body})")
+    combined = re.compile(f"(?=[{re.escape(_LEADING_CHARS)}])(?=" + "|".join(alternatives) + ")")
+    # The wrapping group closes last, so ``match.lastindex`` identifies the pattern.
+    slots = {combined.groupindex[f"p{i}"]: (i, kind, combined.groupindex[f"p{i}"] + 1) for i, (kind, _) in enumerate(patterns)}
+    return combined, slots
+
+
+_COMBINED, _SLOTS = _combine([("command", p) for p in COMMAND_PATTERNS] + [("button", p) for p in BUTTON_PATTERNS])
+# Changes whenever the patterns do, so cached scan results can be invalidated.
+PATTERNS_FINGERPRINT = content_digest(_COMBINED.pattern.encode("utf-8"))
+
+
+def scan_text(text: str) -> FileSymbols:
+    commands: set[str] = set()
+    buttons: set[str] = set()
+    # findall matched each pattern without overlapping itself; keep that per pattern.
+    last_end = [0] * len(_SLOTS)
+    for match in _COMBINED.finditer(text):
+        outer = match.lastindex
+        i, kind, inner = _SLOTS[outer]
+        if match.start(outer) < last_end[i]:
+            continue
+        last_end[i] = match.end(outer)
+        value = match.group(inner).strip()
+        if not value:
+            continue
+        if kind == "command":
+            commands.add(value if value.startswith("/") else f"/{value}")
+        else:
+            buttons.add(value)
+    return FileSymbols(commands=tuple(sorted(commands)), buttons=tuple(sorted(buttons)))
+
+
+def _read_bytes(path: Path | str) -> bytes | None:
+    try:
+        return Path(path).read_bytes()
+    except OSError:
+        return None
+
+
+def _decode(data: bytes) -> str:
+    # Same text Path.read_text would give: lenient UTF-8 with universal newlines.
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def scan_file(path: Path | str) -> FileSymbols:
+    data = _read_bytes(path)
+    return FileSymbols() if data is None else scan_text(_decode(data))
+
+
+def scan_file_with_digest(path: Path | str) -> tuple[str | None, FileSymbols]:
+    data = _read_bytes(path)
+    if data is None:
+        return None, FileSymbols()
+    return content_digest(data), scan_text(_decode(data))
+
+
+def is_source_path(rel_path: str) -> bool:
+    parts = rel_path.split("/")
+    return os.path.splitext(parts[-1])[1].lower() in SOURCE_SUFFIXES and not any(part in SKIP_DIRS for part in parts[:-1])
+
+
+def iter_source_entries(repo_root: Path) -> Iterator[tuple[Path, os.stat_result]]:
+    stack = [repo_root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        subdirs.append(Path(entry.path))
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in SOURCE_SUFFIXES or not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            if stat.st_size <= MAX_FILE_SIZE_BYTES:
+                yield Path(entry.path), stat
+        stack.extend(reversed(subdirs))
+
+
+def iter_source_files(repo_root: Path) -> Iterator[Path]:
+    for path, _ in iter_source_entries(repo_root):
+        yield path
+
+
+def _scan_chunk(scan: Callable[[str], Any], paths: list[str]) -> list[tuple[str, Any]]:
+    return [(path, scan(path)) for path in paths]
+
+
+def _map_files(scan: Callable[[str], Any], paths: Iterable[Path], workers: int) -> dict[Path, Any]:
+    path_list = list(paths)
+    if workers <= 1 or len(path_list) < MIN_FILES_FOR_POOL:
+        return {path: scan(path) for path in path_list}
+    chunk = max(len(path_list) // (workers * 4), 1)
+    chunks = [[str(p) for p in path_list[i : i + chunk]] for i in range(0, len(path_list), chunk)]
+    results: dict[Path, Any] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(partial(_scan_chunk, scan), chunks):
+            results.update((Path(path), value) for path, value in batch)
+    return results
+
+
+def scan_files(paths: Iterable[Path], workers: int = 0) -> dict[Path, FileSymbols]:
+    return _map_files(scan_file, paths, workers)
+
+
+def scan_files_with_digest(paths: Iterable[Path], workers: int = 0) -> dict[Path, tuple[str | None, FileSymbols]]:
+    return _map_files(scan_file_with_digest, paths, workers)
+
+
+def scan_repository(repo_root: Path, workers: int = 0) -> dict[Path, FileSymbols]:
+    return scan_files(iter_source_files(repo_root), workers=workers)
+
+
+def merge_symbols(symbols: Iterable[FileSymbols]) -> tuple[list[str], list[str]]:
+    commands: set[str] = set()
+    buttons: set[str] = set()
+    for item in symbols:
+        commands.update(item.commands)
+        buttons.update(item.buttons)
+    return sorted(commands or set(DEFAULT_COMMANDS)), sorted(buttons or set(DEFAULT_BUTTONS))
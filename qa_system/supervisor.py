@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from .bot_registry import BotRegistry
+from .config import DEFAULT_ROOT
+from .executor import CAPTURE_MODES, DEFAULT_CALLBACKS_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT, QAExecutor, make_client
+from .send_scheduler import SendScheduler
+from .session_pool import SessionPool
+
+RESTART_BACKOFF_SECONDS = 5.0
+MAX_RESTART_BACKOFF_SECONDS = 300.0
+
+
+class QASupervisor:
+    """Runs one executor task per registered bot over a single shared client.
+
+    Every bot keeps its own queue, log partition and executor state
+    (``qa/state/bots/<bot_name>/executor_state.json``). ``max_in_flight`` in a
+    bot's ``bot_list.json`` entry bounds its concurrent actions
+    (``max_callbacks_in_flight`` its concurrent callback presses), and
+    ``max_in_flight_total`` bounds all bots together on the shared connection.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        client_factory: Callable[[], Any] | None = None,
+        bots: list[str] | None = None,
+        max_in_flight_total: int | None = None,
+    ) -> None:
+        self.root = root
+        self.client_factory = client_factory
+        self.registry = BotRegistry(root)
+        self.registry.ensure_defaults()
+        registered = self.registry.list_bots()
+        unknown = sorted(set(bots or []) - set(registered))
+        if unknown:
+            raise ValueError(f"Unknown bots: {', '.join(unknown)}")
+        self.bots = list(bots) if bots else sorted(registered)
+        self.max_in_flight_total = max_in_flight_total
+        self.executors: dict[str, QAExecutor] = {
+            name: QAExecutor(
+                root,
+                client_factory=client_factory,
+                bot_name=name,
+                max_in_flight=int(registered[name].get("max_in_flight", DEFAULT_MAX_IN_FLIGHT)),
+                max_callbacks_in_flight=int(registered[name].get("max_callbacks_in_flight", DEFAULT_CALLBACKS_IN_FLIGHT)),
+            )
+            for name in self.bots
+        }
+        self.restarts: dict[str, int] = {name: 0 for name in self.bots}
+
+    async def _supervise(
+        self,
+        name: str,
+        app: Any,
+        poll_interval: float,
+        capture_mode: str,
+        global_slots: asyncio.Semaphore | None,
+        scheduler: SendScheduler,
+    ) -> None:
+        executor = self.executors[name]
+        backoff = RESTART_BACKOFF_SECONDS
+        while True:
+            try:
+                await executor.serve_connected(app, poll_interval, capture_mode, global_slots, scheduler)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # One misbehaving bot must not take the others down; log and restart it with backoff.
+                self.restarts[name] += 1
+                executor.write_log(
+                    {"timestamp": datetime.now(timezone.utc).isoformat(), "error": "bot_task_crashed", "bot": name, "detail": repr(exc), "restarts": self.restarts[name]},
+                    "error_log.json",
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+
+    async def run(self, poll_interval: float = 1.0, capture_mode: str = "events") -> None:
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown capture mode: {capture_mode}")
+        app = make_client(self.root, self.client_factory)
+        global_slots = asyncio.Semaphore(self.max_in_flight_total) if self.max_in_flight_total else None
+        # One scheduler for the shared connection: per-bot chat buckets, one global bucket.
+        scheduler = SendScheduler()
+        try:
+            async with app, scheduler:
+                tasks = [
+                    asyncio.ensure_future(self._supervise(name, app, poll_interval, capture_mode, global_slots, scheduler))
+                    for name in self.bots
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.close()
+
+    def status(self) -> dict[str, Any]:
+        return {name: {**executor.state.as_dict(), "max_in_flight": executor.max_in_flight, "restarts": self.restarts[name]} for name, executor in self.executors.items()}
+
+    def close(self) -> None:
+        for executor in self.executors.values():
+            executor.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the QA executor for every registered bot concurrently")
+    parser.add_argument("--root", default=str(DEFAULT_ROOT), help="Project root")
+    parser.add_argument("--bots", default=None, help="Comma-separated bot names (default: all registered bots)")
+    parser.add_argument("--capture", default="events", choices=CAPTURE_MODES, help="Message capture mode")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between queue checks")
+    parser.add_argument("--sessions-dir", default=None, help="Shard sends across every *.session userbot in this directory")
+    parser.add_argument("--max-in-flight-total", type=int, default=None, help="Concurrent actions across all bots")
+    parser.add_argument("--status", action="store_true", help="Print per-bot supervisor state and exit")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    bots = [b.strip() for b in args.bots.split(",") if b.strip()] if args.bots else None
+    factory = (lambda: SessionPool.from_dir(Path(args.sessions_dir))) if args.sessions_dir else None
+    supervisor = QASupervisor(Path(args.root), client_factory=factory, bots=bots, max_in_flight_total=args.max_in_flight_total)
+    if args.status:
+        print(json.dumps(supervisor.status(), indent=2))
+        supervisor.close()
+        return
+    asyncio.run(supervisor.run(poll_interval=args.poll_interval, capture_mode=args.capture))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+
+from .multi_match import literal_automaton
 
 
 def build_test_plan(capabilities: dict[str, Any]) -> dict[str, Any]:
@@ -28,27 +32,77 @@ def build_test_plan(capabilities: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-def evaluate_message(text: str, capabilities: dict[str, Any]) -> dict[str, Any]:
-    expected_success = set(capabilities.get("expected_success_messages", []))
-    expected_failure = set(capabilities.get("expected_failure_messages", []))
-    known_errors = set(capabilities.get("error_messages", []))
+class MessageEvaluator:
+    """Grades bot replies against one capabilities version.
 
-    bugs: list[str] = []
-    missing_behavior: list[str] = []
-    unexpected_errors: list[str] = []
+    Each group of expected success/failure strings and known error strings is
+    compiled once into a prefix-factored automaton, so grading a message is a
+    single scan per group that stops at the first hit, instead of one
+    substring search per configured string.
+    """
 
-    if expected_success and all(msg not in text for msg in expected_success):
-        missing_behavior.append("missing_expected_success_message")
-    if expected_failure and "error" in text.lower() and all(msg not in text for msg in expected_failure):
-        missing_behavior.append("missing_expected_failure_message")
-    if "error" in text.lower() and known_errors and all(err not in text for err in known_errors):
-        unexpected_errors.append("undocumented_error")
+    def __init__(self, expected_success: Iterable[str], expected_failure: Iterable[str], known_errors: Iterable[str]) -> None:
+        self._groups = []
+        for values in (set(expected_success), set(expected_failure), set(known_errors)):
+            # "" is a substring of every text, so such a group always matches.
+            self._groups.append((bool(values), "" in values, literal_automaton(values)))
 
-    if "pending_action" in text and "error" in text.lower():
-        bugs.append("pending_action_state_error")
+    @classmethod
+    def from_capabilities(cls, capabilities: Mapping[str, Any]) -> "MessageEvaluator":
+        return _compiled(*_fingerprint(capabilities))
 
-    return {
-        "bugs": bugs,
-        "missing_behavior": missing_behavior,
-        "unexpected_errors": unexpected_errors,
-    }
+    def _found(self, group: int, text: str) -> bool:
+        _, always, automaton = self._groups[group]
+        return always or (automaton is not None and automaton.search(text) is not None)
+
+    def _flags(self, text: str) -> list[tuple[str, str]]:
+        (has_success, _, _), (has_failure, _, _), (has_known, _, _) = self._groups
+        is_error = "error" in text.lower()
+        flags: list[tuple[str, str]] = []
+        if has_success and not self._found(0, text):
+            flags.append(("missing_behavior", "missing_expected_success_message"))
+        if has_failure and is_error and not self._found(1, text):
+            flags.append(("missing_behavior", "missing_expected_failure_message"))
+        if is_error and has_known and not self._found(2, text):
+            flags.append(("unexpected_errors", "undocumented_error"))
+        if is_error and "pending_action" in text:
+            flags.append(("bugs", "pending_action_state_error"))
+        return flags
+
+    def evaluate(self, text: str) -> dict[str, Any]:
+        result: dict[str, Any] = {"bugs": [], "missing_behavior": [], "unexpected_errors": []}
+        for category, flag in self._flags(text):
+            result[category].append(flag)
+        return result
+
+    def evaluate_batch(self, messages: Iterable[str | Mapping[str, Any]]) -> dict[str, Any]:
+        """Aggregate counts over message texts or message-log entries (their ``text``)."""
+        counts: dict[str, Counter[str]] = {"bugs": Counter(), "missing_behavior": Counter(), "unexpected_errors": Counter()}
+        graded = 0
+        for message in messages:
+            text = message if isinstance(message, str) else str(message.get("text") or "")
+            graded += 1
+            for category, flag in self._flags(text):
+                counts[category][flag] += 1
+        return {
+            "messages": graded,
+            **{category: dict(sorted(counter.items())) for category, counter in counts.items()},
+            "totals": {category: sum(counter.values()) for category, counter in counts.items()},
+        }
+
+
+def _fingerprint(capabilities: Mapping[str, Any]) -> tuple[tuple[str, ...], ...]:
+    return tuple(tuple(capabilities.get(key, ())) for key in ("expected_success_messages", "expected_failure_messages", "error_messages"))
+
+
+@lru_cache(maxsize=32)
+def _compiled(expected_success: tuple[str, ...], expected_failure: tuple[str, ...], known_errors: tuple[str, ...]) -> MessageEvaluator:
+    return MessageEvaluator(expected_success, expected_failure, known_errors)
+
+
+def evaluate_message(text: str, capabilities: dict[str, Any]) -> dict[str, Any]:
+    return MessageEvaluator.from_capabilities(capabilities).evaluate(text)
+
+
+def evaluate_messages(messages: Iterable[str | Mapping[str, Any]], capabilities: dict[str, Any]) -> dict[str, Any]:
+    return MessageEvaluator.from_capabilities(capabilities).evaluate_batch(messages)